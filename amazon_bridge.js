@@ -3,94 +3,17 @@
  * This allows calling the Python scraper from JavaScript
  */
 
-const { spawn } = require('child_process');
-const path = require('path');
-const fs = require('fs');
-
-// Path to the Python script
-const SCRAPER_PATH = path.join(__dirname, 'amazon_scraper.py');
+const { callWorker } = require('./scraper_worker_client');
 
 /**
- * Execute the Python scraper with arguments and return results
+ * Execute a Python scraper function in the persistent worker and return results
  * @param {string} functionName - Name of the Python function to call
  * @param {array} args - Arguments to pass to the Python function
  * @returns {Promise<any>} - Results from Python
  */
 async function executePythonScript(functionName, args) {
-    return new Promise((resolve, reject) => {
-        // Make sure the Python file exists
-        if (!fs.existsSync(SCRAPER_PATH)) {
-            reject(new Error(`Python scraper not found at: ${SCRAPER_PATH}`));
-            return;
-        }
-
-        // Construct the Python script to run the specific function with args
-        const pythonCode = `
-import sys
-import json
-from amazon_scraper import ${functionName}
-
-try:
-    args = json.loads('${JSON.stringify(args)}')
-    result = ${functionName}(*args)
-    print(json.dumps(result))
-except Exception as e:
-    print(json.dumps({"error": str(e)}))
-`;
-        
-        // Create a temporary Python file to run
-        const tempFilePath = path.join(__dirname, `_temp_${Date.now()}.py`);
-        fs.writeFileSync(tempFilePath, pythonCode);
-
-        console.log(`🐍 Running Python script for ${functionName}...`);
-        
-        // Execute the Python script
-        const pythonProcess = spawn('python3', [tempFilePath]);
-        
-        let outputData = '';
-        let errorData = '';
-        
-        // Collect stdout data
-        pythonProcess.stdout.on('data', (data) => {
-            outputData += data.toString();
-        });
-        
-        // Collect stderr data
-        pythonProcess.stderr.on('data', (data) => {
-            errorData += data.toString();
-            console.error(`🐍 Python error: ${data.toString()}`);
-        });
-        
-        // Handle Python process exit
-        pythonProcess.on('close', (code) => {
-            // Clean up temp file
-            try {
-                fs.unlinkSync(tempFilePath);
-            } catch (error) {
-                console.error(`Error removing temp file: ${error.message}`);
-            }
-            
-            if (code !== 0) {
-                console.error(`🐍 Python process exited with code ${code}`);
-                reject(new Error(`Python process failed: ${errorData}`));
-                return;
-            }
-            
-            // Parse the JSON output
-            try {
-                const result = JSON.parse(outputData);
-                if (result && result.error) {
-                    reject(new Error(`Python error: ${result.error}`));
-                } else {
-                    resolve(result);
-                }
-            } catch (error) {
-                console.error(`Error parsing Python output: ${error.message}`);
-                console.error(`Raw output: ${outputData}`);
-                reject(error);
-            }
-        });
-    });
+    console.log(`🐍 Running Python function ${functionName}...`);
+    return callWorker('amazon_scraper', functionName, args);
 }
 
 /**
@@ -147,6 +70,89 @@ async function getSellerName(sellerId, marketplace = 'co.uk') {
     }
 }
 
+/**
+ * Get the display names of several sellers in one call
+ * Names come from the scraper's long-lived seller name cache; only sellers
+ * missing from it are looked up on Amazon.
+ * @param {string[]} sellerIds - Amazon seller IDs
+ * @param {string} marketplace - Amazon marketplace (default: co.uk)
+ * @returns {Promise<Object>} - Map of seller ID to name (null if not found)
+ */
+async function getSellerNames(sellerIds, marketplace = 'co.uk') {
+    console.log(`🏪 Getting seller names for ${sellerIds.length} sellers`);
+    try {
+        return await executePythonScript('get_seller_names', [sellerIds, marketplace]);
+    } catch (error) {
+        console.error(`❌ Error getting seller names: ${error.message}`);
+        return {};
+    }
+}
+
+/**
+ * Get products from a seller on several Amazon marketplaces at once
+ * @param {string} sellerId - Amazon seller ID
+ * @param {Array<string>|null} marketplaces - Marketplaces to scan, e.g. ['co.uk', 'de'] (default: all supported)
+ * @param {boolean} forceRefresh - Whether to force a fresh scrape
+ * @returns {Promise<Object>} - Marketplace -> {products, error, elapsed}
+ */
+async function getSellerProductsByMarketplace(sellerId, marketplaces = null, forceRefresh = false) {
+    try {
+        return await callWorker('amazon_scraper', 'scan_marketplaces', [sellerId, marketplaces, forceRefresh]);
+    } catch (error) {
+        console.error(`❌ Error scanning seller ${sellerId} across marketplaces: ${error.message}`);
+        return {};
+    }
+}
+
+/**
+ * Get the tracked sellers due for a check now
+ * Each seller's check interval adapts to how often it lists new products,
+ * and the sellers returned fit the scraper's hourly request budget.
+ * @param {string} marketplace - Amazon marketplace (default: co.uk)
+ * @param {number|null} limit - Maximum number of sellers to return
+ * @returns {Promise<Array>} - Seller IDs, most overdue first
+ */
+async function getDueSellers(marketplace = 'co.uk', limit = null) {
+    try {
+        return await callWorker('check_scheduler', 'due_sellers', [marketplace, null, limit]);
+    } catch (error) {
+        console.error(`❌ Error getting due sellers: ${error.message}`);
+        return [];
+    }
+}
+
+/**
+ * Get the price drops seen since a time
+ * @param {number} since - Earliest time to include (milliseconds since the epoch)
+ * @param {string} marketplace - Amazon marketplace (default: co.uk)
+ * @param {string|null} sellerId - Only drops of this seller's listings
+ * @param {number} minDrop - Smallest drop to include, as a share of the previous price (e.g. 0.1)
+ * @returns {Promise<Array>} - Drops with asin, seller_id, dropped_at (seconds), price and previous_price (pence)
+ */
+async function getPriceDrops(since, marketplace = 'co.uk', sellerId = null, minDrop = 0) {
+    try {
+        return await callWorker('price_history', 'get_price_drops', [since / 1000, marketplace, sellerId, minDrop]);
+    } catch (error) {
+        console.error(`❌ Error getting price drops: ${error.message}`);
+        return [];
+    }
+}
+
+/**
+ * Get the recorded price and availability changes of a product
+ * @param {string} asin - Product ASIN
+ * @param {string} marketplace - Amazon marketplace (default: co.uk)
+ * @returns {Promise<Array>} - Changes, oldest first, with changed_at (seconds), listed and price (pence)
+ */
+async function getAsinHistory(asin, marketplace = 'co.uk') {
+    try {
+        return await callWorker('price_history', 'get_asin_history', [asin, marketplace]);
+    } catch (error) {
+        console.error(`❌ Error getting history of ${asin}: ${error.message}`);
+        return [];
+    }
+}
+
 /**
  * Try to extract numeric price from a price string
  * @param {string} priceText - Price text (e.g., "£10.99")
@@ -165,5 +171,10 @@ function parsePrice(priceText) {
 
 module.exports = {
     getSellerProducts,
-    getSellerName
+    getSellerName,
+    getSellerNames,
+    getSellerProductsByMarketplace,
+    getDueSellers,
+    getPriceDrops,
+    getAsinHistory
 };
\ No newline at end of file
@@ -3,18 +3,38 @@ Amazon Seller Storefront Scraper
 
 This module scrapes an Amazon seller's storefront to find all products they sell.
 It works as an alternative to the Keepa API when direct seller inventory isn't accessible.
+
+The HTTP and HTML stacks (requests, trafilatura, bs4) and asyncio are imported
+on first use, so a call answered from the cache starts quickly.
 """
 
 import os
-import json
 import time
 import random
 import logging
 import re
-from typing import List, Dict, Any, Optional
-import requests
-from bs4 import BeautifulSoup
-import trafilatura
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple, Iterable, Iterator, Union
+
+from rate_limiter import HostRateLimiter, is_blocked
+from session_pool import SESSION_POOL
+from proxy_pool import ProxyPool, get_proxy_pool
+from single_flight import Flight
+from seller_batch import DEFAULT_MAX_WORKERS, resolve_seller_names, run_batch, run_marketplaces
+from product_store import ProductStore, build_delta
+from fast_extract import ASIN_PATTERN, parse_search_page
+from parse_pool import DEFAULT_PARSE_WORKERS, PageBody, current_pool, sweep_pool, use_pool
+from html_parser_backend import parse_html
+from url_pattern_planner import UrlPatternPlanner
+from scraper_cache import get_cache
+from check_scheduler import record_check
+from price_history import record_inventory
+from marketplaces import MARKETPLACES, SEARCH_PAGE_LIMIT, get_marketplace
+from scrape_stats import scan_stats, stage, add_time, count, count_status
+
+if TYPE_CHECKING:
+    import asyncio
+    import requests
 
 # Configure logging
 logging.basicConfig(
@@ -36,9 +56,19 @@ USER_AGENTS = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36'
 ]
 
-# Cache directory for storing seller data to reduce requests
-CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'cache')
-os.makedirs(CACHE_DIR, exist_ok=True)
+# Seller data is cached to reduce requests (seconds, default 24 hours)
+CACHE_NAMESPACE = 'amazon_scraper'
+CACHE_TTL = float(os.environ.get('AMAZON_SCRAPER_CACHE_TTL', 86400))
+
+# Past CACHE_TTL, a long-lived worker serves cached data while refreshing it
+# in the background until it is this old (seconds, default 48 hours)
+CACHE_HARD_TTL = float(os.environ.get('AMAZON_SCRAPER_CACHE_HARD_TTL', 2 * 86400))
+
+# Default number of concurrent page requests per host for the async crawl
+DEFAULT_MAX_PER_HOST = 3
+
+# Maximum newest-first pages read by an incremental scan
+DEFAULT_DELTA_MAX_PAGES = 20
 
 # Use a free proxy rotation service or None to use direct connection
 FREE_PROXY_LIST_URL = "https://free-proxy-list.net/"
@@ -63,42 +93,202 @@ def get_free_proxies() -> List[Dict[str, str]]:
     logger.info("No verified proxies available, using direct connections")
     return []
 
-class AmazonSellerScraper:
-    """Scraper for Amazon seller storefronts."""
+class SellerPageReader:
+    """Reads products from fetched storefront pages of one marketplace, without fetching anything itself."""
     
     def __init__(self, marketplace="co.uk"):
-        """Initialize the scraper with specific marketplace."""
+        """Initialize the reader for a marketplace."""
         self.marketplace = marketplace
-        self.base_url = f"https://www.amazon.{marketplace}"
-        self.session = requests.Session()
-        self.proxies = []
-        self.current_proxy_index = 0
+        self.site = get_marketplace(marketplace)
+    
+    def _parse_page(self, response: 'requests.Response', seller_id: str, seller_name: str) -> Tuple[Optional[ProductStore], bool]:
+        """
+        Extract products and pagination state from a storefront page.
+        
+        Returns:
+            Tuple of (products, has_next_page). Products is None when no product
+            elements were found on the page at all.
+        """
+        # Common search page layouts are read without building a tree
+        with stage('parse'):
+            page = parse_search_page(response.content)
+        if page is not None:
+            fast_result = self._parse_fast_page(page, seller_id, seller_name)
+            if fast_result is not None:
+                count('fast_path_pages')
+                return fast_result
+        count('fast_path_fallbacks')
+        
+        # Use even more comprehensive selectors to find products
+        product_selectors = [
+            'div[data-asin]:not([data-asin=""])', 
+            '.s-result-item[data-asin]:not([data-asin=""])',
+            '.sg-col-inner div[data-asin]',
+            'div.a-section[data-asin]',
+            'li.a-carousel-card[data-asin]',
+            'div[data-component-type="s-search-result"]',
+            'div.rush-component[data-asin]',
+            '.s-main-slot div[data-asin]',
+            '.widgetId\\=search-results div[data-asin]',
+            'div[cel_widget_id*="MAIN-SEARCH_RESULTS"]',
+            'div.s-card-container'
+        ]
+        
+        with stage('parse'):
+            soup = parse_html(response.content, results_only=True, product_selectors=product_selectors)
+        
+        page_products = None
+        for selector in product_selectors:
+            product_elements = soup.select(selector)
+            if product_elements:
+                page_products = ProductStore()
+                logger.info(f"Found {len(product_elements)} products with selector {selector}")
+                
+                # Process each product
+                for element in product_elements:
+                    asin = element.get('data-asin', '')
+                    if not asin or len(asin) != 10:  # Valid ASINs are 10 characters
+                        continue
+                    
+                    # Try multiple selectors for product details
+                    title_selectors = ['.a-text-normal', 'h2 a span', '.a-size-base-plus', '.a-size-medium']
+                    price_selectors = ['.a-price .a-offscreen', '.a-price', '.a-color-price']
+                    
+                    # Get title
+                    title = None
+                    for title_selector in title_selectors:
+                        title_element = element.select_one(title_selector)
+                        if title_element and title_element.text.strip():
+                            title = title_element.text.strip()
+                            break
+                    
+                    if not title:
+                        continue  # Skip products without title
+                    
+                    # Get price
+                    price_text = None
+                    for price_selector in price_selectors:
+                        price_element = element.select_one(price_selector)
+                        if price_element and price_element.text.strip():
+                            price_text = price_element.text.strip()
+                            break
+                    
+                    page_products.add(self._build_product(asin, title, price_text, seller_id, seller_name))
+                
+                break  # Break the selector loop if we found products
+        
+        if page_products is None:
+            return None, False
+        
+        # Check if there's a "Next" button for pagination
+        next_button = soup.select_one('.a-pagination .a-last a')
+        disabled = False
+        
+        # Safely check if the next button's parent has a disabled class
+        if next_button and hasattr(next_button, 'parent') and next_button.parent:
+            parent = next_button.parent
+            if hasattr(parent, 'get') and callable(parent.get):
+                parent_classes = parent.get('class', [])
+                if parent_classes and isinstance(parent_classes, list):
+                    disabled = 'a-disabled' in parent_classes
+        
+        return page_products, bool(next_button) and not disabled
+    
+    def _parse_fast_page(self, page: Dict[str, Any], seller_id: str,
+                         seller_name: str) -> Optional[Tuple[ProductStore, bool]]:
+        """
+        Build the products of a page read by fast_extract.
+        
+        Returns None, so the page is parsed with BeautifulSoup instead, when
+        the selectors in _parse_page might pick something else: no results, an
+        ASIN that isn't one, a result without a title, or a price the
+        .a-offscreen selector doesn't cover.
+        """
+        results = [result for result in page['results'] if result['asin']]
+        if not results:
+            return None
+        
+        page_products = ProductStore()
+        for result in results:
+            title = (result['text_normal'] or '').strip()
+            price_text = (result['price'] or '').strip()
+            if (not ASIN_PATTERN.fullmatch(result['asin']) or not title
+                    or (not price_text and result['price_other'])):
+                return None
+            page_products.add(self._build_product(result['asin'], title, price_text, seller_id, seller_name))
+        
+        logger.info(f"Found {len(results)} products with the fast path")
+        next_link = page['next_link']
+        return page_products, next_link is not None and not next_link['disabled']
+    
+    def _build_product(self, asin: str, title: str, price_text: Optional[str], seller_id: str,
+                       seller_name: str) -> Dict[str, Any]:
+        """Build the product dict of a search result."""
+        product = {
+            'asin': asin,
+            'title': title,
+            'link': self.site.product_link(asin),
+            'marketplace': f"Amazon {self.marketplace.upper()}",
+            'seller_id': seller_id,
+            'seller_name': seller_name
+        }
+        
+        # Add price if available
+        if price_text:
+            product['price_text'] = price_text
+        return product
+    
+    def _is_invalid_page(self, response: 'requests.Response') -> bool:
+        """Check whether Amazon returned an error page instead of a seller page."""
+        text = response.text
+        return "Sorry! We couldn't find that page" in text or "We're sorry" in text
+    
+    def _read_page(self, response: Union['requests.Response', PageBody], seller_id: str,
+                   seller_name: str) -> Tuple[bool, Optional[ProductStore], bool]:
+        """
+        Check that a fetched page is a seller page and extract its products.
+        
+        Returns:
+            Tuple of (invalid, products, has_next_page), as _parse_page for a valid page
+        """
+        # First check if we got a valid seller page
+        with stage('decode'):
+            invalid = self._is_invalid_page(response)
+        if invalid:
+            return True, None, False
+        
+        with stage('extract'):
+            found_products, has_next = self._parse_page(response, seller_id, seller_name)
+        return False, found_products, has_next
+
+class AmazonSellerScraper(SellerPageReader):
+    """Scraper for Amazon seller storefronts."""
+    
+    def __init__(self, marketplace="co.uk", rate_limiter: Optional[HostRateLimiter] = None,
+                 proxy_pool: Optional[ProxyPool] = None):
+        """Initialize the scraper with specific marketplace."""
+        super().__init__(marketplace)
+        self.base_url = self.site.base_url
+        self.proxy_pool = proxy_pool or get_proxy_pool()
         self.max_retries = 3
         self.retry_delay = 2  # seconds
-        self.request_delay = (2, 5)  # min and max seconds
-        
-        # Cookies to make requests more like a regular browser
-        self.session.cookies.set('session-id', f'{random.randint(1000000, 9999999)}')
-        self.session.cookies.set('session-id-time', f'{int(time.time())}')
-        self.session.cookies.set('i18n-prefs', 'GBP')
-        self.session.cookies.set('lc-gb', 'en_GB')
+        self.rate_limiter = rate_limiter or HostRateLimiter()
         
         # Try to get proxies for rotation
         self.refresh_proxies()
     
+    @property
+    def session(self) -> 'requests.Session':
+        """The marketplace's pooled session, shared with every scraper (connections and cookies)."""
+        return SESSION_POOL.get(self.marketplace, count_request=False)
+    
     def refresh_proxies(self):
-        """Get a fresh list of proxies."""
-        self.proxies = get_free_proxies()
-        self.current_proxy_index = 0
+        """Add the available proxies to the shared proxy pool."""
+        self.proxy_pool.add_proxies(get_free_proxies())
         
     def get_next_proxy(self) -> Optional[Dict[str, str]]:
-        """Get the next proxy in the rotation."""
-        if not self.proxies:
-            return None
-            
-        proxy = self.proxies[self.current_proxy_index]
-        self.current_proxy_index = (self.current_proxy_index + 1) % len(self.proxies)
-        return proxy
+        """Get the healthiest proxy to use next (picked at random, weighted by score)."""
+        return self.proxy_pool.choose()
         
     def _get_headers(self) -> Dict[str, str]:
         """Generate headers with random user agent to avoid blocking."""
@@ -108,7 +298,7 @@ class AmazonSellerScraper:
         headers = {
             'User-Agent': user_agent,
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-            'Accept-Language': 'en-GB,en-US;q=0.9,en;q=0.8',
+            'Accept-Language': self.site.accept_language,
             'Accept-Encoding': 'gzip, deflate, br',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
@@ -129,43 +319,51 @@ class AmazonSellerScraper:
             
         return headers
     
-    def _get_cache_path(self, seller_id: str) -> str:
-        """Get cache file path for a seller."""
-        return os.path.join(CACHE_DIR, f"{seller_id}_{self.marketplace}.json")
-    
-    def _get_from_cache(self, seller_id: str) -> Optional[Dict[str, Any]]:
-        """Try to get seller data from cache if not too old."""
-        cache_path = self._get_cache_path(seller_id)
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                
-                # Check if cache is less than 24 hours old
-                cache_time = cache_data.get('timestamp', 0)
-                if time.time() - cache_time < 86400:  # 24 hours
-                    logger.info(f"Using cached data for seller {seller_id}")
-                    return cache_data
-            except Exception as e:
-                logger.warning(f"Error reading cache: {e}")
+    def _get_from_cache(self, seller_id: str, max_age: Optional[float] = CACHE_TTL,
+                        revalidate: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Try to get seller data from cache if not too old (max_age=None accepts any age).
+        
+        With revalidate, data up to CACHE_HARD_TTL old may be returned while a
+        background scan refreshes it (when stale-while-revalidate is enabled).
+        """
+        try:
+            with stage('cache_read'):
+                if revalidate:
+                    cache_data = get_cache().get_inventory_or_revalidate(
+                        CACHE_NAMESPACE, seller_id, self.marketplace, max_age, CACHE_HARD_TTL,
+                        refresh=lambda: self.get_seller_products(seller_id, force_refresh=True)
+                    )
+                else:
+                    cache_data = get_cache().get_inventory(CACHE_NAMESPACE, seller_id, self.marketplace, max_age)
+            if cache_data:
+                logger.info(f"Using cached data for seller {seller_id}")
+                return cache_data
+        except Exception as e:
+            logger.warning(f"Error reading cache: {e}")
         
         return None
     
     def _save_to_cache(self, seller_id: str, data: Dict[str, Any]) -> None:
-        """Save seller data to cache."""
-        cache_path = self._get_cache_path(seller_id)
+        """Save seller data to cache and record it in the price history."""
         try:
-            # Add timestamp for cache expiration
-            data['timestamp'] = time.time()
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with stage('cache_write'):
+                get_cache().save_inventory(CACHE_NAMESPACE, seller_id, self.marketplace, data)
             logger.info(f"Saved data to cache for seller {seller_id}")
         except Exception as e:
             logger.warning(f"Error saving to cache: {e}")
+        with stage('cache_write'):
+            record_inventory(seller_id, self.marketplace, CACHE_NAMESPACE, data.get('products', []))
     
-    def _make_request(self, url: str, use_proxy: bool = True) -> Optional[requests.Response]:
+    def _make_request(self, url: str, use_proxy: bool = True) -> Optional['requests.Response']:
         """Make a request with retry and proxy rotation."""
+        import requests
+        
         for attempt in range(self.max_retries):
+            if attempt:
+                count('retries')
+            proxy = None
+            started = time.monotonic()
             try:
                 # Get proxy if needed and available
                 proxy_dict = None
@@ -175,133 +373,161 @@ class AmazonSellerScraper:
                         proxy_dict = {'http': proxy['url'], 'https': proxy['url']}
                         logger.info(f"Using proxy: {proxy['ip']}:{proxy['port']} ({proxy['country']})")
                 
-                # Add some randomness to mimic human behavior
-                time.sleep(random.uniform(self.request_delay[0], self.request_delay[1]))
+                # Pace requests to the host; the limiter adds its own jitter
+                add_time('sleep', self.rate_limiter.wait(url))
                 
                 # Make the request with fresh headers each time
                 headers = self._get_headers()
                 
-                response = self.session.get(
-                    url, 
-                    headers=headers, 
-                    proxies=proxy_dict,
-                    timeout=20,
-                    allow_redirects=True
-                )
+                started = time.monotonic()
+                with stage('fetch'):
+                    response = SESSION_POOL.get(self.marketplace).get(
+                        url, 
+                        headers=headers, 
+                        proxies=proxy_dict,
+                        timeout=20,
+                        allow_redirects=True
+                    )
+                latency = time.monotonic() - started
+                count_status(response.status_code)
+                count('bytes_downloaded', len(response.content))
+                
+                # Decoded once here for the captcha checks (response.text decodes on every access)
+                with stage('decode'):
+                    text = response.text
                 
-                if response.status_code == 200:
+                # Speed up while responses are good, back off when Amazon pushes back.
+                # The next wait() on retry is paced by the reduced rate.
+                self.rate_limiter.record(url, response.status_code, text)
+                if proxy:
+                    self.proxy_pool.record(proxy, latency, response.status_code, text)
+                
+                # A captcha page also comes with a 200, but has no products to read
+                if response.status_code == 200 and not is_blocked(200, text):
                     return response
+                elif response.status_code == 200:
+                    logger.warning(f"Got a captcha page (anti-bot). Attempt {attempt+1}/{self.max_retries}")
                 elif response.status_code == 503:
                     # Amazon's anti-bot detection was triggered
                     logger.warning(f"Got 503 Service Unavailable (anti-bot). Attempt {attempt+1}/{self.max_retries}")
-                    if use_proxy and self.proxies:
-                        # Try a different proxy on next attempt
-                        continue
-                    time.sleep(self.retry_delay * (attempt + 1))  # Exponential backoff
                 elif response.status_code == 403:
                     logger.warning(f"Access denied (403). Attempt {attempt+1}/{self.max_retries}")
-                    # Sleep longer for 403 errors
-                    time.sleep(self.retry_delay * 2 * (attempt + 1))
                 else:
                     logger.warning(f"Request failed with status code {response.status_code}. Attempt {attempt+1}/{self.max_retries}")
-                    time.sleep(self.retry_delay)
             except requests.RequestException as e:
                 logger.error(f"Request error on attempt {attempt+1}: {e}")
-                time.sleep(self.retry_delay)
+                count_status(None)
+                if proxy:
+                    self.proxy_pool.record(proxy, time.monotonic() - started, None)
+                with stage('sleep'):
+                    time.sleep(self.retry_delay)
         
         return None
 
-    def get_seller_name(self, seller_id: str) -> Optional[str]:
-        """Get seller's display name from their storefront."""
+    def get_seller_name(self, seller_id: str, force_refresh: bool = False) -> Optional[str]:
+        """Get seller's display name, from the seller name cache or their storefront."""
+        return self.get_seller_names([seller_id], force_refresh)[seller_id]
+
+    def get_seller_names(self, seller_ids: Iterable[str], force_refresh: bool = False,
+                         max_workers: int = DEFAULT_MAX_WORKERS) -> Dict[str, Optional[str]]:
+        """
+        Get the display names of several sellers.
+
+        Names are served from the long-lived seller name cache; only sellers
+        missing from it (or all, with force_refresh) are fetched, up to
+        max_workers at a time.
+
+        Returns:
+            Dict of seller ID -> name (None where no name could be found)
+        """
+        return resolve_seller_names(self._fetch_seller_name, seller_ids, self.marketplace, CACHE_NAMESPACE,
+                                    force_refresh, max_workers)
+
+    def _fetch_seller_name(self, seller_id: str) -> Optional[str]:
+        """Fetch a seller's display name from their /sp?seller= page."""
         try:
             url = f"{self.base_url}/sp?seller={seller_id}"
             logger.info(f"Getting seller name from {url}")
             
-            # Try using trafilatura first for better clean text extraction
-            try:
-                downloaded = trafilatura.fetch_url(url)
-                if downloaded:
-                    # Try to extract the seller name from the page title
-                    # Handle downloaded content based on its type
-                    content = downloaded
-                    if isinstance(downloaded, bytes):
-                        content = downloaded.decode('utf-8', errors='ignore')
+            # Try using trafilatura first for better clean text extraction. It fetches
+            # on its own, so it is skipped while the session pool replays pages.
+            if SESSION_POOL.transport is None:
+                try:
+                    import trafilatura
+                    with stage('fetch'):
+                        downloaded = trafilatura.fetch_url(url)
+                    count_status(200 if downloaded else None)
+                    if downloaded:
+                        # Try to extract the seller name from the page title
+                        # Handle downloaded content based on its type
+                        content = downloaded
+                        if isinstance(downloaded, bytes):
+                            content = downloaded.decode('utf-8', errors='ignore')
+                            
+                        match = re.search(r"<title>(.*?)[:|–]", content)
+                        if match:
+                            return match.group(1).strip()
                         
-                    match = re.search(r"<title>(.*?)[:|–]", content)
-                    if match:
-                        return match.group(1).strip()
-            except Exception as te:
-                logger.warning(f"Trafilatura extraction failed: {te}")
+                        # Same page the fallback would fetch, so search it instead
+                        with stage('extract'):
+                            return self._extract_seller_name(content.encode('utf-8'))
+                except Exception as te:
+                    logger.warning(f"Trafilatura extraction failed: {te}")
             
             # Fall back to requests + BeautifulSoup if trafilatura fails
             response = self._make_request(url)
             if not response:
                 return None
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Try multiple selectors that might contain the seller name
-            selectors = [
-                'h1#sellerName', 
-                'span.a-size-extra-large.a-text-bold',
-                'h1.a-size-large',
-                'h1 span'
-            ]
-            
-            for selector in selectors:
-                name_element = soup.select_one(selector)
-                if name_element and name_element.text.strip():
-                    return name_element.text.strip()
-            
-            # Alternative: look for the seller name in the page title
-            title_element = soup.find('title')
-            if title_element:
-                title_text = title_element.text
-                # Amazon titles often have formats like "Seller Name: Amazon.co.uk Marketplace"
-                for separator in [':', '|', '-', '–']:
-                    if separator in title_text:
-                        return title_text.split(separator)[0].strip()
-            
-            # One more attempt: try to find "Amazon.co.uk: Seller Name" pattern
-            if title_element and 'Amazon' in title_element.text:
-                parts = title_element.text.split(':', 1)
-                if len(parts) > 1:
-                    return parts[1].strip()
-            
-            return None
+            with stage('extract'):
+                return self._extract_seller_name(response.content)
         except Exception as e:
             logger.error(f"Error getting seller name: {e}")
             return None
     
-    def get_seller_products(self, seller_id: str, force_refresh: bool = False) -> List[Dict[str, Any]]:
-        """
-        Get all products from a seller's storefront.
+    def _extract_seller_name(self, content: bytes) -> Optional[str]:
+        """Extract the seller's display name from a /sp?seller= page."""
+        with stage('parse'):
+            soup = parse_html(content)
         
-        Args:
-            seller_id: The Amazon seller ID
-            force_refresh: Whether to bypass cache and force a fresh scrape
-            
-        Returns:
-            List of products with ASIN, title, price, and other details
-        """
-        logger.info(f"Getting products for seller {seller_id}")
-        logger.info(f"Force refresh: {'Yes' if force_refresh else 'No'}")
+        # Try multiple selectors that might contain the seller name
+        selectors = [
+            'h1#sellerName', 
+            'span.a-size-extra-large.a-text-bold',
+            'h1.a-size-large',
+            'h1 span'
+        ]
         
-        # Try to get from cache first unless forced refresh
-        if not force_refresh:
-            cache_data = self._get_from_cache(seller_id)
-            if cache_data:
-                logger.info(f"Using cached data with {len(cache_data.get('products', []))} products")
-                return cache_data.get('products', [])
-        else:
-            logger.info(f"Bypassing cache due to force_refresh=True")
+        for selector in selectors:
+            name_element = soup.select_one(selector)
+            if name_element and name_element.text.strip():
+                return name_element.text.strip()
+        
+        # Alternative: look for the seller name in the page title
+        title_element = soup.find('title')
+        if title_element:
+            title_text = title_element.text
+            # Amazon titles often have formats like "Seller Name: Amazon.co.uk Marketplace"
+            for separator in [':', '|', '-', '–']:
+                if separator in title_text:
+                    return title_text.split(separator)[0].strip()
         
+        # One more attempt: try to find "Amazon.co.uk: Seller Name" pattern
+        if title_element and 'Amazon' in title_element.text:
+            parts = title_element.text.split(':', 1)
+            if len(parts) > 1:
+                return parts[1].strip()
+        
+        return None
+    
+    def _get_seller_urls(self, seller_id: str) -> List[str]:
+        """Get the list of storefront URL formats to try for a seller."""
         # Try multiple URL formats for Amazon seller pages
         # Enhanced list of URL patterns to try - more comprehensive for big sellers
-        urls_to_try = [
+        urls = [
             # Standard patterns
             f"{self.base_url}/s?i=merchant-items&me={seller_id}",
-            f"{self.base_url}/s?me={seller_id}&marketplaceID=A1F83G8C2ARO7P",  # UK marketplace ID
+            f"{self.base_url}/s?me={seller_id}&marketplaceID={self.site.marketplace_id}",
             f"{self.base_url}/s?k=*&me={seller_id}",  # Wildcard search for all items
             f"{self.base_url}/s?rh=n%3A%2Cp_6%3A{seller_id}",  # Alternative search format
             
@@ -311,155 +537,158 @@ class AmazonSellerScraper:
             f"{self.base_url}/shops/{seller_id}",  # Sometimes works for large sellers
             f"{self.base_url}/sp?seller={seller_id}",
             f"{self.base_url}/s?i=merchant-items&me={seller_id}&qid={int(time.time())}",  # Add timestamp to avoid caching
-            
-            # Category-specific searches for big sellers to get past pagination limits
-            f"{self.base_url}/s?i=merchant-items&me={seller_id}&rh=n%3A117332031", # Beauty category
-            f"{self.base_url}/s?i=merchant-items&me={seller_id}&rh=n%3A560798", # Books
-            f"{self.base_url}/s?i=merchant-items&me={seller_id}&rh=n%3A1025612", # Clothing
-            f"{self.base_url}/s?i=merchant-items&me={seller_id}&rh=n%3A560800", # Electronics
-            f"{self.base_url}/s?i=merchant-items&me={seller_id}&rh=n%3A11052681", # Home & Kitchen
         ]
+        if not self.site.marketplace_id:
+            urls = [url for url in urls if 'marketplaceID=' not in url]
         
-        products = []
-        seller_name = self.get_seller_name(seller_id) or "Unknown Seller"
+        # Category-specific searches for big sellers to get past pagination limits
+        urls.extend(f"{self.base_url}/s?i=merchant-items&me={seller_id}&rh=n%3A{node}" for node in self.site.category_nodes)
+        return urls
+    
+    def _check_page(self, url: str, page: int, response: Optional['requests.Response'],
+                    seller_id: str, seller_name: str) -> Tuple[Optional[ProductStore], bool]:
+        """
+        Validate a fetched storefront page and extract its products.
         
-        # Try each URL format and collect all unique products
-        total_pages_crawled = 0
-        logger.info(f"Attempting to get ALL products from seller {seller_id}")
+        Returns:
+            Tuple of (products, has_next_page). Products is None when crawling
+            this URL format should stop.
+        """
+        if not response:
+            logger.warning(f"Failed to get response for {url}")
+            return None, False
         
-        for base_url in urls_to_try:
+        # In a sweep with parser processes, the page is read in one of them
+        pool = current_pool()
+        if pool is None:
+            invalid, found_products, has_next = self._read_page(response, seller_id, seller_name)
+        else:
+            invalid, found_products, has_next = pool.run(
+                _read_page_in_worker, PageBody.from_response(response), self.marketplace, seller_id, seller_name
+            )
+        
+        if invalid:
+            logger.warning(f"Invalid seller page format: {url}")
+            return None, False
+        if found_products is None:
+            logger.warning(f"No product elements found on page {page}")
+        else:
+            count('pages')
+        return found_products, has_next
+    
+    def _crawl_url_format(self, base_url: str, seller_id: str, seller_name: str) -> Tuple[ProductStore, int, int]:
+        """
+        Crawl all pages of a single storefront URL format.
+        
+        Returns:
+            Tuple of (unique products found, pages crawled, requests made)
+        """
+        page = 1
+        more_pages = True
+        page_products = ProductStore()
+        pages_crawled = 0
+        requests_made = 0
+        
+        while more_pages and page <= 100:  # Check up to 100 pages to ensure we get full inventory
+            try:
+                # Add pagination parameter if not the first page
+                url = f"{base_url}&page={page}" if page > 1 else base_url
+                logger.info(f"Trying URL: {url} (page {page})")
                 
-            page = 1
-            more_pages = True
-            page_products = []
-            
-            while more_pages and page <= 100:  # Check up to 100 pages to ensure we get full inventory
-                try:
-                    # Add pagination parameter if not the first page
-                    url = f"{base_url}&page={page}" if page > 1 else base_url
-                    logger.info(f"Trying URL: {url} (page {page})")
-                    
-                    # Use our robust request method
-                    response = self._make_request(url)
-                    if not response:
-                        logger.warning(f"Failed to get response for {url}")
-                        break
-                    
-                    # First check if we got a valid seller page
-                    if "Sorry! We couldn't find that page" in response.text or "We're sorry" in response.text:
-                        logger.warning(f"Invalid seller page format: {url}")
-                        break
-                    
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Use even more comprehensive selectors to find products
-                    product_selectors = [
-                        'div[data-asin]:not([data-asin=""])', 
-                        '.s-result-item[data-asin]:not([data-asin=""])',
-                        '.sg-col-inner div[data-asin]',
-                        'div.a-section[data-asin]',
-                        'li.a-carousel-card[data-asin]',
-                        'div[data-component-type="s-search-result"]',
-                        'div.rush-component[data-asin]',
-                        '.s-main-slot div[data-asin]',
-                        '.widgetId\\=search-results div[data-asin]',
-                        'div[cel_widget_id*="MAIN-SEARCH_RESULTS"]',
-                        'div.s-card-container'
-                    ]
-                    
-                    found_products = False
-                    for selector in product_selectors:
-                        product_elements = soup.select(selector)
-                        if product_elements:
-                            found_products = True
-                            logger.info(f"Found {len(product_elements)} products with selector {selector}")
-                            total_pages_crawled += 1
-                            
-                            # Process each product
-                            for element in product_elements:
-                                asin = element.get('data-asin', '')
-                                if not asin or len(asin) != 10:  # Valid ASINs are 10 characters
-                                    continue
-                                
-                                # Try multiple selectors for product details
-                                title_selectors = ['.a-text-normal', 'h2 a span', '.a-size-base-plus', '.a-size-medium']
-                                price_selectors = ['.a-price .a-offscreen', '.a-price', '.a-color-price']
-                                
-                                # Get title
-                                title = None
-                                for title_selector in title_selectors:
-                                    title_element = element.select_one(title_selector)
-                                    if title_element and title_element.text.strip():
-                                        title = title_element.text.strip()
-                                        break
-                                
-                                if not title:
-                                    continue  # Skip products without title
-                                
-                                # Get price
-                                price_text = None
-                                for price_selector in price_selectors:
-                                    price_element = element.select_one(price_selector)
-                                    if price_element and price_element.text.strip():
-                                        price_text = price_element.text.strip()
-                                        break
-                                
-                                # Create the product entry
-                                product = {
-                                    'asin': asin,
-                                    'title': title,
-                                    'link': f"{self.base_url}/dp/{asin}",
-                                    'marketplace': f"Amazon {self.marketplace.upper()}",
-                                    'seller_id': seller_id,
-                                    'seller_name': seller_name
-                                }
-                                
-                                # Add price if available
-                                if price_text:
-                                    product['price_text'] = price_text
-                                
-                                # Check if we already have this product
-                                if not any(p['asin'] == asin for p in page_products):
-                                    page_products.append(product)
-                            
-                            break  # Break the selector loop if we found products
-                    
-                    if not found_products:
-                        logger.warning(f"No product elements found on page {page}")
-                        break
-                    
-                    # Check if there's a "Next" button for pagination
-                    next_button = soup.select_one('.a-pagination .a-last a')
-                    disabled = False
-                    
-                    # Safely check if the next button's parent has a disabled class
-                    if next_button and hasattr(next_button, 'parent') and next_button.parent:
-                        parent = next_button.parent
-                        if hasattr(parent, 'get') and callable(parent.get):
-                            parent_classes = parent.get('class', [])
-                            if parent_classes and isinstance(parent_classes, list):
-                                disabled = 'a-disabled' in parent_classes
-                    
-                    if not next_button or disabled:
-                        more_pages = False
-                    else:
-                        # Add a random delay between page requests
-                        time.sleep(random.uniform(3.0, 7.0))
-                        page += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error scraping page {page}: {e}")
+                # Use our robust request method
+                requests_made += 1
+                response = self._make_request(url)
+                found_products, has_next = self._check_page(url, page, response, seller_id, seller_name)
+                if found_products is None:
+                    break
+                
+                pages_crawled += 1
+                page_products.update(found_products)
+                
+                if not has_next:
                     more_pages = False
-            
-            # Add unique products from this URL format
-            for product in page_products:
-                if not any(p['asin'] == product['asin'] for p in products):
-                    products.append(product)
-            
-            if page_products:
-                logger.info(f"Found {len(page_products)} products for seller {seller_id} using format {base_url}")
-                logger.info(f"Running product count: {len(products)} unique products so far")
+                else:
+                    page += 1
+                
+            except Exception as e:
+                logger.error(f"Error scraping page {page}: {e}")
+                more_pages = False
+        
+        return page_products, pages_crawled, requests_made
+    
+    async def _crawl_url_format_async(self, base_url: str, seller_id: str, seller_name: str,
+                                      host_slots: 'asyncio.Semaphore') -> Tuple[ProductStore, int, int]:
+        """
+        Async version of _crawl_url_format.
+        
+        Each page fetch holds one of the host's slots, so at most `max_per_host`
+        requests are in flight per host. The pause between pages is taken
+        without holding a slot, letting other URL formats use the connection.
+        """
+        import asyncio
+        
+        page = 1
+        more_pages = True
+        page_products = ProductStore()
+        pages_crawled = 0
+        requests_made = 0
+        
+        while more_pages and page <= 100:
+            try:
+                url = f"{base_url}&page={page}" if page > 1 else base_url
+                logger.info(f"Trying URL: {url} (page {page})")
+                
+                requests_made += 1
+                async with host_slots:
+                    response = await asyncio.to_thread(self._make_request, url)
+                if current_pool() is None:
+                    found_products, has_next = self._check_page(url, page, response, seller_id, seller_name)
+                else:
+                    # Waiting for a parser process must not hold up the event loop
+                    found_products, has_next = await asyncio.to_thread(
+                        self._check_page, url, page, response, seller_id, seller_name
+                    )
+                if found_products is None:
+                    break
+                
+                pages_crawled += 1
+                page_products.update(found_products)
+                
+                if not has_next:
+                    more_pages = False
+                else:
+                    page += 1
+                
+            except Exception as e:
+                logger.error(f"Error scraping page {page}: {e}")
+                more_pages = False
+        
+        return page_products, pages_crawled, requests_made
+    
+    def _pattern_key(self, base_url: str, seller_id: str) -> str:
+        """Get the stable name of a URL format, used to keep planner stats."""
+        return re.sub(r'qid=\d+', 'qid=', base_url.replace(seller_id, '{seller_id}'))
+    
+    def _merge_url_format_results(self, seller_id: str, products: ProductStore, base_url: str,
+                                  crawl_result: Tuple[ProductStore, int, int], planner: UrlPatternPlanner) -> int:
+        """
+        Merge products found with one URL format into the combined product store.
         
+        Returns:
+            The number of pages crawled for this URL format
+        """
+        page_products, pages_crawled, requests_made = crawl_result
+        new_asins = products.update(page_products)
+        count('new_asins', new_asins)
+        planner.record(self._pattern_key(base_url, seller_id), requests_made, new_asins, requests_made - pages_crawled)
+        
+        if page_products:
+            logger.info(f"Found {len(page_products)} products for seller {seller_id} using format {base_url}")
+            logger.info(f"Running product count: {len(products)} unique products so far")
+        return pages_crawled
+    
+    def _finish_scan(self, seller_id: str, seller_name: str, products: List[Dict[str, Any]], total_pages_crawled: int) -> None:
+        """Save a completed scan to cache and log a summary."""
         # If we found products, save to cache
         if products:
             data = {
@@ -480,30 +709,373 @@ class AmazonSellerScraper:
                 
         else:
             logger.warning(f"No products found for seller {seller_id} after trying multiple approaches")
+    
+    def _plan_seller_urls(self, seller_id: str) -> Tuple[List[str], UrlPatternPlanner]:
+        """Get the URL formats worth trying for a seller, best first, with their planner."""
+        planner = UrlPatternPlanner(seller_id, self.marketplace)
+        urls_to_try = planner.plan(self._get_seller_urls(seller_id), key=lambda url: self._pattern_key(url, seller_id))
+        return urls_to_try, planner
+    
+    def _flight(self, seller_id: str) -> Flight:
+        """Get the single-flight lock for scanning a seller, shared with other processes."""
+        return Flight(f"{CACHE_NAMESPACE}_{seller_id}_{self.marketplace}")
+    
+    def _get_flight_result(self, seller_id: str, since: float) -> Optional[List[Dict[str, Any]]]:
+        """Get the products cached by a concurrent scan that finished after `since`."""
+        cache_data = self._get_from_cache(seller_id, max_age=time.time() - since)
+        if cache_data:
+            logger.info(f"Reusing the concurrent scan of seller {seller_id} ({len(cache_data.get('products', []))} products)")
+            return cache_data.get('products', [])
+        return None
+    
+    def get_seller_products(self, seller_id: str, force_refresh: bool = False, concurrency: int = 1,
+                            with_stats: bool = False) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Get all products from a seller's storefront.
         
-        return products
+        Args:
+            seller_id: The Amazon seller ID
+            force_refresh: Whether to bypass cache and force a fresh scrape
+            concurrency: Number of page requests allowed in flight per host.
+                Values above 1 use the async crawl engine.
+            with_stats: Return {'products': [...], 'stats': {...}} with the
+                scan's stage timings and counters (see scrape_stats)
+            
+        Returns:
+            List of products with ASIN, title, price, and other details
+        """
+        with scan_stats(CACHE_NAMESPACE, seller_id) as stats:
+            products = self._get_seller_products(seller_id, force_refresh, concurrency)
+        return {'products': products, 'stats': stats.to_dict()} if with_stats else products
+    
+    def _get_seller_products(self, seller_id: str, force_refresh: bool, concurrency: int) -> List[Dict[str, Any]]:
+        if concurrency > 1:
+            import asyncio
+            return asyncio.run(self.get_seller_products_async(seller_id, force_refresh, max_per_host=concurrency))
+        
+        logger.info(f"Getting products for seller {seller_id}")
+        logger.info(f"Force refresh: {'Yes' if force_refresh else 'No'}")
+        
+        # Try to get from cache first unless forced refresh
+        if not force_refresh:
+            cache_data = self._get_from_cache(seller_id, revalidate=True)
+            if cache_data:
+                logger.info(f"Using cached data with {len(cache_data.get('products', []))} products")
+                return cache_data.get('products', [])
+        else:
+            logger.info(f"Bypassing cache due to force_refresh=True")
+        
+        # Only one process scans a seller at a time; callers arriving meanwhile reuse its result
+        since = time.time()
+        with self._flight(seller_id) as waited:
+            products = self._get_flight_result(seller_id, since) if waited else None
+            return products if products is not None else self._scan_seller(seller_id)
+    
+    def _scan_seller(self, seller_id: str) -> List[Dict[str, Any]]:
+        """Crawl every planned URL format of a seller one page at a time and cache the result."""
+        urls_to_try, planner = self._plan_seller_urls(seller_id)
+        
+        products = ProductStore()
+        seller_name = self.get_seller_name(seller_id) or "Unknown Seller"
+        
+        # Try each URL format and collect all unique products
+        total_pages_crawled = 0
+        logger.info(f"Attempting to get ALL products from seller {seller_id}")
+        
+        for base_url in urls_to_try:
+            crawl_result = self._crawl_url_format(base_url, seller_id, seller_name)
+            total_pages_crawled += self._merge_url_format_results(seller_id, products, base_url, crawl_result, planner)
+        
+        planner.save()
+        product_list = products.to_list()
+        self._finish_scan(seller_id, seller_name, product_list, total_pages_crawled)
+        return product_list
+    
+    async def get_seller_products_async(self, seller_id: str, force_refresh: bool = False,
+                                        max_per_host: int = DEFAULT_MAX_PER_HOST,
+                                        with_stats: bool = False) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Get all products from a seller's storefront, crawling URL formats concurrently.
+        
+        Pages of different URL formats are fetched at the same time, with at most
+        `max_per_host` requests in flight per host and the shared rate limiter
+        spacing requests out. Results are merged in URL format order, so the
+        product list and cache match the sequential crawl.
+        
+        Args:
+            seller_id: The Amazon seller ID
+            force_refresh: Whether to bypass cache and force a fresh scrape
+            max_per_host: Maximum concurrent page requests per host
+            with_stats: Return {'products': [...], 'stats': {...}} as get_seller_products does
+            
+        Returns:
+            List of products with ASIN, title, price, and other details
+        """
+        with scan_stats(CACHE_NAMESPACE, seller_id) as stats:
+            products = await self._get_seller_products_async(seller_id, force_refresh, max_per_host)
+        return {'products': products, 'stats': stats.to_dict()} if with_stats else products
+    
+    async def _get_seller_products_async(self, seller_id: str, force_refresh: bool,
+                                         max_per_host: int) -> List[Dict[str, Any]]:
+        logger.info(f"Getting products for seller {seller_id} (async, {max_per_host} per host)")
+        logger.info(f"Force refresh: {'Yes' if force_refresh else 'No'}")
+        
+        if not force_refresh:
+            cache_data = self._get_from_cache(seller_id, revalidate=True)
+            if cache_data:
+                logger.info(f"Using cached data with {len(cache_data.get('products', []))} products")
+                return cache_data.get('products', [])
+        else:
+            logger.info(f"Bypassing cache due to force_refresh=True")
+        
+        # Only one process scans a seller at a time; callers arriving meanwhile reuse its result
+        import asyncio
+        since = time.time()
+        flight = self._flight(seller_id)
+        waited = await asyncio.to_thread(flight.enter)
+        try:
+            products = self._get_flight_result(seller_id, since) if waited else None
+            return products if products is not None else await self._scan_seller_async(seller_id, max_per_host)
+        finally:
+            flight.exit()
+    
+    async def _scan_seller_async(self, seller_id: str, max_per_host: int) -> List[Dict[str, Any]]:
+        """Crawl every planned URL format of a seller concurrently and cache the result."""
+        import asyncio
+        
+        urls_to_try, planner = self._plan_seller_urls(seller_id)
+        seller_name = await asyncio.to_thread(self.get_seller_name, seller_id) or "Unknown Seller"
+        
+        # Every URL format of a scraper shares the same host
+        host_slots = asyncio.Semaphore(max(1, max_per_host))
+        logger.info(f"Attempting to get ALL products from seller {seller_id}")
+        
+        results = await asyncio.gather(*(
+            self._crawl_url_format_async(base_url, seller_id, seller_name, host_slots)
+            for base_url in urls_to_try
+        ))
+        
+        products = ProductStore()
+        total_pages_crawled = 0
+        for base_url, crawl_result in zip(urls_to_try, results):
+            total_pages_crawled += self._merge_url_format_results(seller_id, products, base_url, crawl_result, planner)
+        
+        planner.save()
+        product_list = products.to_list()
+        self._finish_scan(seller_id, seller_name, product_list, total_pages_crawled)
+        return product_list
+
+    def get_seller_changes(self, seller_id: str, max_pages: int = DEFAULT_DELTA_MAX_PAGES,
+                           with_stats: bool = False) -> Dict[str, Any]:
+        """
+        Incrementally scan a seller for new, changed and missing products.
+        
+        Reads the storefront newest first (s=date-desc-rank) and stops at the
+        first page whose products are all already in the seller's cache, so a
+        seller without changes costs one or two requests. Without a cached
+        inventory, a full scan is run instead and every product counts as new.
+        
+        Args:
+            seller_id: The Amazon seller ID
+            max_pages: Maximum number of newest-first pages to read
+            with_stats: Add the scan's stage timings and counters under 'stats'
+            
+        Returns:
+            Dict with new, changed and missing products, the merged inventory
+            under 'products', whether the listing was read to its end
+            ('complete') and the number of requests made (None after a full scan)
+        """
+        with scan_stats(CACHE_NAMESPACE, seller_id) as stats:
+            delta = self._get_seller_changes(seller_id, max_pages)
+        if with_stats:
+            delta['stats'] = stats.to_dict()
+        return delta
+    
+    def _get_seller_changes(self, seller_id: str, max_pages: int) -> Dict[str, Any]:
+        logger.info(f"Checking seller {seller_id} for changes")
+        
+        cache_data = self._get_from_cache(seller_id, max_age=None)
+        if not cache_data or not cache_data.get('products'):
+            logger.info(f"No cached inventory for seller {seller_id}, running a full scan")
+            products = self.get_seller_products(seller_id, force_refresh=True)
+            if products:
+                record_check(seller_id, self.marketplace, None, None)
+            delta = build_delta([], ProductStore(products), complete=True)
+            delta['requests'] = None
+            return delta
+        
+        cached_products = cache_data['products']
+        known = ProductStore(cached_products)
+        seller_name = cache_data.get('seller_name') or "Unknown Seller"
+        base_url = f"{self.base_url}/s?i=merchant-items&me={seller_id}&s=date-desc-rank"
+        
+        seen = ProductStore()
+        complete = False
+        pages_crawled = 0
+        requests_made = 0
+        
+        for page in range(1, max_pages + 1):
+            url = f"{base_url}&page={page}" if page > 1 else base_url
+            logger.info(f"Trying URL: {url} (page {page})")
+            
+            requests_made += 1
+            response = self._make_request(url)
+            found_products, has_next = self._check_page(url, page, response, seller_id, seller_name)
+            if found_products is None:
+                break
+            
+            pages_crawled += 1
+            seen.update(found_products)
+            
+            if not has_next:
+                # Amazon stops paginating at its limit however many listings are left
+                complete = page < SEARCH_PAGE_LIMIT
+                if not complete:
+                    logger.info(f"Reached Amazon's {SEARCH_PAGE_LIMIT} page limit, not counting unseen products as delisted")
+                break
+            
+            # Newest listings come first, so a fully known page means we've caught up
+            if all(product['asin'] in known for product in found_products):
+                logger.info(f"Page {page} only has known products, stopping")
+                break
+        
+        delta = build_delta(cached_products, seen, complete)
+        delta['requests'] = requests_made
+        count('new_asins', len(delta['new']))
+        logger.info(f"Seller {seller_id}: {len(delta['new'])} new, {len(delta['changed'])} changed, "
+                    f"{len(delta['missing'])} missing after {requests_made} requests")
+        
+        # Only refresh the cache and the check schedule if we actually read something
+        if pages_crawled:
+            self._finish_scan(seller_id, seller_name, delta['products'], pages_crawled)
+            record_check(seller_id, self.marketplace, len(delta['new']), requests_made)
+        return delta
+
+# Page readers of the parser processes, by marketplace. Not scrapers: those
+# would load the proxy pool, whose exit handler would save stats loaded at spawn
+# over the ones the fetching process recorded during the sweep.
+_worker_readers: Dict[str, SellerPageReader] = {}
+
+def _read_page_in_worker(body: PageBody, marketplace: str, seller_id: str,
+                         seller_name: str) -> Tuple[bool, Optional[ProductStore], bool]:
+    """Read a fetched page in a parser process (see parse_pool)."""
+    reader = _worker_readers.get(marketplace)
+    if reader is None:
+        reader = _worker_readers[marketplace] = SellerPageReader(marketplace)
+    return reader._read_page(body, seller_id, seller_name)
+
+def _profiler(seller_id: str, profile: Union[bool, str]):
+    """Get a context profiling a scan if asked to; the profiling stack is only imported then."""
+    if not profile:
+        return nullcontext()
+    from scan_profiler import profiled
+    return profiled(f"{CACHE_NAMESPACE}-{seller_id}", profile)
 
 # Helper function to use from JavaScript
-def get_seller_products(seller_id: str, marketplace: str = "co.uk", force_refresh: bool = False) -> List[Dict[str, Any]]:
-    """Get products from an Amazon seller. This function can be called from Node.js."""
+def get_seller_products(seller_id: str, marketplace: str = "co.uk", force_refresh: bool = False,
+                        concurrency: int = 1, with_stats: bool = False,
+                        profile: Union[bool, str] = False) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Get products from an Amazon seller. This function can be called from Node.js.
+    
+    With with_stats, returns {'products': [...], 'stats': {...}} instead of the list.
+    With profile, the scan is profiled into the profile directory (or the
+    directory given as `profile`, see scan_profiler).
+    """
     try:
         scraper = AmazonSellerScraper(marketplace=marketplace)
-        products = scraper.get_seller_products(seller_id, force_refresh)
+        with _profiler(seller_id, profile):
+            products = scraper.get_seller_products(seller_id, force_refresh, concurrency, with_stats)
         return products
     except Exception as e:
         logger.error(f"Error in get_seller_products: {e}")
-        return []
+        return {'products': [], 'stats': None} if with_stats else []
+
+# Helper function to check a seller for new listings
+def get_seller_changes(seller_id: str, marketplace: str = "co.uk", with_stats: bool = False) -> Dict[str, Any]:
+    """Incrementally check a seller for new, changed and missing products. This function can be called from Node.js."""
+    try:
+        scraper = AmazonSellerScraper(marketplace=marketplace)
+        return scraper.get_seller_changes(seller_id, with_stats=with_stats)
+    except Exception as e:
+        logger.error(f"Error in get_seller_changes: {e}")
+        return {'new': [], 'changed': [], 'missing': [], 'products': [], 'complete': False, 'requests': 0}
+
+# Helper function to scan many sellers in one batch
+def scan_sellers(seller_ids: Optional[Iterable[str]] = None, marketplace: str = "co.uk", force_refresh: bool = False,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 parse_workers: int = DEFAULT_PARSE_WORKERS) -> Iterator[Dict[str, Any]]:
+    """
+    Scan several sellers over a bounded pool, yielding each result as it finishes.
+    
+    All scans share one scraper, so they use the marketplace's pooled session
+    (connections and cookies) and one per-host rate limiter.
+    
+    Args:
+        seller_ids: Amazon seller IDs to scan (default: all tracked sellers)
+        marketplace: Amazon marketplace
+        force_refresh: Whether to bypass cache and force fresh scrapes
+        max_workers: Maximum number of sellers scanned at the same time
+        parse_workers: Number of processes parsing the fetched pages, so
+            parsing uses more than one core (0 parses in the scanning threads)
+        
+    Yields:
+        Dicts with seller_id, marketplace, products, error and elapsed seconds
+    """
+    scraper = AmazonSellerScraper(marketplace=marketplace)
+    # Size the connection pool so concurrent scans don't discard connections
+    SESSION_POOL.reserve(max_workers)
+    
+    with sweep_pool(parse_workers) as pool:
+        def scan(seller_id: str) -> List[Dict[str, Any]]:
+            with use_pool(pool):
+                return scraper.get_seller_products(seller_id, force_refresh)
+        
+        yield from run_batch(scan, seller_ids, marketplace, max_workers)
+
+# Helper function to scan one seller on several marketplaces
+def scan_marketplaces(seller_id: str, marketplaces: Optional[Iterable[str]] = None,
+                      force_refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Scan a seller on several marketplaces at the same time. This function can be called from Node.js.
+    
+    Each marketplace gets its own scraper, pooled session and cookies, and its
+    requests are paced by the rate limit of its own host.
+    
+    Args:
+        seller_id: The Amazon seller ID
+        marketplaces: Marketplaces to scan (default: every registered one)
+        force_refresh: Whether to bypass cache and force fresh scrapes
+        
+    Returns:
+        Dict of marketplace -> dict with products, error and elapsed seconds
+    """
+    marketplaces = list(dict.fromkeys(marketplaces or MARKETPLACES))
+    scrapers = {marketplace: AmazonSellerScraper(marketplace=marketplace) for marketplace in marketplaces}
+    return run_marketplaces(lambda marketplace: scrapers[marketplace].get_seller_products(seller_id, force_refresh),
+                            seller_id, marketplaces)
 
 # Helper function to get seller name only
-def get_seller_name(seller_id: str, marketplace: str = "co.uk") -> Optional[str]:
+def get_seller_name(seller_id: str, marketplace: str = "co.uk", force_refresh: bool = False) -> Optional[str]:
     """Get just the seller's name. This function can be called from Node.js."""
     try:
         scraper = AmazonSellerScraper(marketplace=marketplace) 
-        return scraper.get_seller_name(seller_id)
+        return scraper.get_seller_name(seller_id, force_refresh)
     except Exception as e:
         logger.error(f"Error in get_seller_name: {e}")
         return None
 
+# Helper function to get the names of many sellers at once
+def get_seller_names(seller_ids: Iterable[str], marketplace: str = "co.uk", force_refresh: bool = False,
+                     max_workers: int = DEFAULT_MAX_WORKERS) -> Dict[str, Optional[str]]:
+    """Get the names of several sellers, fetching only uncached ones. This function can be called from Node.js."""
+    try:
+        scraper = AmazonSellerScraper(marketplace=marketplace)
+        return scraper.get_seller_names(seller_ids, force_refresh, max_workers)
+    except Exception as e:
+        logger.error(f"Error in get_seller_names: {e}")
+        return {}
+
 # Test function
 def test_scraper(seller_id: str) -> None:
     """Test the scraper with a specific seller ID."""
@@ -0,0 +1,86 @@
+"""
+Parser Backend Equivalence Check
+
+Runs both product extraction paths over the fixture corpus twice: once with
+the original setup (html.parser, whole document, no fast-path extractor) and
+once with the configured parser backend and fast path (and results-region
+parsing, with SCRAPER_PARSE_RESULTS_ONLY=1). Exits non-zero if any page yields
+different products. Run it over a corpus of recorded pages with results-region
+parsing on before enabling that in production.
+
+Usage: python benchmarks/check_parser_equivalence.py [--corpus <dir>]
+"""
+
+import os
+import sys
+import argparse
+import logging
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fast_extract
+import html_parser_backend
+import enhanced_amazon_scraper
+from amazon_scraper import AmazonSellerScraper
+from fixture_corpus import load_corpus
+
+SELLER_ID = 'A25WS8YVXEJW8B'
+
+
+class RecordedResponse:
+    """Stand-in for requests.Response holding a recorded page."""
+
+    def __init__(self, html: str):
+        self.text = html
+        self.content = html.encode('utf-8')
+        self.status_code = 200
+
+
+def extract_all(html: str, scraper: AmazonSellerScraper) -> Dict[str, Any]:
+    """Run both extraction paths over one page."""
+    products, has_next = scraper._parse_page(RecordedResponse(html), SELLER_ID, 'Seller')
+    return {
+        'amazon_scraper': (products.to_list() if products is not None else None, has_next),
+        'enhanced_amazon_scraper': enhanced_amazon_scraper.extract_products_from_search_page(html, SELLER_ID),
+    }
+
+
+def run(corpus: Dict[str, str], parser: str, restrict: bool, fast_path: bool) -> Dict[str, Dict[str, Any]]:
+    """Extract products from every page with the given backend settings."""
+    html_parser_backend.PARSER = parser
+    html_parser_backend.RESTRICT_TO_RESULTS = restrict
+    fast_extract.ENABLED = fast_path
+    scraper = AmazonSellerScraper()
+    return {name: extract_all(html, scraper) for name, html in corpus.items()}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check parser backends extract identical products")
+    parser.add_argument('--corpus', help="Directory of recorded .html pages (default: synthetic corpus)")
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    corpus = load_corpus(args.corpus)
+    configured = (html_parser_backend.get_parser(), html_parser_backend.RESTRICT_TO_RESULTS, fast_extract.ENABLED)
+
+    baseline = run(corpus, 'html.parser', False, False)
+    candidate = run(corpus, *configured)
+
+    mismatches = 0
+    for name in corpus:
+        for path, expected in baseline[name].items():
+            if candidate[name][path] != expected:
+                mismatches += 1
+                print(f"MISMATCH {name} [{path}]")
+            else:
+                count = len(expected[0] or []) if path == 'amazon_scraper' else len(expected)
+                print(f"ok       {name} [{path}] {count} products")
+
+    print(f"\nBackend {configured[0]} (results region only: {configured[1]}, fast path: {configured[2]}): "
+          f"{mismatches} mismatches across {len(corpus)} pages")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
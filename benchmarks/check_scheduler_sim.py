@@ -0,0 +1,200 @@
+"""
+Seller Check Scheduler Simulation
+
+Replays when sellers listed new products and checks them the way the
+adaptive check scheduler would, and the way fixed intervals (the scrapers'
+24 and 12 hour cache TTLs) would. Reports, for each policy, the requests spent
+and the detection latency: how long after a listing appeared a check found it.
+
+Listing times come from generated sellers of a few kinds (hourly, daily,
+weekly, bursty and dormant listers), or with --from-cache from the check
+history recorded in the scraper cache: every check that found new ASINs is
+replayed as one listing at a random time since the previous check.
+
+Usage: python benchmarks/check_scheduler_sim.py [--days 14] [--sellers-per-kind 10]
+                                                [--budget 60] [--from-cache [marketplace]] [--json]
+"""
+
+import os
+import sys
+import json
+import bisect
+import random
+import argparse
+import statistics
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from check_scheduler import CheckScheduler, MIN_INTERVAL, MAX_INTERVAL
+from scraper_cache import get_cache
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Simulated time between scheduler polls (the bot's check loop)
+TICK = 5 * 60
+
+# kind -> function(rng, duration) returning listing times since the start
+SELLER_KINDS = {
+    'hourly': lambda rng, duration: _poisson(rng, 0, duration, 2 * HOUR),
+    'daily': lambda rng, duration: _poisson(rng, 0, duration, DAY),
+    'weekly': lambda rng, duration: _poisson(rng, 0, duration, 7 * DAY),
+    # A busy spell of a couple of days, quiet otherwise
+    'bursty': lambda rng, duration: _poisson(rng, duration / 2, duration / 2 + 2 * DAY, HOUR),
+    'dormant': lambda rng, duration: [],
+}
+
+
+def _poisson(rng: random.Random, start: float, end: float, mean_gap: float) -> List[float]:
+    """Get the event times of a Poisson process between start and end."""
+    times = []
+    t = start + rng.expovariate(1 / mean_gap)
+    while t < end:
+        times.append(t)
+        t += rng.expovariate(1 / mean_gap)
+    return times
+
+
+def generated_listings(sellers_per_kind: int, duration: float, seed: int) -> Dict[str, Dict[str, Any]]:
+    """Get listing times for generated sellers of every kind."""
+    rng = random.Random(seed)
+    return {
+        f"{kind}-{i}": {'kind': kind, 'listings': make(rng, duration)}
+        for kind, make in SELLER_KINDS.items()
+        for i in range(sellers_per_kind)
+    }
+
+
+def recorded_listings(marketplace: str, seed: int) -> Dict[str, Dict[str, Any]]:
+    """Get listing times replayed from the checks recorded in the scraper cache, since the earliest check."""
+    cache = get_cache()
+    seller_ids = [row[0] for row in cache._connect().execute(
+        "SELECT DISTINCT seller_id FROM seller_checks WHERE marketplace = ?", (marketplace,)
+    )]
+    history = cache.get_seller_checks(seller_ids, marketplace)
+    if not history:
+        raise SystemExit(f"No recorded checks for {marketplace}")
+
+    rng = random.Random(seed)
+    start = min(checks[0][0] for checks in history.values())
+    sellers = {}
+    for seller_id, checks in history.items():
+        listings = []
+        for (previous, _, _), (checked_at, new_asins, _) in zip(checks, checks[1:]):
+            if new_asins:
+                listings.append(rng.uniform(previous, checked_at) - start)
+        sellers[seller_id] = {'kind': 'recorded', 'listings': listings}
+    return sellers
+
+
+def simulate(scheduler: CheckScheduler, sellers: Dict[str, Dict[str, Any]], duration: float) -> Dict[str, Any]:
+    """Run a policy over the listings, returning its requests and detection latencies (hours)."""
+    scheduler.set_sellers(sellers)
+    last_check = dict.fromkeys(sellers, 0.0)
+    latencies: Dict[str, List[float]] = {seller_id: [] for seller_id in sellers}
+    requests = dict.fromkeys(sellers, 0)
+
+    t = 0.0
+    while t <= duration:
+        for seller_id in scheduler.take_due(now=t):
+            listings = sellers[seller_id]['listings']
+            found = listings[bisect.bisect_right(listings, last_check[seller_id]):bisect.bisect_right(listings, t)]
+            latencies[seller_id].extend((t - listed) / HOUR for listed in found)
+            # A delta check reads one page, and one more when the first had new products
+            cost = 1 + bool(found)
+            requests[seller_id] += cost
+            scheduler.record(seller_id, len(found), cost, checked_at=t)
+            last_check[seller_id] = t
+        t += TICK
+
+    undetected = sum(
+        len(seller['listings']) - bisect.bisect_right(seller['listings'], last_check[seller_id])
+        for seller_id, seller in sellers.items()
+    )
+    return {'requests': requests, 'latencies': latencies, 'undetected': undetected}
+
+
+def summarize(result: Dict[str, Any], sellers: Dict[str, Dict[str, Any]], duration: float) -> Dict[str, Any]:
+    """Get a policy's totals, overall and by seller kind."""
+
+    def totals(seller_ids: List[str]) -> Dict[str, Any]:
+        latencies = sorted(latency for seller_id in seller_ids for latency in result['latencies'][seller_id])
+        requests = sum(result['requests'][seller_id] for seller_id in seller_ids)
+        return {
+            'requests': requests,
+            'requests_per_hour': requests / (duration / HOUR),
+            'detected': len(latencies),
+            'mean_latency_h': statistics.fmean(latencies) if latencies else None,
+            'p90_latency_h': latencies[int(0.9 * (len(latencies) - 1))] if latencies else None,
+        }
+
+    kinds: Dict[str, List[str]] = {}
+    for seller_id, seller in sellers.items():
+        kinds.setdefault(seller['kind'], []).append(seller_id)
+    return {
+        **totals(list(sellers)),
+        'undetected': result['undetected'],
+        'kinds': {kind: totals(seller_ids) for kind, seller_ids in kinds.items()},
+    }
+
+
+def _hours(value: Optional[float]) -> str:
+    return f"{value:7.1f}" if value is not None else '      -'
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare adaptive seller checks with fixed intervals")
+    parser.add_argument('--days', type=float, default=14, help="Simulated days")
+    parser.add_argument('--sellers-per-kind', type=int, default=10, help="Generated sellers of each kind")
+    parser.add_argument('--budget', type=float, default=60, help="Adaptive schedule's requests per hour")
+    parser.add_argument('--changes-per-check', type=float, default=1.0,
+                        help="Expected changes between checks the adaptive schedule aims for")
+    parser.add_argument('--from-cache', nargs='?', const='co.uk', metavar='MARKETPLACE',
+                        help="Replay the check history recorded in the scraper cache")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.from_cache:
+        sellers = recorded_listings(args.from_cache, args.seed)
+        duration = max((max(s['listings'], default=0) for s in sellers.values()), default=0) + DAY
+    else:
+        duration = args.days * DAY
+        sellers = generated_listings(args.sellers_per_kind, duration, args.seed)
+
+    def scheduler(**settings) -> CheckScheduler:
+        return CheckScheduler(load_history=False, clock=lambda: 0.0, **settings)
+
+    policies = {
+        'adaptive': scheduler(hourly_budget=args.budget, changes_per_check=args.changes_per_check,
+                              min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL),
+        'fixed 24h': scheduler(hourly_budget=float('inf'), min_interval=DAY, max_interval=DAY),
+        'fixed 12h': scheduler(hourly_budget=float('inf'), min_interval=12 * HOUR, max_interval=12 * HOUR),
+    }
+    results = {name: summarize(simulate(policy, sellers, duration), sellers, duration)
+               for name, policy in policies.items()}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    listings = sum(len(seller['listings']) for seller in sellers.values())
+    print(f"{len(sellers)} sellers, {listings} listings over {duration / DAY:.1f} days, "
+          f"adaptive budget {args.budget:g} requests/hour\n")
+    print(f"{'policy':10} {'requests':>9} {'req/hour':>9} {'mean h':>7} {'p90 h':>7} {'undetected':>10}")
+    for name, r in results.items():
+        print(f"{name:10} {r['requests']:9} {r['requests_per_hour']:9.1f} {_hours(r['mean_latency_h'])} "
+              f"{_hours(r['p90_latency_h'])} {r['undetected']:10}")
+
+    print(f"\nBy seller kind (requests / mean latency in hours):")
+    print(f"{'kind':10}" + ''.join(f" {name:>18}" for name in results))
+    for kind in next(iter(results.values()))['kinds']:
+        cells = ''.join(
+            f" {r['kinds'][kind]['requests']:8} /{_hours(r['kinds'][kind]['mean_latency_h'])}" for r in results.values()
+        )
+        print(f"{kind:10}{cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+HTML Fixture Corpus
+
+This module provides the Amazon page corpus used by the parser checks and
+benchmarks. Pages recorded from real scrapes can be saved as .html files in a
+directory and loaded with load_corpus; when no directory is given, a
+deterministic synthetic corpus with the same layouts is generated instead.
+
+File names start with the page kind: search_*, storefront_* or seller_*.
+
+Usage: python benchmarks/fixture_corpus.py --write <dir>
+"""
+
+import os
+import sys
+import random
+import argparse
+from html import escape
+from typing import Dict, List, Optional
+
+PAGE_KINDS = ('search', 'storefront', 'seller')
+
+# Inline script/style filler, standing in for the bulk of a real results page
+_FILLER_CHUNK = (
+    '<script type="text/javascript">P.when("A").execute(function(A){'
+    'var s="s-result-item"; A.declarative("s-search", "click", function(e){});});</script>\n'
+    '<style>.a-price{display:inline-block}.s-card-container{position:relative;padding:4px}</style>\n'
+)
+
+_TITLE_WORDS = [
+    'Wireless', 'Bluetooth', 'Headphones', 'Stainless', 'Steel', 'Kitchen', 'Organiser',
+    'Premium', 'Charger', 'USB-C', 'Cable', 'Pack', 'Kids', 'Toy', 'Set', 'Garden', 'Hose',
+    'LED', 'Lamp', 'Café', 'Crème', 'Pro', 'Max', 'Mini', 'Case', '2-in-1', 'Travel', 'Mug',
+]
+
+
+def _asin(rng: random.Random) -> str:
+    return 'B0' + ''.join(rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ0123456789') for _ in range(8))
+
+
+def _title(rng: random.Random) -> str:
+    words = ' '.join(rng.choice(_TITLE_WORDS) for _ in range(rng.randint(3, 12)))
+    # Some titles carry characters that need escaping
+    return words + (' & Accessories' if rng.random() < 0.1 else '')
+
+
+def _price(rng: random.Random) -> Optional[str]:
+    if rng.random() < 0.15:
+        return None
+    return f"£{rng.randint(1, 400)}.{rng.randint(0, 99):02d}"
+
+
+def _filler(size_kb: int) -> str:
+    if size_kb <= 0:
+        return ''
+    return _FILLER_CHUNK * (size_kb * 1024 // len(_FILLER_CHUNK) + 1)
+
+
+def _price_html(price: Optional[str]) -> str:
+    if not price:
+        return ''
+    return (f'<span class="a-price" data-a-size="xl" data-a-color="base">'
+            f'<span class="a-offscreen">{price}</span>'
+            f'<span aria-hidden="true"><span class="a-price-symbol">£</span>'
+            f'<span class="a-price-whole">{price[1:].split(".")[0]}</span></span></span>')
+
+
+def _search_result(rng: random.Random, index: int, layout: str) -> str:
+    asin = _asin(rng)
+    title = escape(_title(rng))
+    price = _price(rng)
+    sponsored = rng.random() < 0.05
+
+    label = ('<span class="s-label-popover-default"><span class="a-color-secondary">Sponsored</span></span>'
+             if sponsored else '')
+
+    if layout == 'list':
+        return (
+            f'<div data-asin="{asin}" data-index="{index}" data-uuid="u{index}" '
+            f'data-component-type="s-search-result" '
+            f'class="sg-col-20-of-24 s-result-item s-asin sg-col-0-of-12 sg-col-16-of-20 sg-col s-widget-spacing-small">'
+            f'<div class="sg-col-inner"><div cel_widget_id="MAIN-SEARCH_RESULTS-{index}" class="s-widget-container">'
+            f'<div class="s-card-container s-overflow-hidden aok-relative">'
+            f'<div class="a-section a-spacing-small">{label}'
+            f'<h2 class="a-size-mini a-spacing-none a-color-base s-line-clamp-2">'
+            f'<a class="a-link-normal s-underline-text s-link-style a-text-normal" href="/dp/{asin}">'
+            f'<span class="a-size-medium a-color-base a-text-normal">{title}</span></a></h2>'
+            f'<div class="a-row a-size-base a-color-base">{_price_html(price)}</div>'
+            f'</div></div></div></div></div>\n'
+        )
+
+    # Grid layout with smaller titles
+    return (
+        f'<div data-asin="{asin}" data-index="{index}" data-component-type="s-search-result" '
+        f'class="sg-col-4-of-24 sg-col-4-of-12 s-result-item s-asin sg-col-4-of-16 sg-col sg-col-4-of-20">'
+        f'<div class="sg-col-inner"><div class="s-card-container s-overflow-hidden">'
+        f'<div class="a-section a-spacing-base">{label}'
+        f'<h2 class="a-size-mini"><a class="a-link-normal s-link-style" href="/dp/{asin}">'
+        f'<span class="a-size-base-plus a-color-base a-text-normal">  {title}\n</span></a></h2>'
+        f'<div class="a-row">{_price_html(price)}</div>'
+        f'</div></div></div></div>\n'
+    )
+
+
+def _pagination(has_next: bool) -> str:
+    last = ('<li class="a-last"><a href="/s?i=merchant-items&amp;page=2">Next<span class="a-letter-space"></span>→</a></li>'
+            if has_next else '<li class="a-disabled a-last">Next<span class="a-letter-space"></span>→</li>')
+    return (f'<div class="a-section a-text-center s-pagination-container">'
+            f'<ul class="a-pagination"><li class="a-selected"><a href="#">1</a></li>{last}</ul></div>')
+
+
+def search_page(rng: random.Random, products: int, layout: str = 'list', has_next: bool = True,
+                filler_kb: int = 0) -> str:
+    """Build a search results page in one of Amazon's result layouts."""
+    results = ''.join(_search_result(rng, i, layout) for i in range(products))
+    # Non-product rows in the results slot carry an empty data-asin
+    header = '<div data-asin="" data-index="0" class="sg-col-20-of-24 s-result-item sg-col-0-of-12"><span>Results</span></div>\n'
+    return (
+        '<!doctype html><html lang="en-gb"><head><meta charset="utf-8">'
+        '<title>Amazon.co.uk : Seller Products</title>'
+        f'{_filler(filler_kb)}</head><body>'
+        '<div id="nav-main"><a href="/">Amazon</a></div>'
+        '<div class="s-desktop-width-max s-desktop-content sg-row">'
+        '<div class="s-main-slot s-result-list s-search-results sg-row">'
+        f'{header}{results}'
+        f'<div data-asin="" data-index="{products + 1}" class="s-result-item">{_pagination(has_next)}</div>'
+        '</div></div>'
+        '<div id="navFooter"><a href="/help">Help</a></div>'
+        '</body></html>'
+    )
+
+
+def storefront_page(rng: random.Random, products: int, filler_kb: int = 0) -> str:
+    """Build a brand/storefront page with carousel cards and no search results slot."""
+    cards = ''.join(
+        f'<li class="a-carousel-card" role="listitem" data-asin="{_asin(rng)}">'
+        f'<div class="a-section"><a class="a-link-normal" href="#">'
+        f'<span class="a-size-base-plus">{escape(_title(rng))}</span></a>'
+        f'<span class="a-color-price">{_price(rng) or ""}</span></div></li>'
+        for _ in range(products)
+    )
+    return (
+        '<!doctype html><html><head><title>Seller Storefront</title>'
+        f'{_filler(filler_kb)}</head><body>'
+        f'<div class="a-carousel-viewport"><ol class="a-carousel">{cards}</ol></div>'
+        '</body></html>'
+    )
+
+
+def seller_page(rng: random.Random, filler_kb: int = 0, layout: str = 'heading') -> str:
+    """
+    Build a /sp?seller= seller profile page.
+
+    The name is in h1#sellerName ('heading'), in a bold extra-large span
+    ('span'), or only in the page title ('title').
+    """
+    name = escape(' '.join(rng.choice(_TITLE_WORDS) for _ in range(2))) + ' Ltd'
+    if layout == 'heading':
+        name_html = f'<h1 id="sellerName" class="a-size-large">{name}</h1>'
+    elif layout == 'span':
+        name_html = f'<div class="a-row"><span class="a-size-extra-large a-text-bold">{name}</span></div>'
+    else:
+        name_html = ''
+    return (
+        f'<!doctype html><html><head><title>{name}: Amazon.co.uk</title>'
+        f'{_filler(filler_kb)}</head><body>'
+        f'<div id="seller-profile-container">{name_html}'
+        '<div class="a-row"><span>Seller rating: 4.7 out of 5</span></div></div>'
+        '</body></html>'
+    )
+
+
+def build_corpus(seed: int = 1) -> Dict[str, str]:
+    """
+    Build the synthetic corpus.
+
+    Returns:
+        Dict of file name to page HTML, covering every page kind, both result
+        layouts, last pages, and sizes from a few KB up to ~2 MB
+    """
+    rng = random.Random(seed)
+    corpus = {
+        'search_list_small.html': search_page(rng, 16, 'list'),
+        'search_list_last_page.html': search_page(rng, 9, 'list', has_next=False),
+        'search_grid_medium.html': search_page(rng, 48, 'grid', filler_kb=200),
+        'search_list_large.html': search_page(rng, 60, 'list', filler_kb=900),
+        'search_grid_large.html': search_page(rng, 60, 'grid', filler_kb=900),
+        'search_empty.html': search_page(rng, 0, 'list', has_next=False),
+        'search_grid_xlarge.html': search_page(rng, 60, 'grid', filler_kb=2000),
+        'storefront_carousel.html': storefront_page(rng, 24, filler_kb=100),
+        'storefront_large.html': storefront_page(rng, 96, filler_kb=600),
+        'seller_profile.html': seller_page(rng, filler_kb=50),
+        'seller_profile_span.html': seller_page(rng, filler_kb=300, layout='span'),
+        'seller_profile_title_only.html': seller_page(rng, filler_kb=20, layout='title'),
+    }
+    # The results slot class can also appear in inline scripts of pages without it
+    corpus['storefront_script_marker.html'] = corpus['storefront_carousel.html'].replace(
+        '</head>', '<script>var slot = "s-main-slot";</script></head>'
+    )
+    # Layout variants the fast-path extractor must hand over to BeautifulSoup:
+    # titles without the a-text-normal class, and a result whose ASIN is only
+    # in data-component-props
+    corpus['search_list_variant_titles.html'] = corpus['search_list_small.html'].replace(
+        ' a-text-normal"', '"'
+    )
+    corpus['search_list_variant_props.html'] = corpus['search_list_last_page.html'].replace(
+        '<div data-asin="" data-index="0" class="sg-col-20-of-24 s-result-item sg-col-0-of-12">',
+        '<div data-asin="" data-index="0" data-component-props="{&quot;asin&quot;:&quot;B0PROPS001&quot;}" '
+        'class="sg-col-20-of-24 s-result-item sg-col-0-of-12">'
+    )
+    return corpus
+
+
+def load_corpus(directory: Optional[str] = None) -> Dict[str, str]:
+    """Load recorded pages from a directory, or build the synthetic corpus."""
+    if not directory:
+        return build_corpus()
+
+    corpus = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.html'):
+            with open(os.path.join(directory, name), 'r', encoding='utf-8', errors='ignore') as f:
+                corpus[name] = f.read()
+    return corpus
+
+
+def page_kind(name: str) -> str:
+    """Get the page kind from a corpus file name."""
+    prefix = name.split('_', 1)[0]
+    return prefix if prefix in PAGE_KINDS else 'search'
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Write the synthetic HTML fixture corpus")
+    parser.add_argument('--write', required=True, help="Directory to write the .html files into")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus()
+    os.makedirs(args.write, exist_ok=True)
+    for name, html in corpus.items():
+        with open(os.path.join(args.write, name), 'w', encoding='utf-8') as f:
+            f.write(html)
+    print(f"Wrote {len(corpus)} pages to {args.write}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
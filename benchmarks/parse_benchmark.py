@@ -0,0 +1,221 @@
+"""
+Offline Parsing Benchmark
+
+Times every extraction path of both scrapers over the fixture corpus, without
+any network access:
+
+    amazon_scraper.products             AmazonSellerScraper._parse_page
+    enhanced_amazon_scraper.products    extract_products_from_search_page
+    amazon_scraper.seller_name          AmazonSellerScraper._extract_seller_name
+    enhanced_amazon_scraper.seller_name extract_seller_name
+
+Product paths run over search and storefront pages, seller name paths over
+seller pages. For each path it reports pages/s, ms/page, products/s and peak
+traced memory, and can save the results as JSON and compare them with an
+earlier run. Product paths also report the share of pages the fast-path
+extractor (fast_extract) handled and how much faster they ran than with
+BeautifulSoup alone.
+
+Usage: python benchmarks/parse_benchmark.py [--corpus <dir>] [--repeat 5]
+                                            [--output results.json] [--compare baseline.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import platform
+import statistics
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fast_extract
+import html_parser_backend
+import enhanced_amazon_scraper
+from amazon_scraper import AmazonSellerScraper
+from fixture_corpus import load_corpus, page_kind
+from check_parser_equivalence import RecordedResponse, SELLER_ID
+from scrape_stats import scan_stats
+
+# Slowdown in ms/page, as a share, that --compare reports as a regression (runs vary by ~10%)
+REGRESSION_THRESHOLD = 0.25
+
+
+def extraction_paths(scraper: AmazonSellerScraper) -> Dict[str, Tuple[Tuple[str, ...], Callable[[str], int]]]:
+    """Get each extraction path's page kinds and a function returning the items it extracts from a page."""
+
+    def amazon_products(html: str) -> int:
+        products, _ = scraper._parse_page(RecordedResponse(html), SELLER_ID, 'Seller')
+        return len(products) if products is not None else 0
+
+    def enhanced_products(html: str) -> int:
+        return len(enhanced_amazon_scraper.extract_products_from_search_page(html, SELLER_ID))
+
+    def amazon_seller_name(html: str) -> int:
+        return int(bool(scraper._extract_seller_name(html.encode('utf-8'))))
+
+    def enhanced_seller_name(html: str) -> int:
+        return int(bool(enhanced_amazon_scraper.extract_seller_name(html)))
+
+    return {
+        'amazon_scraper.products': (('search', 'storefront'), amazon_products),
+        'enhanced_amazon_scraper.products': (('search', 'storefront'), enhanced_products),
+        'amazon_scraper.seller_name': (('seller',), amazon_seller_name),
+        'enhanced_amazon_scraper.seller_name': (('seller',), enhanced_seller_name),
+    }
+
+
+def time_page(extract: Callable[[str], int], html: str, repeat: int) -> Tuple[List[float], int]:
+    """Time `repeat` runs over one page, returning the timings and the items extracted."""
+    timings = []
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = extract(html)
+        timings.append(time.perf_counter() - start)
+    return timings, items
+
+
+def measure_page(extract: Callable[[str], int], html: str, repeat: int) -> Dict[str, Any]:
+    """Time one page (best of `repeat` runs) and measure its peak traced memory."""
+    timings, items = time_page(extract, html, repeat)
+
+    # Measured in a separate run, since tracing slows parsing down
+    tracemalloc.start()
+    extract(html)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'bytes': len(html.encode('utf-8')),
+        'items': items,
+        'ms': min(timings) * 1000,
+        'median_ms': statistics.median(timings) * 1000,
+        'peak_memory_kb': peak / 1024,
+    }
+
+
+def run(corpus: Dict[str, str], repeat: int) -> Dict[str, Any]:
+    """Benchmark every extraction path over the pages of its kinds."""
+    scraper = AmazonSellerScraper()
+    results = {}
+
+    for path, (kinds, extract) in extraction_paths(scraper).items():
+        pages = {name: html for name, html in corpus.items() if page_kind(name) in kinds}
+        if not pages:
+            continue
+
+        # Warm up imports and selector caches
+        extract(next(iter(pages.values())))
+        per_page = {name: measure_page(extract, html, repeat) for name, html in pages.items()}
+
+        total_seconds = sum(page['ms'] for page in per_page.values()) / 1000
+        total_items = sum(page['items'] for page in per_page.values())
+        results[path] = {
+            'pages': len(per_page),
+            'pages_per_s': len(per_page) / total_seconds if total_seconds else 0.0,
+            'ms_per_page': total_seconds * 1000 / len(per_page),
+            'items_per_s': total_items / total_seconds if total_seconds else 0.0,
+            'peak_memory_kb': max(page['peak_memory_kb'] for page in per_page.values()),
+            'per_page': per_page,
+        }
+        if path.endswith('.products'):
+            results[path].update(measure_fast_path(extract, pages, per_page, repeat))
+    return results
+
+
+def measure_fast_path(extract: Callable[[str], int], pages: Dict[str, str], per_page: Dict[str, Any],
+                      repeat: int) -> Dict[str, Any]:
+    """Count the pages the fast path handles and time the same pages with BeautifulSoup alone."""
+    fast_pages = 0
+    for name, html in pages.items():
+        with scan_stats('parse_benchmark') as stats:
+            extract(html)
+        per_page[name]['fast_path'] = stats.counters['fast_path_pages'] > 0
+        fast_pages += per_page[name]['fast_path']
+
+    enabled = fast_extract.ENABLED
+    fast_extract.ENABLED = False
+    try:
+        for name, html in pages.items():
+            per_page[name]['soup_ms'] = min(time_page(extract, html, repeat)[0]) * 1000
+    finally:
+        fast_extract.ENABLED = enabled
+
+    fast_ms = sum(page['ms'] for page in per_page.values() if page['fast_path'])
+    soup_ms = sum(page['soup_ms'] for page in per_page.values() if page['fast_path'])
+    return {
+        'fast_path_share': fast_pages / len(pages),
+        'soup_ms_per_page': sum(page['soup_ms'] for page in per_page.values()) / len(pages),
+        # Over the pages the fast path handled
+        'fast_path_speedup': soup_ms / fast_ms if fast_ms else None,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Print the change in ms/page against a baseline run, returning the regressed paths."""
+    regressions = []
+    for path, current in results.items():
+        previous = baseline.get('paths', {}).get(path)
+        if not previous:
+            continue
+        change = current['ms_per_page'] / previous['ms_per_page'] - 1
+        flag = ''
+        if change > REGRESSION_THRESHOLD:
+            regressions.append(path)
+            flag = '  REGRESSION'
+        print(f"{path:38} {previous['ms_per_page']:8.2f} -> {current['ms_per_page']:8.2f} ms/page ({change:+.0%}){flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark HTML extraction over the fixture corpus")
+    parser.add_argument('--corpus', help="Directory of recorded .html pages (default: synthetic corpus)")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per page (best is kept)")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Earlier results JSON to compare with; exits 1 on regressions")
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    corpus = load_corpus(args.corpus)
+    results = run(corpus, args.repeat)
+
+    print(f"Parser backend {html_parser_backend.get_parser()} "
+          f"(results region only: {html_parser_backend.RESTRICT_TO_RESULTS}, "
+          f"fast path: {fast_extract.ENABLED}), {len(corpus)} pages\n")
+    print(f"{'path':38} {'pages/s':>9} {'ms/page':>9} {'items/s':>10} {'peak KB':>9} {'fast path':>10} {'speedup':>8}")
+    for path, r in results.items():
+        fast_path = f"{r['fast_path_share']:.0%}" if 'fast_path_share' in r else '-'
+        speedup = f"{r['fast_path_speedup']:.1f}x" if r.get('fast_path_speedup') else '-'
+        print(f"{path:38} {r['pages_per_s']:9.1f} {r['ms_per_page']:9.2f} {r['items_per_s']:10.0f} "
+              f"{r['peak_memory_kb']:9.0f} {fast_path:>10} {speedup:>8}")
+
+    report = {
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'parser': html_parser_backend.get_parser(),
+        'results_region_only': html_parser_backend.RESTRICT_TO_RESULTS,
+        'fast_path': fast_extract.ENABLED,
+        'corpus': args.corpus or 'synthetic',
+        'repeat': args.repeat,
+        'paths': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print()
+        return 1 if compare(results, baseline) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Price History Storage Benchmark
+
+Records repeated scans of a generated seller inventory in a scratch price
+history database, with a small share of listings repriced, added and delisted
+between scans, and reports the storage each scan costs, how long recording a
+scan takes, and the time of the price-drop and single-ASIN history queries.
+
+Usage: python benchmarks/price_history_benchmark.py [--listings 10000] [--scans 50]
+                                                    [--churn 0.01] [--output results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_history import PriceHistory
+
+SELLER_ID = 'A1BENCHMARK000'
+
+
+def _asin(i: int) -> str:
+    return f"B{i:09d}"
+
+
+def _products(prices: Dict[str, int]) -> List[Dict[str, Any]]:
+    return [{'asin': asin, 'title': f"Product {asin}", 'price_text': f"£{price // 100:,}.{price % 100:02d}",
+             'seller_id': SELLER_ID} for asin, price in prices.items()]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure price history storage per scan and query times")
+    parser.add_argument('--listings', type=int, default=10000, help="Listings of the generated seller")
+    parser.add_argument('--scans', type=int, default=50, help="Scans recorded after the first")
+    parser.add_argument('--churn', type=float, default=0.01,
+                        help="Share of listings repriced between scans (a tenth as many added and delisted)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    prices = {_asin(i): rng.randint(199, 99999) for i in range(args.listings)}
+    next_asin = args.listings
+
+    with tempfile.TemporaryDirectory() as directory:
+        history = PriceHistory(os.path.join(directory, 'price_history.sqlite3'))
+        start = time.time() - args.scans * 3600
+
+        began = time.perf_counter()
+        history.record_scan(SELLER_ID, 'co.uk', 'benchmark', _products(prices), scanned_at=start)
+        first_scan_s = time.perf_counter() - began
+        first_scan_bytes = history.size_bytes()
+
+        record_times = []
+        changes = []
+        for scan in range(1, args.scans + 1):
+            asins = list(prices)
+            for asin in rng.sample(asins, int(len(asins) * args.churn)):
+                prices[asin] = max(1, int(prices[asin] * rng.uniform(0.7, 1.2)))
+            for asin in rng.sample(asins, int(len(asins) * args.churn / 10)):
+                del prices[asin]
+            for _ in range(int(args.listings * args.churn / 10)):
+                prices[_asin(next_asin)] = rng.randint(199, 99999)
+                next_asin += 1
+
+            began = time.perf_counter()
+            changes.append(history.record_scan(SELLER_ID, 'co.uk', 'benchmark', _products(prices),
+                                               scanned_at=start + scan * 3600))
+            record_times.append(time.perf_counter() - began)
+        total_bytes = history.size_bytes()
+
+        began = time.perf_counter()
+        drops = history.price_drops(start + args.scans * 3600 / 2, min_drop=0.1)
+        drops_s = time.perf_counter() - began
+        began = time.perf_counter()
+        asin_history = history.asin_history(_asin(0))
+        asin_history_s = time.perf_counter() - began
+
+    results = {
+        'listings': args.listings,
+        'scans': args.scans,
+        'churn': args.churn,
+        'first_scan_bytes': first_scan_bytes,
+        'first_scan_s': first_scan_s,
+        'bytes_per_scan': (total_bytes - first_scan_bytes) / args.scans,
+        'changes_per_scan': statistics.fmean(changes),
+        'record_scan_s': statistics.median(record_times),
+        'price_drops': len(drops),
+        'price_drops_s': drops_s,
+        'asin_history_s': asin_history_s,
+    }
+    print(f"{args.listings} listings, {args.scans} scans, {args.churn:.1%} repriced per scan\n")
+    print(f"first scan:       {first_scan_bytes / 1024:8.1f} KiB  {first_scan_s * 1000:8.1f} ms")
+    print(f"each later scan:  {results['bytes_per_scan'] / 1024:8.1f} KiB  {results['record_scan_s'] * 1000:8.1f} ms "
+          f"(median), {results['changes_per_scan']:.0f} changes")
+    print(f"price drops:      {len(drops):8} found  {drops_s * 1000:8.1f} ms")
+    print(f"one ASIN history: {len(asin_history):8} rows   {asin_history_s * 1000:8.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Product Representation Memory Benchmark
+
+Measures, for a synthetic inventory of each scraper's product shape, the
+memory held by a list of product dicts (as loaded from the cache) against a
+ProductBatch, and the cached size of the products as full JSON dicts against
+the compact rows stored by the SQLite cache.
+
+Usage: python benchmarks/product_memory.py [--products 10000]
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from product_store import ProductBatch
+from scraper_cache import ScraperCache
+from fixture_corpus import _asin, _title, _price
+
+SELLER_ID = 'A25WS8YVXEJW8B'
+SELLER_NAME = 'Example Trading Ltd'
+
+
+def amazon_product(rng: random.Random) -> Dict[str, Any]:
+    """Product in the shape built by amazon_scraper."""
+    asin = _asin(rng)
+    product = {
+        'asin': asin,
+        'title': _title(rng),
+        'link': f"https://www.amazon.co.uk/dp/{asin}",
+        'marketplace': "Amazon CO.UK",
+        'seller_id': SELLER_ID,
+        'seller_name': SELLER_NAME
+    }
+    price = _price(rng)
+    if price:
+        product['price_text'] = price
+    return product
+
+
+def enhanced_product(rng: random.Random) -> Dict[str, Any]:
+    """Product in the shape built by enhanced_amazon_scraper."""
+    asin = _asin(rng)
+    return {
+        "asin": asin,
+        "title": _title(rng),
+        "price": _price(rng),
+        "link": f"https://www.amazon.co.uk/dp/{asin}",
+        "seller_id": SELLER_ID,
+        "marketplace": "UK",
+        "source": "enhanced_amazon"
+    }
+
+
+def measure(build: Callable[[], Any]) -> int:
+    """Bytes still allocated by the object build() returns."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+def cache_bytes(products: List[Dict[str, Any]]) -> int:
+    """Size of the SQLite cache database after saving the products."""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ScraperCache(os.path.join(directory, 'cache.sqlite3'))
+        cache.save_inventory('benchmark', SELLER_ID, 'co.uk', {'seller_name': SELLER_NAME, 'products': products})
+        return cache.size_bytes()
+
+
+def run(count: int) -> Dict[str, Dict[str, int]]:
+    """Measure both product shapes."""
+    results = {}
+    for name, make in (('amazon_scraper', amazon_product), ('enhanced_amazon_scraper', enhanced_product)):
+        rng = random.Random(1)
+        products = [make(rng) for _ in range(count)]
+        # Decode from JSON so strings are not shared, as with products read from the cache
+        encoded = [json.dumps(product, ensure_ascii=False) for product in products]
+        batch = ProductBatch.from_products(products)
+        assert batch.to_list() == products
+
+        results[name] = {
+            'dicts_memory': measure(lambda: [json.loads(line) for line in encoded]),
+            'batch_memory': measure(lambda: ProductBatch.from_products(json.loads(line) for line in encoded)),
+            'json_bytes': sum(len(line.encode('utf-8')) for line in encoded),
+            'compact_bytes': (sum(len(json.dumps(row, ensure_ascii=False).encode('utf-8')) for row in batch.rows())
+                              + len(json.dumps(batch.layout(), ensure_ascii=False).encode('utf-8'))),
+            'sqlite_bytes': cache_bytes(products),
+        }
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure product representation memory and cache size")
+    parser.add_argument('--products', type=int, default=10000, help="Products per inventory")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.products)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for name, r in results.items():
+        print(f"{name} ({args.products} products)")
+        print(f"  memory: dicts {r['dicts_memory'] / 1024:.0f} KB, batch {r['batch_memory'] / 1024:.0f} KB "
+              f"({r['batch_memory'] / r['dicts_memory']:.0%})")
+        print(f"  cached product data: full JSON {r['json_bytes'] / 1024:.0f} KB, "
+              f"compact rows {r['compact_bytes'] / 1024:.0f} KB ({r['compact_bytes'] / r['json_bytes']:.0%}); "
+              f"SQLite file {r['sqlite_bytes'] / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
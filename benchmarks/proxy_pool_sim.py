@@ -0,0 +1,168 @@
+"""
+Proxy Pool Simulation
+
+Starts local stand-in proxies with different behaviour (fast, slow, blocked
+with 503s, serving captcha pages, and one that refuses connections) and sends
+requests through the health-scored proxy pool, the same way the scrapers do.
+Reports how many requests each proxy got, its stats and circuit state,
+compared with the round-robin rotation the scrapers used before.
+
+Usage: python benchmarks/proxy_pool_sim.py [--requests 300] [--cooldown 2]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import proxy_pool
+from proxy_pool import ProxyPool, parse_proxy_url
+
+TARGET_URL = "http://www.amazon.co.uk/s?i=merchant-items&me=A25WS8YVXEJW8B"
+
+# name -> (status, delay in seconds, body)
+BEHAVIOURS = {
+    'fast': (200, 0.01, '<html>results</html>'),
+    'slow': (200, 0.25, '<html>results</html>'),
+    'blocked': (503, 0.01, '<html>Service Unavailable</html>'),
+    'captcha': (200, 0.01, '<form action="/errors/validateCaptcha"></form>'),
+}
+
+
+def start_proxy(status: int, delay: float, body: str) -> ThreadingHTTPServer:
+    """Start a stand-in HTTP proxy that answers every request itself."""
+    payload = body.encode('utf-8')
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def unused_port() -> int:
+    """Get a local port nothing is listening on."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def fetch(session: requests.Session, proxy: Dict[str, str]) -> Tuple[Optional[int], str, float]:
+    """Request the target through a proxy, returning status, body and latency."""
+    started = time.monotonic()
+    try:
+        response = session.get(TARGET_URL, proxies={'http': proxy['url']}, timeout=2)
+        return response.status_code, response.text, time.monotonic() - started
+    except requests.RequestException:
+        return None, '', time.monotonic() - started
+
+
+def simulate(proxies: Dict[str, Dict[str, str]], count: int, stats_path: str) -> Dict[str, Any]:
+    """Send requests through the proxy pool, returning per-proxy results."""
+    pool = ProxyPool(proxies.values(), stats_path=stats_path)
+    names = {proxy['url']: name for name, proxy in proxies.items()}
+    used, good = Counter(), Counter()
+    direct = 0
+
+    with requests.Session() as session:
+        for _ in range(count):
+            proxy = pool.choose()
+            if proxy is None:
+                direct += 1
+                time.sleep(0.01)
+                continue
+            status, text, latency = fetch(session, proxy)
+            pool.record(proxy, latency, status, text)
+            used[names[proxy['url']]] += 1
+            good[names[proxy['url']]] += status == 200 and 'validateCaptcha' not in text
+
+    pool.save()
+    stats = pool.get_stats()
+    now = time.time()
+    return {
+        'proxies': {
+            name: {
+                'requests': used[name],
+                'successes': good[name],
+                'score': round(pool._score(stats[proxy['url']]), 3),
+                'circuit_open': stats[proxy['url']]['open_until'] > now,
+            }
+            for name, proxy in proxies.items()
+        },
+        'direct': direct,
+        'successes': sum(good.values()),
+    }
+
+
+def round_robin(proxies: Dict[str, Dict[str, str]], count: int) -> Dict[str, Any]:
+    """Send requests cycling through the proxies in order, as get_next_proxy used to."""
+    ordered = list(proxies.values())
+    successes = 0
+    with requests.Session() as session:
+        for i in range(count):
+            status, text, _ = fetch(session, ordered[i % len(ordered)])
+            successes += status == 200 and 'validateCaptcha' not in text
+    return {'successes': successes}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Simulate the proxy pool against local stand-in proxies")
+    parser.add_argument('--requests', type=int, default=300, help="Requests to send")
+    parser.add_argument('--cooldown', type=float, default=2, help="Base circuit breaker cooldown (seconds)")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    proxy_pool.BASE_COOLDOWN = args.cooldown
+    servers = {name: start_proxy(*behaviour) for name, behaviour in BEHAVIOURS.items()}
+    proxies = {name: parse_proxy_url(f"http://127.0.0.1:{server.server_address[1]}") for name, server in servers.items()}
+    proxies['dead'] = parse_proxy_url(f"http://127.0.0.1:{unused_port()}")
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            results = {
+                'health_scored': simulate(proxies, args.requests, os.path.join(directory, 'proxy_stats.json')),
+                'round_robin': round_robin(proxies, args.requests),
+            }
+    finally:
+        for server in servers.values():
+            server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    scored = results['health_scored']
+    for name, r in scored['proxies'].items():
+        state = 'open' if r['circuit_open'] else 'closed'
+        print(f"{name:8} {r['requests']:4} requests  {r['successes']:4} ok  score {r['score']:.3f}  circuit {state}")
+    print(f"direct   {scored['direct']:4} requests (all proxies cooling down)")
+    print(f"\nSuccessful responses out of {args.requests}: health-scored {scored['successes']}, "
+          f"round-robin {results['round_robin']['successes']}")
+
+
+if __name__ == "__main__":
+    main()
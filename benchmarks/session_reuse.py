@@ -0,0 +1,151 @@
+"""
+HTTP Session Reuse Benchmark
+
+Serves a fixture search page from a local HTTPS server with a throwaway
+self-signed certificate and fetches it repeatedly, once with a new
+requests.Session per page (how enhanced_amazon_scraper.make_request used to
+work) and once with the shared session pool. Reports the latency per page and
+the time saved by keeping connections alive.
+
+Needs the openssl command line tool (set OPENSSL to its path if it is not on PATH).
+
+Usage: python benchmarks/session_reuse.py [--pages 50] [--latency-ms 0]
+"""
+
+import os
+import sys
+import ssl
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from session_pool import SessionPool
+from fixture_corpus import build_corpus
+
+
+def make_certificate(directory: str) -> str:
+    """Create a self-signed certificate for localhost, returning the PEM path (key and cert)."""
+    openssl = os.environ.get('OPENSSL') or shutil.which('openssl')
+    if not openssl:
+        raise SystemExit("openssl not found; set OPENSSL to its path")
+
+    key_path = os.path.join(directory, 'key.pem')
+    cert_path = os.path.join(directory, 'cert.pem')
+    subprocess.run(
+        [openssl, 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-keyout', key_path, '-out', cert_path, '-subj', '/CN=localhost',
+         '-addext', 'subjectAltName=DNS:localhost'],
+        check=True, capture_output=True
+    )
+    with open(os.path.join(directory, 'server.pem'), 'w') as f:
+        for path in (key_path, cert_path):
+            with open(path) as part:
+                f.write(part.read())
+    return cert_path
+
+
+def start_server(directory: str, page: bytes, latency: float) -> ThreadingHTTPServer:
+    """Start a keep-alive HTTPS server returning `page` for every GET."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are separate writes; don't let Nagle delay the body
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(page)))
+            self.send_header('Set-Cookie', 'session-token=abc; Path=/')
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('localhost', 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(os.path.join(directory, 'server.pem'))
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def time_pages(fetch: Callable[[str], requests.Response], url: str, pages: int) -> List[float]:
+    """Fetch the page repeatedly, returning each request's latency in ms."""
+    timings = []
+    for page in range(pages):
+        start = time.perf_counter()
+        response = fetch(f"{url}?page={page}")
+        response.content
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def run(pages: int, latency_ms: float) -> Dict[str, Dict[str, float]]:
+    """Benchmark a new session per page against the session pool."""
+    page = build_corpus()['search_list_small.html'].encode('utf-8')
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert_path = make_certificate(directory)
+        server = start_server(directory, page, latency_ms / 1000)
+        url = f"https://localhost:{server.server_address[1]}/s"
+
+        def fresh_session(page_url: str) -> requests.Response:
+            with requests.Session() as session:
+                return session.get(page_url, timeout=15, verify=cert_path)
+
+        pool = SessionPool()
+
+        def pooled_session(page_url: str) -> requests.Response:
+            return pool.get_for_url(page_url).get(page_url, timeout=15, verify=cert_path)
+
+        try:
+            results = {}
+            for name, fetch in (('new_session', fresh_session), ('session_pool', pooled_session)):
+                timings = time_pages(fetch, url, pages)
+                results[name] = {
+                    'mean_ms': statistics.mean(timings),
+                    'median_ms': statistics.median(timings),
+                    'first_ms': timings[0],
+                }
+            results['saved_per_page_ms'] = results['new_session']['mean_ms'] - results['session_pool']['mean_ms']
+        finally:
+            pool.close()
+            server.shutdown()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Measure latency saved by reusing HTTP sessions")
+    parser.add_argument('--pages', type=int, default=50, help="Pages fetched per mode")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Server-side delay per response")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.pages, args.latency_ms)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for name in ('new_session', 'session_pool'):
+        r = results[name]
+        print(f"{name:13} mean {r['mean_ms']:6.2f} ms  median {r['median_ms']:6.2f} ms  first {r['first_ms']:6.2f} ms")
+    print(f"Saved per page: {results['saved_per_page_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
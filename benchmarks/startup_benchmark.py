@@ -0,0 +1,199 @@
+"""
+Startup Benchmark
+
+Measures the cold start of a new interpreter calling a scraper the way the
+Node bridges do, on two paths for each scraper:
+
+    cache_hit   get_seller_products answered from a seeded cache
+    full_scan   get_seller_products(force_refresh=True) against the stand-in
+                HTTP backend (scan_profiler), so no network is needed
+
+Every run is a fresh `python -X importtime` process. For each path it reports
+the wall time of the process, the total import time, the scraper module's own
+import time, the slowest top-level imports and which parts of the HTTP/HTML
+stack (requests, bs4, lxml, trafilatura) were loaded; a cache hit should load
+none of them. Results can be saved as JSON and compared with an earlier run.
+
+Usage: python benchmarks/startup_benchmark.py [--repeat 5]
+                                              [--output results.json] [--compare baseline.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRAPERS = ('amazon_scraper', 'enhanced_amazon_scraper')
+PATHS = ('cache_hit', 'full_scan')
+SELLER_ID = 'A25WS8YVXEJW8B'
+
+# Modules a cache hit should never need
+HEAVY_MODULES = ('requests', 'urllib3', 'bs4', 'lxml', 'trafilatura', 'asyncio')
+
+# Slowdown of the wall or import time, as a share, that --compare reports as a regression
+REGRESSION_THRESHOLD = 0.25
+
+# Slowest top-level imports listed per path
+TOP_IMPORTS = 8
+
+# Run in the child interpreter: argv is scraper, path, cache database
+CHILD = '''
+import sys, json, logging
+logging.disable(logging.WARNING)
+scraper, path, cache_path = sys.argv[1:4]
+
+import scraper_cache
+scraper_cache.CACHE_DB_PATH = cache_path
+module = __import__(scraper)
+
+if path == 'full_scan':
+    import scan_profiler
+    pages = scan_profiler.stand_in_pages(pages_per_listing=1, filler_kb=0)
+    with scan_profiler.use_backend(scan_profiler.ReplayAdapter(pages)):
+        products = module.get_seller_products(%(seller_id)r, force_refresh=True)
+else:
+    products = module.get_seller_products(%(seller_id)r)
+
+print(json.dumps({'products': len(products), 'heavy': [m for m in %(heavy)r if m in sys.modules]}))
+''' % {'seller_id': SELLER_ID, 'heavy': HEAVY_MODULES}
+
+
+def seed_cache(path: str, products: int = 500) -> None:
+    """Cache an inventory for SELLER_ID under both scrapers' namespaces."""
+    from scraper_cache import ScraperCache
+
+    inventory = [
+        {'asin': f"B0{i:08d}", 'title': f"Cached product {i}", 'price': f"£{i % 97}.99",
+         'link': f"https://www.amazon.co.uk/dp/B0{i:08d}", 'seller_id': SELLER_ID}
+        for i in range(products)
+    ]
+    cache = ScraperCache(path)
+    for namespace in SCRAPERS:
+        cache.save_inventory(namespace, SELLER_ID, 'co.uk', {
+            'seller_id': SELLER_ID,
+            'seller_name': 'Cached Seller',
+            'products': inventory,
+            'product_count': len(inventory),
+            'last_updated': time.time(),
+        })
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Dict[str, float]]:
+    """Get the total import time and the cumulative time of each top-level import (ms)."""
+    total = 0.0
+    top_level = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        total += int(own) / 1000
+        if not name[1:].startswith(' '):
+            top_level[name.strip()] = int(cumulative) / 1000
+    return total, top_level
+
+
+def run_once(scraper: str, path: str, cache_path: str) -> Dict[str, Any]:
+    """Start one interpreter on a scraper path and measure it."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD, scraper, path, cache_path],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"{scraper} {path} failed:\n{result.stderr[-2000:]}")
+
+    output = json.loads(result.stdout.strip().splitlines()[-1])
+    import_ms, top_level = parse_importtime(result.stderr)
+    slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:TOP_IMPORTS]
+    return {
+        'wall_ms': wall_ms,
+        'import_ms': import_ms,
+        'module_ms': top_level.get(scraper, 0.0),
+        'products': output['products'],
+        'heavy_modules': output['heavy'],
+        'slowest_imports': dict(slowest),
+    }
+
+
+def run(repeat: int) -> Dict[str, Any]:
+    """Measure every scraper and path, keeping the fastest of `repeat` runs."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, 'scraper_cache.sqlite3')
+        seed_cache(cache_path)
+        for scraper in SCRAPERS:
+            for path in PATHS:
+                runs = [run_once(scraper, path, cache_path) for _ in range(repeat)]
+                results[f"{scraper}.{path}"] = min(runs, key=lambda r: r['wall_ms'])
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Print the change against a baseline run, returning the regressed paths."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('paths', {}).get(name)
+        if not previous:
+            continue
+        flags = []
+        for metric in ('wall_ms', 'import_ms'):
+            if current[metric] > previous[metric] * (1 + REGRESSION_THRESHOLD):
+                flags.append(metric)
+        new_heavy = sorted(set(current['heavy_modules']) - set(previous['heavy_modules']))
+        if new_heavy:
+            flags.append('now imports ' + ', '.join(new_heavy))
+        if flags:
+            regressions.append(name)
+        print(f"{name:34} wall {previous['wall_ms']:7.1f} -> {current['wall_ms']:7.1f} ms  "
+              f"imports {previous['import_ms']:7.1f} -> {current['import_ms']:7.1f} ms"
+              f"{'  REGRESSION: ' + '; '.join(flags) if flags else ''}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure scraper cold-start time with -X importtime")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per path (fastest is kept)")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Earlier results JSON to compare with; exits 1 on regressions")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+
+    print(f"{'path':34} {'wall ms':>8} {'imports ms':>11} {'module ms':>10}  heavy modules loaded")
+    for name, r in results.items():
+        print(f"{name:34} {r['wall_ms']:8.1f} {r['import_ms']:11.1f} {r['module_ms']:10.1f}  "
+              f"{', '.join(r['heavy_modules']) or '-'}")
+    for name, r in results.items():
+        slowest = ', '.join(f"{module} {ms:.1f}" for module, ms in r['slowest_imports'].items())
+        print(f"\n{name} slowest imports (ms): {slowest}")
+
+    report = {
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'paths': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print()
+        return 1 if compare(results, baseline) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
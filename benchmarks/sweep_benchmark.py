@@ -0,0 +1,136 @@
+"""
+Multi-seller Sweep Benchmark
+
+Runs scan_sellers of both scrapers over stand-in pages (scan_profiler) served
+with a fixed latency, once per parse_workers setting, and reports the wall
+time, pages/s, the time scans spent waiting for parser processes and how often
+the parsers' queue was full. Products must match the run parsing inline
+(parse_workers=0), so this doubles as a check of the process-pool pipeline.
+
+Parsing only spreads over several cores when the machine has them; on a single
+core the parser processes cost their start-up and transfer time.
+
+Usage: python benchmarks/sweep_benchmark.py [--sellers 8] [--max-workers 4]
+                                            [--parse-workers 0 2 4] [--latency-ms 50]
+                                            [--soup] [--output results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import platform
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scan_profiler
+import fast_extract
+import amazon_scraper
+import enhanced_amazon_scraper
+from scrape_stats import get_totals
+
+SCRAPERS = {
+    'amazon_scraper': amazon_scraper,
+    'enhanced_amazon_scraper': enhanced_amazon_scraper,
+}
+
+
+class SlowReplayAdapter(scan_profiler.ReplayAdapter):
+    """ReplayAdapter taking a fixed time per request, like a network round trip."""
+
+    def __init__(self, pages: scan_profiler.PageSource, latency: float):
+        super().__init__(pages)
+        self.latency = latency
+
+    def send(self, request, **kwargs):
+        time.sleep(self.latency)
+        return super().send(request, **kwargs)
+
+
+def run_sweep(module, seller_ids: List[str], max_workers: int, parse_workers: int,
+              pages: scan_profiler.PageSource, latency: float) -> Dict[str, Any]:
+    """Sweep the sellers once, returning the timings and each seller's products."""
+    before = get_totals().get(module.__name__)
+    with scan_profiler.use_backend(SlowReplayAdapter(pages, latency)):
+        start = time.perf_counter()
+        results = list(module.scan_sellers(seller_ids, force_refresh=True, max_workers=max_workers,
+                                           parse_workers=parse_workers))
+        wall = time.perf_counter() - start
+    after = get_totals()[module.__name__]
+
+    def delta(get) -> float:
+        return get(after) - (get(before) if before else 0)
+
+    pages_read = delta(lambda totals: totals['counters']['pages'])
+    return {
+        'wall_s': wall,
+        'pages': pages_read,
+        'pages_per_s': pages_read / wall if wall else 0.0,
+        'parse_wait_s': delta(lambda totals: totals['stages']['parse_wait']),
+        'backpressure': delta(lambda totals: totals['counters']['parse_backpressure']),
+        'errors': [r['error'] for r in results if r['error']],
+        'products': {r['seller_id']: r['products'] for r in results},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark multi-seller sweeps with and without parser processes")
+    parser.add_argument('--sellers', type=int, default=8, help="Sellers per sweep")
+    parser.add_argument('--max-workers', type=int, default=4, help="Sellers scanned at the same time")
+    parser.add_argument('--parse-workers', type=int, nargs='+', default=[0, os.cpu_count() or 1],
+                        help="Parser process counts to compare (0 parses inline)")
+    parser.add_argument('--latency-ms', type=float, default=50, help="Stand-in network latency per request")
+    parser.add_argument('--soup', action='store_true', help="Turn the fast path off, so every page builds a tree")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+
+    if args.soup:
+        # Read again by the parser processes when they start
+        os.environ['SCRAPER_FAST_EXTRACT'] = '0'
+        fast_extract.ENABLED = False
+
+    seller_ids = [f"A{i:013d}" for i in range(args.sellers)]
+    pages = scan_profiler.stand_in_pages(pages_per_listing=2)
+    settings = sorted(set([0] + args.parse_workers))
+
+    print(f"{len(seller_ids)} sellers, {args.max_workers} at a time, {args.latency_ms:.0f} ms per request, "
+          f"{os.cpu_count()} CPUs, fast path: {fast_extract.ENABLED}\n")
+    print(f"{'scraper':26} {'parsers':>7} {'wall s':>8} {'pages/s':>8} {'wait s':>8} {'queue full':>10}  products")
+    report = {}
+    mismatches = 0
+    for name, module in SCRAPERS.items():
+        inline = None
+        for parse_workers in settings:
+            result = run_sweep(module, seller_ids, args.max_workers, parse_workers, pages, args.latency_ms / 1000)
+            products = result.pop('products')
+            if inline is None:
+                inline = products
+            same = products == inline
+            mismatches += not same
+            print(f"{name:26} {parse_workers:7} {result['wall_s']:8.2f} {result['pages_per_s']:8.1f} "
+                  f"{result['parse_wait_s']:8.2f} {result['backpressure']:10.0f}  "
+                  f"{'same' if same else 'DIFFERENT'}{'  errors: ' + str(len(result['errors'])) if result['errors'] else ''}")
+            report[f"{name}.parse_workers={parse_workers}"] = result
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': time.time(),
+                'python': platform.python_version(),
+                'cpus': os.cpu_count(),
+                'sellers': args.sellers,
+                'max_workers': args.max_workers,
+                'latency_ms': args.latency_ms,
+                'fast_path': fast_extract.ENABLED,
+                'runs': report,
+            }, f, indent=2)
+        print(f"\nWrote results to {args.output}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
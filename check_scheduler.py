@@ -0,0 +1,403 @@
+"""
+Adaptive Seller Check Scheduler
+
+This module decides when each tracked seller is checked for new listings.
+Instead of checking every seller on the same fixed period, it learns from the
+seller's recorded incremental checks (see scraper_cache) how often new ASINs
+appear, so busy sellers are checked often and dormant ones rarely.
+
+A seller's change rate is estimated from its recent checks. Each check either
+found new ASINs listed since the previous one or didn't; the estimate is the
+rate of a Poisson process that makes those outcomes most likely for checks
+that far apart. A check finding several new ASINs counts once, as sellers
+often list a batch at a time. The estimate starts from a prior of one change
+per DEFAULT_INTERVAL, so a seller without history is checked at that interval
+and its history moves it from there. Each check weighs RECENCY times as much
+as the one after it, so a seller waking up or going quiet is noticed soon.
+
+A seller wants its next check CHANGES_PER_CHECK changes' worth of time after
+the last one, or FOLLOW_UP times the last gap if that check found new ASINs
+(listings come in spells), kept between MIN_INTERVAL and MAX_INTERVAL. When
+the wanted intervals add up to more than HOURLY_BUDGET requests per hour, they
+are stretched in proportion to sqrt(cost / rate), which keeps the detection
+latency per listing lowest for the requests spent.
+
+Due sellers are handed out from a priority queue, most overdue first, and a
+token bucket keeps them within the budget. A check is charged the seller's
+average requests per check when it is handed out, corrected once its outcome
+is recorded. A seller handed out but never recorded is due again after
+MIN_INTERVAL.
+
+The scrapers' incremental checks record their outcome with record_check(), and
+the Node bot asks the scraper worker for due_sellers() to know whom to check.
+
+Settings (seconds unless noted): SCRAPER_CHECK_MIN_INTERVAL (1 hour),
+SCRAPER_CHECK_MAX_INTERVAL (7 days), SCRAPER_CHECK_DEFAULT_INTERVAL (12 hours),
+SCRAPER_CHECK_BUDGET (requests per hour, 120), SCRAPER_CHECK_RECENCY (0.9) and
+SCRAPER_CHECK_FOLLOW_UP (0.25).
+
+benchmarks/check_scheduler_sim.py replays check history to compare detection
+latency and request cost with checking on fixed intervals.
+"""
+
+import os
+import json
+import math
+import time
+import heapq
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from scraper_cache import SELLER_CHECK_HISTORY, get_cache
+from seller_batch import TRACKED_SELLERS_PATH
+
+logger = logging.getLogger('check_scheduler')
+
+MIN_INTERVAL = float(os.environ.get('SCRAPER_CHECK_MIN_INTERVAL', 3600))
+MAX_INTERVAL = float(os.environ.get('SCRAPER_CHECK_MAX_INTERVAL', 7 * 86400))
+# Interval of sellers without history, and the prior of the rate estimate
+DEFAULT_INTERVAL = float(os.environ.get('SCRAPER_CHECK_DEFAULT_INTERVAL', 12 * 3600))
+HOURLY_BUDGET = float(os.environ.get('SCRAPER_CHECK_BUDGET', 120))
+
+# Expected changes between two checks the schedule aims for; lower checks more often
+CHANGES_PER_CHECK = 1.0
+# Weight of the prior in the rate estimate, in changes seen
+PRIOR_CHANGES = 1.0
+# Weight of each check in the rate estimate relative to the one after it
+RECENCY = float(os.environ.get('SCRAPER_CHECK_RECENCY', 0.9))
+# Share of the last gap after which a check that found new ASINs is followed up
+FOLLOW_UP = float(os.environ.get('SCRAPER_CHECK_FOLLOW_UP', 0.25))
+# Requests a check is charged before the seller has history
+DEFAULT_CHECK_COST = 2.0
+
+# (checked_at, new_asins, requests); new_asins and requests are None for a full scan
+Check = Tuple[float, Optional[int], Optional[int]]
+
+
+def estimate_change_rate(checks: Sequence[Check], prior_interval: float = DEFAULT_INTERVAL) -> float:
+    """
+    Estimate how often a seller lists new products, in changes per second.
+
+    Args:
+        checks: The seller's checks, oldest first
+        prior_interval: Time between changes assumed before any history
+    """
+    gaps = []  # (seconds since the previous check, whether new ASINs were found)
+    previous = None
+    for checked_at, new_asins, _ in checks:
+        if previous is not None and new_asins is not None and checked_at > previous:
+            gaps.append((checked_at - previous, new_asins > 0))
+        previous = checked_at
+
+    # Newer checks weigh more, so a seller waking up or going quiet is noticed quickly
+    weights = [RECENCY ** age for age in range(len(gaps) - 1, -1, -1)]
+
+    # Gamma prior: PRIOR_CHANGES changes over PRIOR_CHANGES prior intervals
+    shape = PRIOR_CHANGES
+    exposure = PRIOR_CHANGES * prior_interval + sum(
+        weight * gap for weight, (gap, changed) in zip(weights, gaps) if not changed
+    )
+    changed_gaps = [(weight, gap) for weight, (gap, changed) in zip(weights, gaps) if changed]
+    if not changed_gaps:
+        return shape / exposure
+
+    def slope(rate: float) -> float:
+        # Derivative of the log posterior; P(change within gap) = 1 - exp(-rate * gap)
+        total = shape / rate - exposure
+        for weight, gap in changed_gaps:
+            if rate * gap < 700:
+                total += weight * gap / math.expm1(rate * gap)
+        return total
+
+    # The slope falls as the rate grows, so bisect (in log space) for its zero
+    low, high = shape / exposure, 1.0
+    for _ in range(60):
+        middle = math.sqrt(low * high)
+        if slope(middle) > 0:
+            low = middle
+        else:
+            high = middle
+    return math.sqrt(low * high)
+
+
+class CheckScheduler:
+    """Priority queue of sellers by next check time, handing out due sellers within an hourly request budget (thread-safe)."""
+
+    def __init__(self, marketplace: str = "co.uk", hourly_budget: float = HOURLY_BUDGET,
+                 min_interval: float = MIN_INTERVAL, max_interval: float = MAX_INTERVAL,
+                 default_interval: float = DEFAULT_INTERVAL, changes_per_check: float = CHANGES_PER_CHECK,
+                 load_history: bool = True, clock: Callable[[], float] = time.time):
+        """
+        Initialize an empty schedule.
+
+        Args:
+            marketplace: Marketplace whose check history is loaded
+            hourly_budget: Requests per hour the handed out checks may cost
+            min_interval: Shortest time between two checks of a seller
+            max_interval: Longest time between two checks of a seller
+            default_interval: Interval of sellers without history
+            changes_per_check: Expected changes between checks to aim for
+            load_history: Whether to load sellers' checks from the scraper cache
+            clock: Current time in epoch seconds
+        """
+        self.marketplace = marketplace
+        self.hourly_budget = hourly_budget
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.default_interval = default_interval
+        self.changes_per_check = changes_per_check
+        self.load_history = load_history
+        self.clock = clock
+
+        self._checks: Dict[str, List[Check]] = {}
+        self._rates: Dict[str, float] = {}
+        # Interval each seller would get with the budget to spare, and the one it gets
+        self._wanted: Dict[str, float] = {}
+        self._intervals: Dict[str, float] = {}
+        self._last_checked: Dict[str, Optional[float]] = {}
+        # Sellers handed out whose check isn't recorded yet -> when they are due again
+        self._pending: Dict[str, float] = {}
+        self._due: Dict[str, float] = {}
+        # (due at, seller ID); entries no longer matching _due are skipped
+        self._queue: List[Tuple[float, str]] = []
+        self._charged: Dict[str, float] = {}
+        self._tokens = hourly_budget
+        self._refilled_at = clock()
+        self._lock = threading.Lock()
+
+    def set_sellers(self, seller_ids: Iterable[str], last_checked: Optional[Dict[str, float]] = None) -> None:
+        """
+        Schedule exactly these sellers, keeping the state of ones already scheduled.
+
+        New sellers get their check history from the scraper cache. Without
+        history, a seller is due an interval after its time in `last_checked`
+        (epoch seconds), or right away.
+        """
+        seller_ids = list(dict.fromkeys(seller_ids))
+        with self._lock:
+            gone = set(self._due) - set(seller_ids)
+            for seller_id in gone:
+                self._forget(seller_id)
+            new_ids = [seller_id for seller_id in seller_ids if seller_id not in self._due]
+            if gone and not new_ids:
+                self._replan()
+
+        history = {}
+        if new_ids and self.load_history:
+            try:
+                history = get_cache().get_seller_checks(new_ids, self.marketplace)
+            except Exception as e:
+                logger.error(f"Error loading seller check history: {e}")
+
+        now = self.clock()
+        with self._lock:
+            for seller_id in new_ids:
+                checks = history.get(seller_id, [])
+                self._checks[seller_id] = checks
+                self._learn(seller_id)
+                self._last_checked[seller_id] = checks[-1][0] if checks else (last_checked or {}).get(seller_id)
+                self._due[seller_id] = now
+            if new_ids:
+                self._replan()
+        if new_ids:
+            logger.info(f"Scheduling {len(new_ids)} new sellers on {self.marketplace}")
+
+    def take_due(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[str]:
+        """
+        Hand out the sellers due for a check, most overdue first, as far as the budget allows.
+
+        Args:
+            now: Current time (default: the clock)
+            limit: Maximum number of sellers to hand out
+        """
+        now = self.clock() if now is None else now
+        due = []
+        with self._lock:
+            self._refill(now)
+            while self._queue and self._queue[0][0] <= now and (limit is None or len(due) < limit):
+                due_at, seller_id = self._queue[0]
+                if self._due.get(seller_id) != due_at:
+                    heapq.heappop(self._queue)
+                    continue
+                cost = self._cost(seller_id)
+                if self._tokens < min(cost, self.hourly_budget):
+                    break
+                heapq.heappop(self._queue)
+                self._tokens -= cost
+                self._charged[seller_id] = cost
+                # Due again if its check is never recorded
+                self._pending[seller_id] = now + self.min_interval
+                self._schedule(seller_id, self._pending[seller_id])
+                due.append(seller_id)
+        return due
+
+    def record(self, seller_id: str, new_asins: Optional[int], requests: Optional[int],
+               checked_at: Optional[float] = None) -> Optional[float]:
+        """
+        Learn from the outcome of checking a seller and reschedule it.
+
+        Returns:
+            The seller's next check time, or None if it isn't scheduled
+        """
+        checked_at = self.clock() if checked_at is None else checked_at
+        with self._lock:
+            if seller_id not in self._due:
+                return None
+            checks = self._checks[seller_id]
+            checks.append((checked_at, new_asins, requests))
+            del checks[:-SELLER_CHECK_HISTORY]
+            self._last_checked[seller_id] = checked_at
+            self._pending.pop(seller_id, None)
+
+            # Settle the budget with what the check really cost
+            self._tokens += self._charged.pop(seller_id, 0.0) - (requests or 0)
+
+            self._learn(seller_id)
+            self._replan()
+            return self._due[seller_id]
+
+    def schedule(self) -> List[Dict[str, Any]]:
+        """Get every scheduled seller's next check time, interval and estimated changes per day, soonest first."""
+        with self._lock:
+            rows = [
+                {
+                    'seller_id': seller_id,
+                    'next_check_at': due_at,
+                    'interval': self._intervals[seller_id],
+                    'changes_per_day': round(self._rates[seller_id] * 86400, 3),
+                    'checks': len(self._checks[seller_id]),
+                }
+                for seller_id, due_at in self._due.items()
+            ]
+        return sorted(rows, key=lambda row: row['next_check_at'])
+
+    def _learn(self, seller_id: str) -> None:
+        checks = self._checks[seller_id]
+        rate = self._rates[seller_id] = estimate_change_rate(checks, self.default_interval)
+        interval = self.changes_per_check / rate
+        # Listings come in spells, so after finding some look again soon
+        if len(checks) >= 2 and checks[-1][1]:
+            interval = min(interval, FOLLOW_UP * (checks[-1][0] - checks[-2][0]))
+        self._wanted[seller_id] = min(self.max_interval, max(self.min_interval, interval))
+
+    def _plan(self) -> Dict[str, float]:
+        """Get each seller's interval: the one it wants, stretched to fit the budget if the total doesn't."""
+        costs = {seller_id: self._cost(seller_id) for seller_id in self._wanted}
+
+        def hourly(intervals: Dict[str, float]) -> float:
+            return sum(costs[seller_id] * 3600 / interval for seller_id, interval in intervals.items())
+
+        if not self._wanted or hourly(self._wanted) <= self.hourly_budget:
+            return dict(self._wanted)
+
+        # Intervals proportional to sqrt(cost / rate) give the lowest detection
+        # latency per listing for the requests spent, so busy sellers stretch least
+        spread = {seller_id: math.sqrt(costs[seller_id] / self._rates[seller_id]) for seller_id in self._wanted}
+
+        def stretched(scale: float) -> Dict[str, float]:
+            return {
+                seller_id: min(self.max_interval, max(wanted, scale * spread[seller_id]))
+                for seller_id, wanted in self._wanted.items()
+            }
+
+        # More than the budget even at MAX_INTERVAL is left to the token bucket
+        low, high = 0.0, self.max_interval / min(spread.values())
+        for _ in range(50):
+            middle = (low + high) / 2
+            if hourly(stretched(middle)) > self.hourly_budget:
+                low = middle
+            else:
+                high = middle
+        return stretched(high)
+
+    def _replan(self) -> None:
+        self._intervals = self._plan()
+        for seller_id, last in self._last_checked.items():
+            if seller_id in self._pending:
+                self._due[seller_id] = self._pending[seller_id]
+            elif last is not None:
+                self._due[seller_id] = last + self._intervals[seller_id]
+        self._queue = [(due_at, seller_id) for seller_id, due_at in self._due.items()]
+        heapq.heapify(self._queue)
+
+    def _cost(self, seller_id: str) -> float:
+        costs = [requests for _, _, requests in self._checks[seller_id] if requests is not None]
+        return sum(costs) / len(costs) if costs else DEFAULT_CHECK_COST
+
+    def _schedule(self, seller_id: str, due_at: float) -> None:
+        self._due[seller_id] = due_at
+        heapq.heappush(self._queue, (due_at, seller_id))
+
+    def _forget(self, seller_id: str) -> None:
+        for state in (self._due, self._checks, self._rates, self._wanted, self._intervals,
+                      self._last_checked, self._pending, self._charged):
+            state.pop(seller_id, None)
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._refilled_at)
+        self._tokens = min(self.hourly_budget, self._tokens + elapsed * self.hourly_budget / 3600)
+        self._refilled_at = now
+
+
+_schedulers: Dict[str, CheckScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(marketplace: str = "co.uk") -> CheckScheduler:
+    """Get the process-wide scheduler of a marketplace, creating it on first use."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(marketplace)
+        if scheduler is None:
+            scheduler = _schedulers[marketplace] = CheckScheduler(marketplace)
+        return scheduler
+
+
+def load_last_checked(path: str = TRACKED_SELLERS_PATH) -> Dict[str, float]:
+    """Get each tracked seller's last check (epoch seconds) from the seller check timestamps file."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return {seller_id: checked_ms / 1000 for seller_id, checked_ms in json.load(f).items()}
+    except Exception as e:
+        logger.error(f"Error reading seller check times from {path}: {e}")
+        return {}
+
+
+def due_sellers(marketplace: str = "co.uk", seller_ids: Optional[List[str]] = None,
+                limit: Optional[int] = None) -> List[str]:
+    """
+    Get the sellers due for a check now, within the hourly request budget. This function can be called from Node.js.
+
+    Args:
+        marketplace: Amazon marketplace
+        seller_ids: Sellers to schedule (default: all tracked sellers)
+        limit: Maximum number of sellers to return
+    """
+    scheduler = get_scheduler(marketplace)
+    last_checked = load_last_checked()
+    scheduler.set_sellers(seller_ids if seller_ids is not None else list(last_checked), last_checked)
+    return scheduler.take_due(limit=limit)
+
+
+def get_schedule(marketplace: str = "co.uk") -> List[Dict[str, Any]]:
+    """Get the check schedule of the sellers scheduled so far. This function can be called from Node.js."""
+    return get_scheduler(marketplace).schedule()
+
+
+def record_check(seller_id: str, marketplace: str, new_asins: Optional[int], requests: Optional[int]) -> None:
+    """
+    Record the outcome of checking a seller, for the schedule to learn from.
+
+    Pass None for both counts after a full scan of a seller that had no
+    cached inventory: it marks when the seller was read, not a change.
+    """
+    checked_at = time.time()
+    try:
+        get_cache().record_seller_check(seller_id, marketplace, new_asins, requests, checked_at)
+    except Exception as e:
+        logger.error(f"Error recording check of seller {seller_id}: {e}")
+
+    with _schedulers_lock:
+        scheduler = _schedulers.get(marketplace)
+    if scheduler is not None:
+        scheduler.record(seller_id, new_asins, requests, checked_at)
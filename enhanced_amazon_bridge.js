@@ -6,9 +6,11 @@
 const { spawn } = require('child_process');
 const path = require('path');
 const fs = require('fs');
+const readline = require('readline');
+const { callWorker } = require('./scraper_worker_client');
 
 /**
- * Execute the enhanced Python scraper with arguments
+ * Execute the enhanced Python scraper in the persistent worker
  * @param {string} sellerId - Amazon seller ID to scrape
  * @param {string} marketplace - Amazon marketplace (default: co.uk)
  * @param {boolean} forceRefresh - Force refresh cache
@@ -17,73 +19,92 @@ const fs = require('fs');
 async function getEnhancedSellerProducts(sellerId, marketplace = 'co.uk', forceRefresh = false) {
     console.log(`🐍 Running enhanced Amazon scraper for seller ${sellerId}...`);
     
+    const products = await callWorker('enhanced_amazon_scraper', 'get_seller_products', [
+        sellerId,
+        marketplace,
+        forceRefresh
+    ]);
+    
+    if (!Array.isArray(products)) {
+        console.log('No valid product list returned from Python worker');
+        return [];
+    }
+    
+    console.log(`✅ Found ${products.length} products for seller ${sellerId}`);
+    return products;
+}
+
+/**
+ * Run the enhanced Python scraper in streaming mode, handling each record as it arrives
+ * Products are passed to onProduct as soon as they are first seen, so new listings
+ * can be acted on before the scan ends and partial results survive a killed scan
+ * @param {string} sellerId - Amazon seller ID to scrape
+ * @param {string} marketplace - Amazon marketplace (default: co.uk)
+ * @param {boolean} forceRefresh - Force refresh cache
+ * @param {Function} onProduct - Called with each product
+ * @param {Function} onProgress - Optional, called with each progress record
+ * @returns {Promise<Object>} - The scan's summary record
+ */
+function streamEnhancedSellerProducts(sellerId, marketplace = 'co.uk', forceRefresh = false, onProduct = () => {}, onProgress = null) {
+    console.log(`🐍 Streaming enhanced Amazon scraper for seller ${sellerId}...`);
+    
     return new Promise((resolve, reject) => {
-        // Path to the Python script
         const scriptPath = path.join(__dirname, 'enhanced_amazon_scraper.py');
         
-        // Check if script exists
         if (!fs.existsSync(scriptPath)) {
             return reject(new Error(`Enhanced Amazon scraper script not found: ${scriptPath}`));
         }
         
-        // Arguments to pass to the Python script
-        const args = [
+        const pythonProcess = spawn('python3', [
             scriptPath,
             sellerId,
             marketplace,
-            forceRefresh.toString()
-        ];
-        
-        // Spawn a Python process
-        const pythonProcess = spawn('python3', args);
+            forceRefresh.toString(),
+            '--stream'
+        ]);
         
-        let dataString = '';
-        let errorString = '';
+        let summary = null;
+        let scanError = null;
         
-        // Collect data from script
-        pythonProcess.stdout.on('data', (data) => {
-            dataString += data.toString();
+        // Each stdout line is one JSON record
+        readline.createInterface({ input: pythonProcess.stdout }).on('line', (line) => {
+            let record;
+            try {
+                record = JSON.parse(line);
+            } catch (error) {
+                console.log(`Error parsing Python output: ${error.message}`);
+                return;
+            }
+            
+            if (record.type === 'product') {
+                onProduct(record.product);
+            } else if (record.type === 'progress') {
+                if (onProgress) {
+                    onProgress(record);
+                }
+            } else if (record.type === 'summary') {
+                summary = record;
+            } else if (record.type === 'error') {
+                scanError = record.error;
+            }
         });
         
-        // Collect error output
         pythonProcess.stderr.on('data', (data) => {
-            console.log(`🐍 Python error: ${data.toString()}`);
-            errorString += data.toString();
+            console.log(`🐍 Python: ${data.toString().trim()}`);
         });
         
-        // Handle completion
         pythonProcess.on('close', (code) => {
-            if (code !== 0) {
-                console.log(`🐍 Python process exited with code ${code}`);
-                console.log(`🐍 Error: ${errorString}`);
-                return reject(new Error(`Process exited with code ${code}: ${errorString}`));
+            if (!summary) {
+                return reject(new Error(scanError || `Process exited with code ${code} before finishing the scan`));
             }
             
-            try {
-                // Parse the JSON output from the Python script
-                const jsonStart = dataString.indexOf('[');
-                const jsonEnd = dataString.lastIndexOf(']') + 1;
-                
-                if (jsonStart === -1 || jsonEnd === 0) {
-                    console.log('No valid JSON found in Python output');
-                    console.log('Raw output:', dataString);
-                    return resolve([]);
-                }
-                
-                const jsonStr = dataString.substring(jsonStart, jsonEnd);
-                const products = JSON.parse(jsonStr);
-                
-                console.log(`✅ Found ${products.length} products for seller ${sellerId}`);
-                resolve(products);
-            } catch (error) {
-                console.log(`Error parsing Python output: ${error.message}`);
-                console.log('Raw output:', dataString);
-                reject(error);
-            }
+            console.log(`✅ Found ${summary.product_count} products for seller ${sellerId}`);
+            resolve(summary);
         });
     });
 }
 
 module.exports = {
-    getEnhancedSellerProducts
+    getEnhancedSellerProducts,
+    streamEnhancedSellerProducts
 };
\ No newline at end of file
@@ -3,6 +3,9 @@ Enhanced Amazon Seller Inventory Scraper
 
 This module provides advanced scraping for Amazon seller inventories,
 designed to find more products than the basic approach.
+
+requests and bs4 are imported on first use, so a call answered from the cache
+starts quickly.
 """
 
 import json
@@ -12,10 +15,29 @@ import random
 import logging
 import sys
 import re
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+import argparse
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple, Iterable, Iterator, Union
+
+from rate_limiter import HostRateLimiter, is_blocked
+from session_pool import SESSION_POOL, marketplace_from_url
+from proxy_pool import get_proxy_pool
+from single_flight import Flight
+from seller_batch import DEFAULT_MAX_WORKERS, resolve_seller_names, run_batch, run_marketplaces
+from product_store import ProductStore, build_delta
+from fast_extract import ASIN_PATTERN, parse_search_page
+from parse_pool import DEFAULT_PARSE_WORKERS, parse_page, sweep_pool, use_pool
+from html_parser_backend import parse_html
+from url_pattern_planner import UrlPatternPlanner
+from scraper_cache import get_cache
+from check_scheduler import record_check
+from price_history import record_inventory
+from marketplaces import MARKETPLACES, SEARCH_PAGE_LIMIT, get_marketplace
+from scrape_stats import scan_stats, stage, add_time, count, count_status
+
+if TYPE_CHECKING:
+    import requests
+    from bs4 import BeautifulSoup
 
 # Configure logging
 logging.basicConfig(
@@ -24,9 +46,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger('enhanced_amazon_scraper')
 
-# Cache directory
-CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../data/cache')
-os.makedirs(CACHE_DIR, exist_ok=True)
+# Cache settings (hours, default 12)
+CACHE_NAMESPACE = 'enhanced_amazon_scraper'
+CACHE_TTL_HOURS = float(os.environ.get('ENHANCED_SCRAPER_CACHE_TTL_HOURS', 12))
+# Age up to which a long-lived worker serves stale data while refreshing it (hours, default 24)
+CACHE_HARD_TTL_HOURS = float(os.environ.get('ENHANCED_SCRAPER_CACHE_HARD_TTL_HOURS', 24))
 
 # Constants
 USER_AGENTS = [
@@ -41,7 +65,7 @@ USER_AGENTS = [
 SELLER_URL_PATTERNS = [
     # Standard patterns
     "https://www.amazon.{marketplace}/s?i=merchant-items&me={seller_id}&page={page}",
-    "https://www.amazon.{marketplace}/s?me={seller_id}&marketplaceID=A1F83G8C2ARO7P&page={page}",
+    "https://www.amazon.{marketplace}/s?me={seller_id}&marketplaceID={marketplace_id}&page={page}",
     "https://www.amazon.{marketplace}/s?merchant={seller_id}&page={page}",
     
     # Seller-specific patterns
@@ -50,10 +74,8 @@ SELLER_URL_PATTERNS = [
     
     # Category-specific patterns
     "https://www.amazon.{marketplace}/s?i=merchant-items&me={seller_id}&rh=p_6%3A{seller_id}&page={page}",
-    "https://www.amazon.{marketplace}/s?i=merchant-items&me={seller_id}&rh=n%3A65801031&page={page}",  # Beauty category
-    "https://www.amazon.{marketplace}/s?i=merchant-items&me={seller_id}&rh=n%3A66280031&page={page}",  # Electronics
-    "https://www.amazon.{marketplace}/s?i=merchant-items&me={seller_id}&rh=n%3A117332031&page={page}", # Clothing
-    "https://www.amazon.{marketplace}/s?i=merchant-items&me={seller_id}&rh=n%3A560798&page={page}",    # Toys
+    # One per category node of the marketplace (see marketplaces)
+    "https://www.amazon.{marketplace}/s?i=merchant-items&me={seller_id}&rh=n%3A{category_node}&page={page}",
     
     # Different sorting methods
     "https://www.amazon.{marketplace}/s?i=merchant-items&me={seller_id}&s=price-desc-rank&page={page}",
@@ -63,130 +85,195 @@ SELLER_URL_PATTERNS = [
     "https://www.amazon.{marketplace}/s?i=merchant-items&me={seller_id}&s=relevancerank&page={page}",
 ]
 
+# Newest-first listing used by incremental scans
+DATE_DESC_PATTERN = next(pattern for pattern in SELLER_URL_PATTERNS if 's=date-desc-rank' in pattern)
+
+def seller_url_patterns(marketplace: str) -> List[str]:
+    """Get SELLER_URL_PATTERNS with the marketplace's ID and category nodes filled in."""
+    site = get_marketplace(marketplace)
+    patterns = []
+    for pattern in SELLER_URL_PATTERNS:
+        if '{marketplace_id}' in pattern:
+            if site.marketplace_id:
+                patterns.append(pattern.replace('{marketplace_id}', site.marketplace_id))
+        elif '{category_node}' in pattern:
+            patterns.extend(pattern.replace('{category_node}', node) for node in site.enhanced_category_nodes)
+        else:
+            patterns.append(pattern)
+    return patterns
+
+# Shared by all requests so parallel scans stay polite towards each host
+RATE_LIMITER = HostRateLimiter()
+
 def get_random_user_agent() -> str:
     """Get a random user agent to avoid blocking."""
     return random.choice(USER_AGENTS)
 
-def get_headers() -> Dict[str, str]:
-    """Generate headers with random user agent."""
+def get_headers(marketplace: str = "co.uk") -> Dict[str, str]:
+    """Generate headers with random user agent and the marketplace's Accept-Language."""
     return {
         'User-Agent': get_random_user_agent(),
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
+        'Accept-Language': get_marketplace(marketplace).accept_language,
         'Connection': 'keep-alive',
         'Upgrade-Insecure-Requests': '1'
     }
 
-def get_cache_path(seller_id: str, marketplace: str) -> str:
-    """Get the cache file path for a seller."""
-    return os.path.join(CACHE_DIR, f"{seller_id}_{marketplace}.json")
-
-def get_from_cache(seller_id: str, marketplace: str, max_age_hours: int = 12) -> Optional[Dict[str, Any]]:
-    """Get data from cache if not too old."""
-    cache_path = get_cache_path(seller_id, marketplace)
+def get_from_cache(seller_id: str, marketplace: str, max_age_hours: Optional[float] = CACHE_TTL_HOURS,
+                   revalidate: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Get data from cache if not too old (max_age_hours=None accepts any age).
     
-    if not os.path.exists(cache_path):
-        return None
-        
+    With revalidate, data up to CACHE_HARD_TTL_HOURS old may be returned while a
+    background scan refreshes it (when stale-while-revalidate is enabled).
+    """
     try:
-        with open(cache_path, 'r') as f:
-            cache_data = json.load(f)
-            
-        # Check if cache is too old
-        cache_time = datetime.fromisoformat(cache_data.get('timestamp', '2000-01-01T00:00:00'))
-        max_age = timedelta(hours=max_age_hours)
-        
-        if datetime.now() - cache_time > max_age:
-            logger.info(f"Cache for {seller_id} is older than {max_age_hours} hours")
-            return None
-            
-        return cache_data
+        max_age = max_age_hours * 3600 if max_age_hours is not None else None
+        with stage('cache_read'):
+            if revalidate:
+                return get_cache().get_inventory_or_revalidate(
+                    CACHE_NAMESPACE, seller_id, marketplace, max_age, CACHE_HARD_TTL_HOURS * 3600,
+                    refresh=lambda: scan_seller_inventory(seller_id, marketplace, force_refresh=True)
+                )
+            return get_cache().get_inventory(CACHE_NAMESPACE, seller_id, marketplace, max_age)
     except Exception as e:
         logger.error(f"Error reading cache: {e}")
         return None
 
 def save_to_cache(seller_id: str, marketplace: str, data: Dict[str, Any]) -> None:
-    """Save data to cache with timestamp."""
+    """Save data to cache with timestamp and record it in the price history."""
     try:
-        # Add timestamp
-        data['timestamp'] = datetime.now().isoformat()
-        
-        cache_path = get_cache_path(seller_id, marketplace)
-        with open(cache_path, 'w') as f:
-            json.dump(data, f)
+        with stage('cache_write'):
+            get_cache().save_inventory(CACHE_NAMESPACE, seller_id, marketplace, data)
             
         logger.info(f"Saved {len(data.get('products', []))} products to cache for {seller_id}")
     except Exception as e:
         logger.error(f"Error saving to cache: {e}")
+    with stage('cache_write'):
+        record_inventory(seller_id, marketplace, CACHE_NAMESPACE, data.get('products', []))
 
-def make_request(url: str, max_retries: int = 5, retry_delay: int = 4) -> Optional[requests.Response]:
+def make_request(url: str, max_retries: int = 5, retry_delay: int = 4) -> Optional['requests.Response']:
     """Make a request with retry logic and backoff."""
-    headers = get_headers()
+    headers = get_headers(marketplace_from_url(url))
     
     for attempt in range(max_retries):
-        session = None
+        if attempt:
+            count('retries')
+        # Proxies are shared with amazon_scraper and picked by health score
+        proxy = get_proxy_pool().choose()
+        proxy_dict = {'http': proxy['url'], 'https': proxy['url']} if proxy else None
+        started = time.monotonic()
         try:
-            # Use a new session each time
-            session = requests.Session()
-            response = session.get(url, headers=headers, timeout=15)
+            # Pooled per marketplace, so connections and cookies carry over between pages
+            add_time('sleep', RATE_LIMITER.wait(url))
+            started = time.monotonic()
+            with stage('fetch'):
+                response = SESSION_POOL.get_for_url(url).get(url, headers=headers, proxies=proxy_dict, timeout=15)
+            latency = time.monotonic() - started
+            count_status(response.status_code)
+            count('bytes_downloaded', len(response.content))
             
-            if response.status_code == 200:
+            # response.text decodes on every access
+            with stage('decode'):
+                text = response.text
+            
+            # Adapt the shared host rate; a 503 slows down every scraper process
+            RATE_LIMITER.record(url, response.status_code, text)
+            if proxy:
+                get_proxy_pool().record(proxy, latency, response.status_code, text)
+            
+            # A captcha page also comes with a 200, but has no products to read
+            if response.status_code == 200 and not is_blocked(200, text):
                 return response
             
-            if response.status_code == 503:
-                # Service unavailable - need longer backoff
-                backoff_time = (retry_delay * (attempt + 1)) + random.uniform(1, 3)
-                logger.warning(f"Service unavailable (503), backing off for {backoff_time:.1f}s, attempt {attempt+1}/{max_retries}")
-                time.sleep(backoff_time)
+            if response.status_code == 200:
+                logger.warning(f"Got a captcha page, slowing down, attempt {attempt+1}/{max_retries}")
+            elif response.status_code == 503:
+                logger.warning(f"Service unavailable (503), slowing down, attempt {attempt+1}/{max_retries}")
             else:
                 logger.warning(f"Request failed with status {response.status_code}, attempt {attempt+1}/{max_retries}")
-                # Add delay between retries with jitter
-                time.sleep(retry_delay + random.random() * retry_delay)
         except Exception as e:
             logger.warning(f"Request error: {e}, attempt {attempt+1}/{max_retries}")
-            time.sleep(retry_delay + random.random() * 2)
-        finally:
-            # Close the session
-            if session is not None:
-                session.close()
+            count_status(None)
+            if proxy:
+                get_proxy_pool().record(proxy, time.monotonic() - started, None)
+            with stage('sleep'):
+                time.sleep(retry_delay + random.random() * 2)
     
     return None
 
-def get_seller_name(seller_id: str, marketplace: str = "co.uk") -> Optional[str]:
-    """Get the seller's name from their storefront."""
+def get_seller_name(seller_id: str, marketplace: str = "co.uk", force_refresh: bool = False) -> Optional[str]:
+    """Get the seller's name, from the seller name cache or their storefront."""
+    return get_seller_names([seller_id], marketplace, force_refresh)[seller_id]
+
+def get_seller_names(seller_ids: Iterable[str], marketplace: str = "co.uk", force_refresh: bool = False,
+                     max_workers: int = DEFAULT_MAX_WORKERS) -> Dict[str, Optional[str]]:
+    """
+    Get the names of several sellers, as a dict of seller ID -> name (or None).
+    
+    Names are served from the long-lived seller name cache, which both
+    scrapers share; only the sellers missing from it are fetched.
+    """
+    return resolve_seller_names(lambda seller_id: fetch_seller_name(seller_id, marketplace), seller_ids,
+                                marketplace, CACHE_NAMESPACE, force_refresh, max_workers)
+
+def fetch_seller_name(seller_id: str, marketplace: str = "co.uk") -> Optional[str]:
+    """Fetch the seller's name from their /sp?seller= page."""
     url = f"https://www.amazon.{marketplace}/sp?seller={seller_id}"
     
     try:
         response = make_request(url)
         if not response:
             return None
-            
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Try different selectors for seller name
-        selectors = [
-            "#sellerName",
-            "h1.a-size-large",
-            "span.a-size-extra-large",
-            "h1.a-spacing-none"
-        ]
         
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element and element.text.strip():
-                return element.text.strip()
-                
-        return None
+        with stage('decode'):
+            html = response.text
+        with stage('extract'):
+            return extract_seller_name(html)
     except Exception as e:
         logger.error(f"Error getting seller name: {e}")
         return None
 
-def extract_products_from_search_page(html: str, seller_id: str) -> List[Dict[str, Any]]:
+def extract_seller_name(html: str) -> Optional[str]:
+    """Extract the seller's name from a /sp?seller= page."""
+    with stage('parse'):
+        soup = parse_html(html)
+    
+    # Try different selectors for seller name
+    selectors = [
+        "#sellerName",
+        "h1.a-size-large",
+        "span.a-size-extra-large",
+        "h1.a-spacing-none"
+    ]
+    
+    for selector in selectors:
+        element = soup.select_one(selector)
+        if element and element.text.strip():
+            return element.text.strip()
+            
+    return None
+
+def extract_products_from_search_page(html: str, seller_id: str, marketplace: str = "co.uk") -> List[Dict[str, Any]]:
     """Extract products from an Amazon search results page."""
+    products, _ = _extract_search_page(html, seller_id, marketplace)
+    return products
+
+def _extract_search_page(html: str, seller_id: str, marketplace: str) -> Tuple[List[Dict[str, Any]], bool]:
+    """Extract products from a search results page, and whether its pagination bar links to a next page."""
     products = []
     
     try:
-        soup = BeautifulSoup(html, 'html.parser')
+        # Common search page layouts are read without building a tree
+        with stage('parse'):
+            page = parse_search_page(html)
+        fast_products = _extract_fast_page(page, seller_id, marketplace) if page is not None else None
+        if fast_products is not None:
+            count('fast_path_pages')
+            logger.info(f"Extracted {len(fast_products)} products from page with the fast path")
+            next_link = page['next_link']
+            return fast_products, next_link is not None and not next_link['disabled']
+        count('fast_path_fallbacks')
         
         # Different product grid selectors to try
         grid_selectors = [
@@ -197,6 +284,9 @@ def extract_products_from_search_page(html: str, seller_id: str) -> List[Dict[st
             ".s-main-slot > div"
         ]
         
+        with stage('parse'):
+            soup = parse_html(html, results_only=True, product_selectors=grid_selectors)
+        
         # Find product elements
         product_elements = []
         for selector in grid_selectors:
@@ -238,78 +328,184 @@ def extract_products_from_search_page(html: str, seller_id: str) -> List[Dict[st
                 price_elem = product.select_one(".a-price .a-offscreen, span.a-price span.a-offscreen")
                 price = price_elem.text.strip() if price_elem else None
                 
-                # Build product object
-                product_obj = {
-                    "asin": asin,
-                    "title": title,
-                    "price": price,
-                    "link": f"https://www.amazon.co.uk/dp/{asin}",
-                    "seller_id": seller_id,
-                    "marketplace": "UK",
-                    "source": "enhanced_amazon"
-                }
-                
-                products.append(product_obj)
+                products.append(_build_product(asin, title, price, seller_id, marketplace))
             except Exception as e:
                 logger.debug(f"Error processing product: {e}")
                 
         logger.info(f"Extracted {len(products)} products from page")
-        return products
+        return products, _has_next_page(soup)
     except Exception as e:
         logger.error(f"Error parsing products: {e}")
-        return []
+        return [], False
 
-def scan_seller_inventory(seller_id: str, marketplace: str = "co.uk", force_refresh: bool = False) -> Tuple[List[Dict[str, Any]], str]:
-    """Scan a seller's complete inventory using multiple approaches."""
+def _has_next_page(soup: 'BeautifulSoup') -> bool:
+    """Check whether a page's pagination bar has an enabled "Next" link."""
+    next_button = soup.select_one('.a-pagination .a-last a')
+    if next_button is None:
+        return False
+    parent = next_button.parent
+    return parent is None or 'a-disabled' not in (parent.get('class') or [])
+
+def _extract_fast_page(page: Dict[str, Any], seller_id: str, marketplace: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Build the products of a page read by fast_extract.
+    
+    Returns None, so the page is parsed with BeautifulSoup instead, when the
+    selectors in extract_products_from_search_page might pick something else:
+    no listed results, an ASIN that isn't one or is only in
+    data-component-props, or a result without a title.
+    """
+    results = [result for result in page['results'] if result['result_item'] and result['listed']]
+    if not results:
+        return None
+    
+    products = []
+    for result in results:
+        # Skip sponsored products
+        if result['sponsored'] is not None and "Sponsored" in result['sponsored']:
+            continue
+        
+        asin = result['asin']
+        if not asin:
+            if result['props'] and 'asin' in result['props']:
+                return None
+            continue
+        
+        title = (result['heading'] or '').strip()
+        if not ASIN_PATTERN.fullmatch(asin) or not title:
+            return None
+        price = result['price'].strip() if result['price'] is not None else None
+        products.append(_build_product(asin, title, price, seller_id, marketplace))
+    return products
+
+def _build_product(asin: str, title: str, price: Optional[str], seller_id: str, marketplace: str) -> Dict[str, Any]:
+    """Build the product dict of a search result."""
+    site = get_marketplace(marketplace)
+    return {
+        "asin": asin,
+        "title": title,
+        "price": price,
+        "link": site.product_link(asin),
+        "seller_id": seller_id,
+        "marketplace": site.code,
+        "source": "enhanced_amazon"
+    }
+
+def _extract_page(response: 'requests.Response', seller_id: str, marketplace: str) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Decode a fetched search page and extract its products, in a parser process during a sweep with them.
+    
+    Returns:
+        Tuple of (products, has_next_page)
+    """
+    products, has_next = parse_page(_read_page, response, seller_id, marketplace)
+    if products:
+        count('pages')
+    return products, has_next
+
+def _read_page(response: 'requests.Response', seller_id: str, marketplace: str) -> Tuple[List[Dict[str, Any]], bool]:
+    with stage('decode'):
+        html = response.text
+    with stage('extract'):
+        return _extract_search_page(html, seller_id, marketplace)
+
+def iter_seller_inventory(seller_id: str, marketplace: str = "co.uk", force_refresh: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Scan a seller's complete inventory, yielding records as the scan goes.
+    
+    Yields dicts with a 'type' of:
+        product:  {'product': {...}} the first time an ASIN is seen
+        progress: after every page, with the pattern and page numbers and the
+                  running product count
+        summary:  once at the end, with seller_name, product_count, requests,
+                  whether the products came from the cache and the scan's
+                  stage timings and counters under 'stats' (see scrape_stats)
+    
+    The inventory is cached once the scan completes. While one process scans a
+    seller, other callers wait and get the records of its cached result.
+    """
+    with scan_stats(CACHE_NAMESPACE, seller_id) as stats:
+        for record in _iter_inventory(seller_id, marketplace, force_refresh):
+            if record['type'] == 'summary':
+                record['stats'] = stats.to_dict()
+            yield record
+
+def _iter_inventory(seller_id: str, marketplace: str, force_refresh: bool) -> Iterator[Dict[str, Any]]:
     logger.info(f"Scanning inventory for seller {seller_id} on {marketplace}")
     
     # Check cache first unless force refresh
     if not force_refresh:
-        cache_data = get_from_cache(seller_id, marketplace)
+        cache_data = get_from_cache(seller_id, marketplace, revalidate=True)
         if cache_data and 'products' in cache_data:
-            products = cache_data['products']
-            seller_name = cache_data.get('seller_name', 'Unknown')
-            logger.info(f"Using cached data with {len(products)} products")
-            return products, seller_name
+            logger.info(f"Using cached data with {len(cache_data['products'])} products")
+            yield from _cached_records(seller_id, cache_data)
+            return
     
-    all_products = {}  # Use dict to deduplicate by ASIN
+    # Only one process scans a seller at a time; callers arriving meanwhile reuse its result
+    since = time.time()
+    with Flight(f"{CACHE_NAMESPACE}_{seller_id}_{marketplace}") as waited:
+        cache_data = get_from_cache(seller_id, marketplace, max_age_hours=(time.time() - since) / 3600) if waited else None
+        if cache_data and 'products' in cache_data:
+            logger.info(f"Reusing the concurrent scan of seller {seller_id}")
+            yield from _cached_records(seller_id, cache_data)
+        else:
+            yield from _scan_inventory(seller_id, marketplace)
+
+def _cached_records(seller_id: str, cache_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield the records of a cached inventory."""
+    products = cache_data['products']
+    for product in products:
+        yield {'type': 'product', 'product': product}
+    yield {'type': 'summary', 'seller_id': seller_id, 'seller_name': cache_data.get('seller_name', 'Unknown'),
+           'product_count': len(products), 'requests': 0, 'cached': True}
+
+def _scan_inventory(seller_id: str, marketplace: str) -> Iterator[Dict[str, Any]]:
+    """Crawl a seller's planned URL patterns, yielding records, and cache the result."""
+    all_products = ProductStore()  # Deduplicate by ASIN, keeping first-seen order
     seller_name = get_seller_name(seller_id, marketplace) or "Unknown Seller"
+    total_requests = 0
+    
+    # Try the URL patterns that have paid off for this seller, best first
+    planner = UrlPatternPlanner(seller_id, marketplace)
+    url_patterns = planner.plan(seller_url_patterns(marketplace))
     
-    # Try each URL pattern
-    for pattern_idx, url_pattern in enumerate(SELLER_URL_PATTERNS):
+    for pattern_idx, url_pattern in enumerate(url_patterns):
         pattern_products_count = 0
+        requests_made = 0
+        failed_requests = 0
+        new_asins = 0
         
-        logger.info(f"Trying URL pattern {pattern_idx+1}/{len(SELLER_URL_PATTERNS)}")
+        logger.info(f"Trying URL pattern {pattern_idx+1}/{len(url_patterns)}")
         
         # Search multiple pages for each pattern (up to 7 pages)
         for page in range(1, 8):
             url = url_pattern.format(marketplace=marketplace, seller_id=seller_id, page=page)
             logger.info(f"Trying URL: {url}")
             
+            requests_made += 1
             response = make_request(url)
             
             if not response:
                 logger.info(f"No response for URL pattern {pattern_idx+1}, page {page}")
+                failed_requests += 1
                 break
                 
             # Extract products from page
-            page_products = extract_products_from_search_page(response.text, seller_id)
+            page_products, _ = _extract_page(response, seller_id, marketplace)
             
             if not page_products:
                 logger.info(f"No products found in page {page} for pattern {pattern_idx+1}")
+                failed_requests += 1
                 break
                 
             # Add new products
             for product in page_products:
-                if product['asin'] not in all_products:
-                    all_products[product['asin']] = product
+                if all_products.add(product):
+                    new_asins += 1
+                    yield {'type': 'product', 'product': product}
                     
             pattern_products_count += len(page_products)
-            
-            # Add sufficient delay between pages to avoid rate limiting
-            delay = 3 + random.uniform(2, 5)
-            logger.info(f"Waiting {delay:.1f}s before next request...")
-            time.sleep(delay)
+            yield _progress_record(pattern_idx, len(url_patterns), page, len(all_products))
             
         logger.info(f"Found {pattern_products_count} products for pattern {pattern_idx+1}")
         
@@ -322,26 +518,34 @@ def scan_seller_inventory(seller_id: str, marketplace: str = "co.uk", force_refr
                 url = url_pattern.format(marketplace=marketplace, seller_id=seller_id, page=page)
                 logger.info(f"Trying extra page {page}: {url}")
                 
+                requests_made += 1
                 response = make_request(url)
                 
                 if not response:
+                    failed_requests += 1
                     break
                     
-                page_products = extract_products_from_search_page(response.text, seller_id)
+                page_products, _ = _extract_page(response, seller_id, marketplace)
                 
                 if not page_products:
+                    failed_requests += 1
                     break
                     
                 # Add new products
                 for product in page_products:
-                    if product['asin'] not in all_products:
-                        all_products[product['asin']] = product
-                        
-                # Add short delay between pages
-                time.sleep(1 + random.random())
+                    if all_products.add(product):
+                        new_asins += 1
+                        yield {'type': 'product', 'product': product}
+                yield _progress_record(pattern_idx, len(url_patterns), page, len(all_products))
+        
+        planner.record(url_pattern, requests_made, new_asins, failed_requests)
+        count('new_asins', new_asins)
+        total_requests += requests_made
+    
+    planner.save()
     
     # Convert to list
-    product_list = list(all_products.values())
+    product_list = all_products.to_list()
     
     # Cache results
     cache_data = {
@@ -353,29 +557,238 @@ def scan_seller_inventory(seller_id: str, marketplace: str = "co.uk", force_refr
     save_to_cache(seller_id, marketplace, cache_data)
     
     logger.info(f"Found {len(product_list)} unique products for seller {seller_id}")
-    return product_list, seller_name
+    yield {'type': 'summary', 'seller_id': seller_id, 'seller_name': seller_name,
+           'product_count': len(product_list), 'requests': total_requests, 'cached': False}
+
+def _progress_record(pattern_idx: int, pattern_count: int, page: int, product_count: int) -> Dict[str, Any]:
+    return {'type': 'progress', 'pattern': pattern_idx + 1, 'patterns': pattern_count,
+            'page': page, 'product_count': product_count}
+
+def scan_seller_inventory(seller_id: str, marketplace: str = "co.uk", force_refresh: bool = False) -> Tuple[List[Dict[str, Any]], str]:
+    """Scan a seller's complete inventory using multiple approaches."""
+    products, summary = _collect_inventory(seller_id, marketplace, force_refresh)
+    return products, summary.get('seller_name', "Unknown Seller")
+
+def _collect_inventory(seller_id: str, marketplace: str, force_refresh: bool) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Run a seller scan to the end, returning its products and summary record."""
+    products = []
+    summary = {}
+    for record in iter_seller_inventory(seller_id, marketplace, force_refresh):
+        if record['type'] == 'product':
+            products.append(record['product'])
+        elif record['type'] == 'summary':
+            summary = record
+    return products, summary
+
+def stream_seller_products(seller_id: str, marketplace: str = "co.uk", force_refresh: bool = False,
+                           out=None) -> None:
+    """Write a seller scan to `out` (default stdout) as NDJSON, one record per line as it happens."""
+    out = out or sys.stdout
+    try:
+        for record in iter_seller_inventory(seller_id, marketplace, force_refresh):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+    except Exception as e:
+        logger.error(f"Error scanning seller inventory: {e}")
+        out.write(json.dumps({'type': 'error', 'error': str(e)}) + "\n")
+        out.flush()
 
-def get_seller_products(seller_id: str, marketplace: str = "co.uk", force_refresh: bool = False) -> List[Dict[str, Any]]:
-    """Get products from an Amazon seller. This function can be called from Node.js."""
+def scan_seller_changes(seller_id: str, marketplace: str = "co.uk", max_pages: int = 15,
+                        with_stats: bool = False) -> Dict[str, Any]:
+    """
+    Incrementally scan a seller for new, changed and missing products.
+    
+    Reads the newest-first listing and stops at the first page whose products
+    are all in the seller's cache. Without a cached inventory, a full scan is
+    run instead and every product counts as new.
+    
+    Returns:
+        Dict with new, changed and missing products, the merged inventory under
+        'products', whether the listing was read to its end ('complete') and
+        the number of requests made (None after a full scan), plus the scan's
+        stage timings and counters under 'stats' with with_stats
+    """
+    with scan_stats(CACHE_NAMESPACE, seller_id) as stats:
+        delta = _scan_changes(seller_id, marketplace, max_pages)
+    if with_stats:
+        delta['stats'] = stats.to_dict()
+    return delta
+
+def _scan_changes(seller_id: str, marketplace: str, max_pages: int) -> Dict[str, Any]:
+    logger.info(f"Checking seller {seller_id} on {marketplace} for changes")
+    
+    cache_data = get_from_cache(seller_id, marketplace, max_age_hours=None)
+    if not cache_data or not cache_data.get('products'):
+        logger.info(f"No cached inventory for seller {seller_id}, running a full scan")
+        products, _ = scan_seller_inventory(seller_id, marketplace, force_refresh=True)
+        if products:
+            record_check(seller_id, marketplace, None, None)
+        delta = build_delta([], ProductStore(products), complete=True)
+        delta['requests'] = None
+        return delta
+    
+    cached_products = cache_data['products']
+    known = ProductStore(cached_products)
+    seen = ProductStore()
+    complete = False
+    requests_made = 0
+    
+    for page in range(1, max_pages + 1):
+        url = DATE_DESC_PATTERN.format(marketplace=marketplace, seller_id=seller_id, page=page)
+        logger.info(f"Trying URL: {url}")
+        
+        requests_made += 1
+        response = make_request(url)
+        if not response:
+            logger.info(f"No response for newest-first page {page}")
+            break
+        
+        page_products, has_next = _extract_page(response, seller_id, marketplace)
+        if not page_products:
+            # Could be a changed layout or a block page as well as the end of the
+            # listing, so don't count anything unseen as delisted
+            logger.info(f"No products on newest-first page {page}, stopping")
+            break
+        
+        seen.update(page_products)
+        
+        # Only a page without a next link shows we've read the whole listing,
+        # unless Amazon stopped paginating at its limit
+        if not has_next:
+            complete = page < SEARCH_PAGE_LIMIT
+            if not complete:
+                logger.info(f"Reached Amazon's {SEARCH_PAGE_LIMIT} page limit, not counting unseen products as delisted")
+            break
+        
+        # Newest listings come first, so a fully known page means we've caught up
+        if all(product['asin'] in known for product in page_products):
+            logger.info(f"Page {page} only has known products, stopping")
+            break
+    
+    delta = build_delta(cached_products, seen, complete)
+    delta['requests'] = requests_made
+    count('new_asins', len(delta['new']))
+    logger.info(f"Seller {seller_id}: {len(delta['new'])} new, {len(delta['changed'])} changed, "
+                f"{len(delta['missing'])} missing after {requests_made} requests")
+    
+    # Only refresh the cache and the check schedule if we actually read something
+    if seen:
+        save_to_cache(seller_id, marketplace, {
+            'seller_id': seller_id,
+            'seller_name': cache_data.get('seller_name', 'Unknown'),
+            'products': delta['products'],
+            'marketplace': marketplace
+        })
+        record_check(seller_id, marketplace, len(delta['new']), requests_made)
+    return delta
+
+def get_seller_products(seller_id: str, marketplace: str = "co.uk", force_refresh: bool = False,
+                        with_stats: bool = False, profile: Union[bool, str] = False) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Get products from an Amazon seller. This function can be called from Node.js.
+    
+    With with_stats, returns {'products': [...], 'stats': {...}} instead of the list.
+    With profile, the scan is profiled into the profile directory (or the
+    directory given as `profile`, see scan_profiler).
+    """
     logger.info(f"Getting products for seller {seller_id}")
     logger.info(f"Force refresh: {force_refresh}")
     
     try:
-        products, seller_name = scan_seller_inventory(seller_id, marketplace, force_refresh)
+        with _profiler(seller_id, profile):
+            products, summary = _collect_inventory(seller_id, marketplace, force_refresh)
         logger.info(f"Found {len(products)} products for seller {seller_id}")
-        return products
+        return {'products': products, 'stats': summary.get('stats')} if with_stats else products
     except Exception as e:
         logger.error(f"Error scanning seller inventory: {e}")
-        return []
+        return {'products': [], 'stats': None} if with_stats else []
 
-if __name__ == "__main__":
-    # This allows calling from Node.js
-    if len(sys.argv) >= 2:
-        seller_id = sys.argv[1]
-        marketplace = sys.argv[2] if len(sys.argv) >= 3 else "co.uk"
-        force_refresh = sys.argv[3].lower() == "true" if len(sys.argv) >= 4 else False
+def _profiler(seller_id: str, profile: Union[bool, str]):
+    """Get a context profiling a scan if asked to; the profiling stack is only imported then."""
+    if not profile:
+        return nullcontext()
+    from scan_profiler import profiled
+    return profiled(f"{CACHE_NAMESPACE}-{seller_id}", profile)
+
+def _backend(args: argparse.Namespace):
+    """Get a context switching HTTP requests to the backend picked on the command line."""
+    if not (args.replay or args.stand_in or args.record):
+        return nullcontext()
+    
+    import scan_profiler
+    if args.record:
+        return scan_profiler.use_backend(scan_profiler.RecordingAdapter(args.record),
+                                         pace_requests=True, isolate_state=False)
+    # Replayed scans run without pacing, on a throwaway cache
+    pages = scan_profiler.recorded_pages(args.replay) if args.replay else scan_profiler.stand_in_pages()
+    return scan_profiler.use_backend(scan_profiler.ReplayAdapter(pages))
+
+def scan_sellers(seller_ids: Optional[Iterable[str]] = None, marketplace: str = "co.uk", force_refresh: bool = False,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 parse_workers: int = DEFAULT_PARSE_WORKERS) -> Iterator[Dict[str, Any]]:
+    """
+    Scan several sellers over a bounded pool, yielding each result as it finishes.
+    
+    All requests share the marketplace's pooled session and the module rate
+    limiter. A failing seller is reported in its own result. With
+    parse_workers > 0, fetched pages are parsed in that many processes (see
+    parse_pool).
+    """
+    # Size the connection pool so concurrent scans don't discard connections
+    SESSION_POOL.reserve(max_workers)
+    
+    with sweep_pool(parse_workers) as pool:
+        def scan(seller_id: str) -> List[Dict[str, Any]]:
+            with use_pool(pool):
+                return scan_seller_inventory(seller_id, marketplace, force_refresh)[0]
         
-        products = get_seller_products(seller_id, marketplace, force_refresh)
-        print(json.dumps(products))
-    else:
-        print("Usage: python enhanced_amazon_scraper.py <seller_id> [marketplace] [force_refresh]")
\ No newline at end of file
+        yield from run_batch(scan, seller_ids, marketplace, max_workers)
+
+def scan_marketplaces(seller_id: str, marketplaces: Optional[Iterable[str]] = None,
+                      force_refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Scan a seller on several marketplaces at the same time. This function can be called from Node.js.
+    
+    Each marketplace's requests go through its own pooled session and are
+    paced by the module rate limiter's bucket for that host.
+    
+    Args:
+        seller_id: The Amazon seller ID
+        marketplaces: Marketplaces to scan (default: every registered one)
+        force_refresh: Whether to bypass cache and force fresh scrapes
+    
+    Returns:
+        Dict of marketplace -> dict with products, error and elapsed seconds
+    """
+    marketplaces = list(dict.fromkeys(marketplaces or MARKETPLACES))
+    return run_marketplaces(lambda marketplace: scan_seller_inventory(seller_id, marketplace, force_refresh)[0],
+                            seller_id, marketplaces)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Scan a seller from the command line, printing the products as JSON (or NDJSON with --stream)."""
+    parser = argparse.ArgumentParser(description="Scan an Amazon seller's inventory")
+    parser.add_argument('seller_id')
+    parser.add_argument('marketplace', nargs='?', default="co.uk")
+    parser.add_argument('force_refresh', nargs='?', default="false", help="'true' to bypass the cache")
+    parser.add_argument('--stream', action='store_true', help="Write records as NDJSON lines while the scan runs")
+    parser.add_argument('--profile', nargs='?', const=True, default=False, metavar='DIR',
+                        help="Profile the scan (cProfile, tracemalloc, stack samples) into DIR or data/profiles")
+    backends = parser.add_mutually_exclusive_group()
+    backends.add_argument('--replay', metavar='DIR', help="Serve requests from pages recorded with --record")
+    backends.add_argument('--stand-in', action='store_true', help="Serve requests from generated pages")
+    backends.add_argument('--record', metavar='DIR', help="Save every page fetched for later --replay")
+    args = parser.parse_args(argv)
+    force_refresh = args.force_refresh.lower() == "true"
+    
+    with _backend(args):
+        if args.stream:
+            with _profiler(args.seller_id, args.profile):
+                stream_seller_products(args.seller_id, args.marketplace, force_refresh)
+        else:
+            products = get_seller_products(args.seller_id, args.marketplace, force_refresh, profile=args.profile)
+            print(json.dumps(products))
+
+if __name__ == "__main__":
+    # This allows calling from Node.js:
+    # python enhanced_amazon_scraper.py <seller_id> [marketplace] [force_refresh] [--stream] [--profile [DIR]]
+    main()
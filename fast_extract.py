@@ -0,0 +1,329 @@
+"""
+Fast-path Search Page Extraction
+
+This module reads what the scrapers need from a search results page straight
+from the markup, without building a BeautifulSoup tree. A streaming tokenizer
+walks the results region (the s-main-slot element) tag by tag and records, for
+every result, its data-asin and the text of the elements the scrapers' title,
+price and sponsored-label selectors would pick, plus the pagination bar's next
+link.
+
+Only the common layout is handled. When anything looks unusual (no results
+region, a non-UTF-8 page, unbalanced or oddly quoted markup, nested results,
+scripts, comments or stray '<' inside a field), parse_search_page returns None
+and the scrapers parse the page with BeautifulSoup as before. The scrapers also
+check the results they get (ASIN format, titles present) before using them.
+
+Set SCRAPER_FAST_EXTRACT=0 to always use the BeautifulSoup path.
+"""
+
+import os
+import re
+import html
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+import html_parser_backend
+
+logger = logging.getLogger('fast_extract')
+
+ENABLED = os.environ.get('SCRAPER_FAST_EXTRACT', '1') not in ('0', 'false', 'no')
+
+ASIN_PATTERN = re.compile(r'[A-Z0-9]{10}')
+
+# An opening or closing tag, with attribute values that may contain '>'
+_TAG = re.compile(
+    r'''<(/?)([A-Za-z][A-Za-z0-9-]*)((?:\s+[^\s=>/"']+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s>"'=`]+))?)*)\s*(/?)>'''
+)
+_ATTRIBUTE = re.compile(r'''([^\s=>/"']+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"'=`]+)))?''')
+# A tag or a comment, whichever comes first
+_TOKEN = re.compile(r'<!--.*?-->|' + _TAG.pattern, re.S)
+_DECLARED_CHARSET = re.compile(rb'''charset\s*=\s*["']?([A-Za-z0-9_-]+)''', re.I)
+
+_VOID_ELEMENTS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                            'param', 'source', 'track', 'wbr'))
+_BLOCK_ELEMENTS = frozenset(('div', 'p', 'ul', 'ol', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table',
+                             'section', 'form'))
+# Elements whose content is not markup
+_RAW_TEXT_ELEMENTS = frozenset(('script', 'style', 'textarea', 'title', 'template', 'xmp', 'iframe',
+                                'noembed', 'noframes', 'noscript', 'plaintext'))
+_TAG_NAME_ENDS = frozenset((' ', '\t', '\n', '\f', '/', '>'))
+# Openings that hide the markup after them until their closing
+_HIDING_MARKUP = (('<!--', '-->'),) + tuple((f'<{tag}', f'</{tag}') for tag in
+                                             ('script', 'style', 'title', 'textarea', 'noscript', 'template', 'iframe'))
+
+RESULTS_SLOT_CLASS = 's-main-slot'
+
+# Classes the tokenizer looks at; on a void element they would make selectors pick an empty text
+_FIELD_CLASSES = frozenset(('a-text-normal', 'a-offscreen', 'a-price', 'a-color-price', 's-label-popover-default'))
+
+# Class sets of the title spans the enhanced scraper looks for
+_HEADING_CLASSES = (frozenset(('a-size-medium', 'a-color-base', 'a-text-normal')),
+                    frozenset(('a-size-base-plus', 'a-color-base', 'a-text-normal')))
+
+# Markers that must not occur outside the results region for a full-document
+# parse to see what the tokenizer sees
+_OUTSIDE_MARKERS = ('data-asin', 's-result-item', 's-result-list', 'a-pagination')
+
+
+class _Unusual(Exception):
+    """Raised when a page is not in the layout the fast path understands."""
+
+
+def parse_search_page(markup: Union[str, bytes]) -> Optional[Dict[str, Any]]:
+    """
+    Tokenize the results region of a search page.
+
+    Args:
+        markup: Page content as text or raw bytes
+
+    Returns:
+        Dict with 'results', a list of result dicts in page order, and
+        'next_link' (None, or {'disabled': bool} for the first link of the
+        pagination bar's a-last item). Each result has:
+            asin         data-asin attribute ('' if empty, None if missing)
+            result_item  whether the div has the s-result-item class
+            listed       whether it is inside a div.s-result-list
+            props        data-component-props attribute, if any
+            text_normal  text of the first .a-text-normal element
+            heading      text of the first title span, or h2/h5 link
+            price        text of the first .a-offscreen inside .a-price
+            price_other  whether a .a-price or .a-color-price element is present
+            sponsored    text of the first span.s-label-popover-default
+        Fields whose element is missing are None. Returns None if the page is
+        not in the common layout or the fast path is disabled.
+    """
+    if not ENABLED:
+        return None
+    try:
+        return _parse(_decode(markup))
+    except _Unusual as e:
+        logger.debug(f"Fast path not used: {e}")
+        return None
+
+
+def _decode(markup: Union[str, bytes]) -> str:
+    """Get the page as text, if it is UTF-8 (decoding is cheap next to parsing)."""
+    if isinstance(markup, str):
+        return markup
+    declared = _DECLARED_CHARSET.search(markup, 0, 4096)
+    if declared and declared.group(1).lower() not in (b'utf-8', b'utf8'):
+        raise _Unusual(f"declared charset {declared.group(1).decode('ascii')}")
+    try:
+        return markup.decode('utf-8')
+    except UnicodeDecodeError:
+        raise _Unusual("not UTF-8")
+
+
+def _attributes(attribute_text: str) -> Dict[str, str]:
+    """Parse the attributes of a tag; the first of repeated attributes wins."""
+    attributes = {}
+    for match in _ATTRIBUTE.finditer(attribute_text):
+        name = match.group(1).lower()
+        if name not in attributes:
+            value = match.group(2) if match.group(2) is not None else (match.group(3) or match.group(4) or '')
+            attributes[name] = html.unescape(value) if '&' in value else value
+    return attributes
+
+
+def _tags_with(text: str, marker: str, start: int = 0, end: Optional[int] = None) -> List[re.Match]:
+    """Find the opening tags between start and end that have a marker as a class or an attribute name."""
+    end = len(text) if end is None else end
+    tags = []
+    pos = text.find(marker, start, end)
+    while pos >= 0:
+        tag_start = text.rfind('<', 0, pos)
+        match = _TAG.match(text, tag_start) if tag_start >= 0 else None
+        if match and match.end() > pos and not match.group(1):
+            if text.rfind('<', 0, tag_start) > text.rfind('>', 0, tag_start):
+                raise _Unusual(f"{marker} tag inside an unterminated tag")
+            attributes = _attributes(match.group(3))
+            if marker in attributes or marker in attributes.get('class', '').split():
+                tags.append(match)
+        pos = text.find(marker, pos + len(marker), end)
+    return tags
+
+
+def _text(text: str, start: int, end: int) -> str:
+    """Get the text content of an element from its inner markup, like Tag.text."""
+    content = text[start:end]
+    if '\r' in content:
+        raise _Unusual("carriage return inside a field")
+    if '<' in content:
+        if '<!' in content or any(f'<{tag}' in content for tag in _RAW_TEXT_ELEMENTS):
+            raise _Unusual("comment, script or raw text inside a field")
+        content = _TAG.sub('', content)
+        if '<' in content:
+            raise _Unusual("stray '<' inside a field")
+    return html.unescape(content) if '&' in content else content
+
+
+def _parse(text: str) -> Dict[str, Any]:
+    slots = _tags_with(text, RESULTS_SLOT_CLASS)
+    if len(slots) != 1:
+        raise _Unusual(f"{len(slots)} results regions")
+    slot = slots[0]
+    _check_not_hidden(text, slot.start())
+
+    walker = _Walker(text)
+    slot_end = walker.walk(slot.start(), results=True)
+
+    # A full parse sees the whole page, so nothing the scrapers select may be outside the region
+    if not html_parser_backend.RESTRICT_TO_RESULTS:
+        for marker in _OUTSIDE_MARKERS:
+            if _tags_with(text, marker, 0, slot.start()) or _tags_with(text, marker, slot_end):
+                raise _Unusual(f"{marker} outside the results region")
+
+    # Pagination bars outside the region are kept by a results-region parse too
+    next_link = None
+    end = 0
+    for bar in _tags_with(text, 'a-pagination', 0, slot.start()) + [slot] + _tags_with(text, 'a-pagination', slot_end):
+        if bar.start() < end:
+            continue  # Inside the previous one
+        if bar is slot:
+            end = slot_end
+            next_link = next_link or walker.next_link
+            continue
+        bar_walker = _Walker(text)
+        end = bar_walker.walk(bar.start(), results=False)
+        next_link = next_link or bar_walker.next_link
+
+    return {'results': walker.results, 'next_link': next_link}
+
+
+def _check_not_hidden(text: str, end: int) -> None:
+    """
+    Make sure the markup at `end` isn't inside a comment or raw text element.
+
+    That is the case if the last opening of some kind before `end` has no
+    closing after it. Only lowercase tags are looked for, as Amazon writes them.
+    """
+    for opening, closing in _HIDING_MARKUP:
+        start = text.rfind(opening, 0, end)
+        if start < 0:
+            continue
+        # An end tag only counts when its name ends there ('</title<b>' is text)
+        pos = text.find(closing, start, end)
+        while pos >= 0 and closing != '-->' and text[pos + len(closing):pos + len(closing) + 1] not in _TAG_NAME_ENDS:
+            pos = text.find(closing, pos + 1, end)
+        if pos < 0:
+            raise _Unusual(f"results region inside {opening}")
+
+
+class _Walker:
+    """Streaming tokenizer over one element of a page and everything inside it."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.results: List[Dict[str, Any]] = []
+        self.next_link: Optional[Dict[str, bool]] = None
+
+    def walk(self, pos: int, results: bool) -> int:
+        """
+        Tokenize the element whose opening tag starts at pos, collecting
+        results (if asked to) and the first pagination next link.
+
+        Returns:
+            The position just after the element's closing tag
+        """
+        text = self.text
+        # Open elements: [tag, classes, captures]; captures are (field, start of content)
+        stack: List[list] = []
+        record: Optional[Dict[str, Any]] = None
+        record_depth = 0
+
+        while True:
+            match = _TOKEN.search(text, pos)
+            if match is None:
+                raise _Unusual("element never closed")
+            if text.find('<', pos, match.start()) >= 0:
+                raise _Unusual("stray '<' in the markup")
+            pos = match.end()
+            closing, tag, attribute_text, self_closing = match.groups()
+            if tag is None:
+                continue  # A comment
+            tag = tag.lower()
+
+            if closing:
+                if not stack or stack[-1][0] != tag:
+                    raise _Unusual(f"unbalanced </{tag}>")
+                _, _, captures = stack.pop()
+                for field, start in captures:
+                    record[field] = _text(text, start, match.start())
+                if record is not None and len(stack) == record_depth:
+                    self.results.append(record)
+                    record = None
+                if not stack:
+                    return pos
+                continue
+
+            attributes = _attributes(attribute_text) if attribute_text else {}
+            classes = frozenset(attributes.get('class', '').split())
+
+            if tag in _VOID_ELEMENTS or self_closing:
+                if tag not in _VOID_ELEMENTS or classes & _FIELD_CLASSES or 'data-asin' in attributes:
+                    raise _Unusual(f"self-closed <{tag}>")
+                continue
+
+            captures = []
+            if results and tag == 'div' and ('data-asin' in attributes or 's-result-item' in classes):
+                if record is not None:
+                    raise _Unusual("nested results")
+                record = {
+                    'asin': attributes.get('data-asin'),
+                    'result_item': 's-result-item' in classes,
+                    'listed': any(entry[0] == 'div' and 's-result-list' in entry[1] for entry in stack),
+                    'props': attributes.get('data-component-props'),
+                    'text_normal': None,
+                    'heading': None,
+                    'price': None,
+                    'price_other': False,
+                    'sponsored': None,
+                }
+                record_depth = len(stack)
+
+            if record is not None:
+                fields = []
+                if 'a-text-normal' in classes and record['text_normal'] is None:
+                    fields.append('text_normal')
+                if record['heading'] is None and (
+                    any(heading <= classes for heading in _HEADING_CLASSES)
+                    or (tag == 'a' and 'a-link-normal' in classes and any(entry[0] == 'h2' for entry in stack))
+                    or (tag == 'a' and any(entry[0] == 'h5' for entry in stack))
+                ):
+                    fields.append('heading')
+                if ('a-offscreen' in classes and record['price'] is None
+                        and any('a-price' in entry[1] for entry in stack)):
+                    fields.append('price')
+                if 'a-price' in classes or 'a-color-price' in classes:
+                    record['price_other'] = True
+                if tag == 'span' and 's-label-popover-default' in classes and record['sponsored'] is None:
+                    fields.append('sponsored')
+                for field in fields:
+                    # Claimed now so a nested element can't take the field first
+                    record[field] = ''
+                    captures.append((field, pos))
+
+            if tag == 'a' and self.next_link is None:
+                # '.a-pagination .a-last a': an a-last element below an a-pagination one
+                in_pagination = in_last = False
+                for entry in stack:
+                    in_last = in_last or (in_pagination and 'a-last' in entry[1])
+                    in_pagination = in_pagination or 'a-pagination' in entry[1]
+                if in_last:
+                    self.next_link = {'disabled': 'a-disabled' in stack[-1][1]}
+
+            if tag in _RAW_TEXT_ELEMENTS:
+                end = re.compile(rf'</{tag}\s*>', re.I).search(text, pos)
+                if end is None or captures or not stack:
+                    raise _Unusual(f"unclosed or captured <{tag}>")
+                pos = end.end()
+                continue
+
+            # Markup an HTML parser would restructure (a link in a link, a block in a paragraph)
+            if tag == 'a' and any(entry[0] == 'a' for entry in stack):
+                raise _Unusual("nested <a>")
+            if tag in _BLOCK_ELEMENTS and any(entry[0] == 'p' for entry in stack):
+                raise _Unusual(f"<{tag}> inside <p>")
+
+            stack.append([tag, classes, captures])
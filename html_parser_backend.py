@@ -0,0 +1,110 @@
+"""
+HTML Parser Backend
+
+This module builds the BeautifulSoup trees used by both scrapers. It picks the
+fastest installed tree builder (lxml, falling back to Python's html.parser) and
+can restrict parsing to the search results region of a page, so the rest of a
+~1 MB Amazon results page is never turned into Python objects.
+
+Both scrapers query the tree with the same CSS selectors whichever backend is
+used. Set SCRAPER_HTML_PARSER to force a builder. Results-region parsing is
+off unless SCRAPER_PARSE_RESULTS_ONLY=1: it has only been checked against the
+synthetic fixture corpus, so run benchmarks/check_parser_equivalence.py with
+--corpus over recorded pages before turning it on. When it is on, a page whose
+results region has none of the scraper's product elements is parsed again in
+full.
+
+bs4 (and lxml) are only imported when the first page is parsed, so callers
+served from the cache never load them.
+"""
+
+import os
+import re
+import logging
+from typing import TYPE_CHECKING, Sequence, Union
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+logger = logging.getLogger('html_parser_backend')
+
+# Tree builders in order of preference
+PREFERRED_PARSERS = ['lxml', 'html.parser']
+
+# Elements kept when parsing only the results region: the results container
+# itself and the pagination bar that tells us whether there is a next page
+RESULTS_REGION_CLASSES = re.compile(r'(^|\s)(s-main-slot|a-pagination)(\s|$)')
+
+# Page content used to detect that the results region exists before straining
+RESULTS_REGION_MARKER = 's-main-slot'
+
+
+def _detect_parser() -> str:
+    """Get the fastest available tree builder, honouring SCRAPER_HTML_PARSER."""
+    from bs4 import BeautifulSoup
+
+    forced = os.environ.get('SCRAPER_HTML_PARSER')
+    if forced:
+        return forced
+
+    for parser in PREFERRED_PARSERS:
+        try:
+            BeautifulSoup('', parser)
+            return parser
+        except Exception:
+            continue
+    return 'html.parser'
+
+
+# Tree builder in use; None until detected on the first parse
+PARSER = None
+RESTRICT_TO_RESULTS = os.environ.get('SCRAPER_PARSE_RESULTS_ONLY', '') in ('1', 'true', 'yes')
+
+
+def get_parser() -> str:
+    """Get the tree builder in use, detecting it on first use."""
+    global PARSER
+    if PARSER is None:
+        PARSER = _detect_parser()
+        logger.debug(f"Using HTML parser backend: {PARSER}")
+    return PARSER
+
+
+def parse_html(markup: Union[str, bytes], results_only: bool = False,
+               product_selectors: Sequence[str] = ()) -> 'BeautifulSoup':
+    """
+    Parse an HTML page with the configured backend.
+
+    Args:
+        markup: Page content as text or raw bytes
+        results_only: Only build the search results region and pagination bar
+            (if enabled with SCRAPER_PARSE_RESULTS_ONLY). Pages without a
+            results region (storefront or seller profile pages) are always
+            parsed in full.
+        product_selectors: With results_only, the selectors the caller finds
+            products with; the page is parsed in full if none of them match
+            in the results region.
+
+    Returns:
+        A BeautifulSoup tree
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    parser = get_parser()
+    if results_only and RESTRICT_TO_RESULTS and _has_results_region(markup):
+        soup = BeautifulSoup(markup, parser, parse_only=SoupStrainer(class_=RESULTS_REGION_CLASSES))
+        # The marker can also appear in scripts or styles, and a changed layout
+        # may keep products elsewhere; fall back if the region has none
+        if soup.find(True) is not None and (
+                not product_selectors or any(soup.select_one(selector) for selector in product_selectors)):
+            return soup
+        logger.debug("No products in the results region, parsing the whole page")
+
+    return BeautifulSoup(markup, parser)
+
+
+def _has_results_region(markup: Union[str, bytes]) -> bool:
+    """Check whether a page contains the search results container."""
+    if isinstance(markup, bytes):
+        return RESULTS_REGION_MARKER.encode('ascii') in markup
+    return RESULTS_REGION_MARKER in markup
@@ -0,0 +1,128 @@
+"""
+Amazon Marketplace Registry
+
+This module keeps what differs between the Amazon sites the scrapers read:
+the marketplace ID used in search URLs, the currency and language cookies and
+Accept-Language a browser on the site sends, the short code stored with
+products, and the department nodes that category searches use to get past the
+pagination limit on a large seller's listing.
+
+Marketplaces are named by their domain suffix, as everywhere else in the
+scrapers ('co.uk', 'de', 'com'). A marketplace missing from the registry still
+works: its URLs are built from the domain, and the URL patterns that need a
+marketplace ID or category nodes are left out.
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+
+# Pages of a search Amazon paginates to at most, however many results it has.
+# A listing whose last page is this one may have been cut short.
+SEARCH_PAGE_LIMIT = int(os.environ.get('SCRAPER_SEARCH_PAGE_LIMIT', 7))
+
+
+class Marketplace:
+    """An Amazon site and the values its pages and requests need."""
+
+    __slots__ = ('domain', 'code', 'marketplace_id', 'currency', 'locale_cookie', 'locale',
+                 'accept_language', 'category_nodes', 'enhanced_category_nodes')
+
+    def __init__(self, domain: str, code: str, marketplace_id: Optional[str] = None,
+                 currency: Optional[str] = None, locale_cookie: Optional[str] = None, locale: Optional[str] = None,
+                 accept_language: str = 'en-US,en;q=0.9', category_nodes: Tuple[str, ...] = (),
+                 enhanced_category_nodes: Optional[Tuple[str, ...]] = None):
+        """
+        Describe a marketplace.
+
+        Args:
+            domain: Domain suffix, e.g. 'co.uk'
+            code: Short name stored with products, e.g. 'UK'
+            marketplace_id: Amazon's ID of the marketplace (marketplaceID= in URLs)
+            currency: Currency code of the i18n-prefs cookie
+            locale_cookie: Name of the site's language cookie, e.g. 'lc-gb'
+            locale: Value of the language cookie, e.g. 'en_GB'
+            accept_language: Accept-Language header of the site's browsers
+            category_nodes: Department browse nodes searched for large sellers
+            enhanced_category_nodes: Nodes enhanced_amazon_scraper searches
+                instead, where its list differs (default: category_nodes)
+        """
+        self.domain = domain
+        self.code = code
+        self.marketplace_id = marketplace_id
+        self.currency = currency
+        self.locale_cookie = locale_cookie
+        self.locale = locale
+        self.accept_language = accept_language
+        self.category_nodes = category_nodes
+        self.enhanced_category_nodes = category_nodes if enhanced_category_nodes is None else enhanced_category_nodes
+
+    @property
+    def base_url(self) -> str:
+        return f"https://www.amazon.{self.domain}"
+
+    def product_link(self, asin: str) -> str:
+        """Get the link to a product's page on this site."""
+        return f"{self.base_url}/dp/{asin}"
+
+    def cookies(self) -> Dict[str, str]:
+        """Get the currency and language cookies a browser on this site sends."""
+        cookies = {}
+        if self.currency:
+            cookies['i18n-prefs'] = self.currency
+        if self.locale_cookie and self.locale:
+            cookies[self.locale_cookie] = self.locale
+        return cookies
+
+    def __repr__(self) -> str:
+        return f"Marketplace({self.domain!r})"
+
+
+MARKETPLACES: Dict[str, Marketplace] = {
+    marketplace.domain: marketplace
+    for marketplace in (
+        Marketplace(
+            'co.uk', 'UK', 'A1F83G8C2ARO7P', 'GBP', 'lc-gb', 'en_GB', 'en-GB,en-US;q=0.9,en;q=0.8',
+            # The nodes each scraper searched before the registry
+            ('117332031', '560798', '1025612', '560800', '11052681'),
+            ('65801031', '66280031', '117332031', '560798'),
+        ),
+        Marketplace(
+            'com', 'US', 'ATVPDKIKX0DER', 'USD', 'lc-main', 'en_US', 'en-US,en;q=0.9',
+            # Beauty, Books, Clothing, Electronics, Home & Kitchen, Toys
+            ('3760911', '283155', '7141123011', '172282', '1055398', '165793011'),
+        ),
+        Marketplace(
+            'ca', 'CA', 'A2EUQ1WTGCTBG2', 'CAD', 'lc-acbca', 'en_CA', 'en-CA,en;q=0.9',
+            # Beauty, Books, Electronics, Home & Kitchen, Toys
+            ('6205124011', '916520', '667823011', '2206275011', '6205517011'),
+        ),
+        Marketplace(
+            'de', 'DE', 'A1PA6795UKMFR9', 'EUR', 'lc-acbde', 'de_DE', 'de-DE,de;q=0.9,en;q=0.8',
+            # Beauty, Bücher, Fashion, Elektronik, Küche & Haushalt, Spielzeug
+            ('64187031', '186606', '11961464031', '562066', '3167641', '12950651'),
+        ),
+        Marketplace(
+            'fr', 'FR', 'A13V1IB3VIYZZH', 'EUR', 'lc-acbfr', 'fr_FR', 'fr-FR,fr;q=0.9,en;q=0.8',
+            # Beauté, Livres, High-Tech, Cuisine & Maison, Jeux et Jouets
+            ('197858031', '301061', '13921051', '57004031', '322086011'),
+        ),
+        Marketplace(
+            'it', 'IT', 'APJ6JRA9NG5V4', 'EUR', 'lc-acbit', 'it_IT', 'it-IT,it;q=0.9,en;q=0.8',
+            # Bellezza, Libri, Elettronica, Casa e cucina, Giochi e giocattoli
+            ('6198082031', '411663031', '412609031', '524015031', '523997031'),
+        ),
+        Marketplace(
+            'es', 'ES', 'A1RKKUPIHCS9HS', 'EUR', 'lc-acbes', 'es_ES', 'es-ES,es;q=0.9,en;q=0.8',
+            # Belleza, Libros, Electrónica, Hogar y cocina, Juguetes y juegos
+            ('6198054031', '599364031', '599370031', '599391031', '599385031'),
+        ),
+    )
+}
+
+
+def get_marketplace(domain: str) -> Marketplace:
+    """Get a marketplace by domain suffix, or a bare one (no ID, cookies or category nodes) if it isn't registered."""
+    marketplace = MARKETPLACES.get(domain)
+    if marketplace is None:
+        marketplace = Marketplace(domain, domain.rsplit('.', 1)[-1].upper())
+    return marketplace
@@ -0,0 +1,179 @@
+"""
+Process-pool Page Parsing
+
+This module moves page parsing off the threads that fetch pages. Parsing is
+CPU-bound Python and holds the GIL, so in a multi-seller sweep the threads
+parsing pages stall the ones waiting on the network, and the sweep never uses
+more than one core. A ParsePool runs the parsing in worker processes instead.
+
+Fetching threads hand a page's raw bytes to the pool and wait for its products
+(they need them to decide whether to fetch the next page), while the other
+threads keep fetching. At most `max_pending` pages are queued or being parsed
+at a time; when the parsers fall behind, threads handing in more pages block
+until there is room, so a fast network can't pile up page bodies in memory.
+
+A pool is made current with use_pool(), and parse_page() then runs parsing in
+it; without a current pool, parse_page() parses in the calling thread as before. Stage
+times and counters recorded by the workers are added to the current scan (see
+scrape_stats), and the time spent waiting for a worker, including the
+backpressure, is its own 'parse_wait' stage.
+
+Set SCRAPER_PARSE_WORKERS to the number of worker processes scan_sellers uses
+by default (0, the default, parses in the fetching threads).
+"""
+
+import os
+import logging
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional, Tuple
+
+from scrape_stats import scan_stats, stage, add_time, count
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger('parse_pool')
+
+# Default number of parser processes for a sweep (0 parses in the fetching threads)
+DEFAULT_PARSE_WORKERS = int(os.environ.get('SCRAPER_PARSE_WORKERS', 0))
+
+# Pages allowed queued or in a worker at a time, per worker process
+PENDING_PER_WORKER = 2
+
+_current: ContextVar[Optional['ParsePool']] = ContextVar('parse_pool', default=None)
+
+
+class PageBody:
+    """
+    The parts of a fetched response the parsers use, small enough to send to a worker.
+
+    Stands in for requests.Response in the parse functions: it has the raw
+    content and decodes text with the response's encoding.
+    """
+
+    __slots__ = ('content', 'encoding')
+
+    def __init__(self, content: bytes, encoding: Optional[str]):
+        self.content = content
+        self.encoding = encoding
+
+    @classmethod
+    def from_response(cls, response: 'requests.Response') -> 'PageBody':
+        """Take the body of a fetched response."""
+        return cls(response.content, response.encoding)
+
+    @property
+    def text(self) -> str:
+        # Like Response.text, except that a page without a declared charset is read as UTF-8
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+
+def _run_in_worker(parse: Callable[..., Any], args: Tuple[Any, ...]) -> Tuple[Any, dict, dict]:
+    """Run a parse function in a worker, returning its result with the stage times and counters it recorded."""
+    with scan_stats('parse_worker') as stats:
+        result = parse(*args)
+    return result, stats.stages, stats.counters
+
+
+class ParsePool:
+    """Worker processes parsing pages for the fetching threads, with a bound on pending pages (thread-safe)."""
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None):
+        """
+        Start a pool of parser processes.
+
+        Args:
+            max_workers: Number of parser processes (default: one per CPU)
+            max_pending: Pages allowed queued or being parsed at a time
+                (default: PENDING_PER_WORKER per process)
+        """
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.max_pending = max(1, max_pending or PENDING_PER_WORKER * self.max_workers)
+        # Spawned, not forked: the parent has fetching threads holding locks
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        logger.info(f"Started {self.max_workers} parser processes ({self.max_pending} pages pending at most)")
+
+    def submit(self, parse: Callable[..., Any], *args: Any) -> Future:
+        """
+        Queue a page for parsing, blocking while `max_pending` pages are pending.
+
+        `parse` must be a module-level function, as it is sent to a worker by
+        name. The future's result is (result, stage times, counters).
+        """
+        if not self._slots.acquire(blocking=False):
+            count('parse_backpressure')
+            self._slots.acquire()
+        try:
+            future = self._executor.submit(_run_in_worker, parse, args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, parse: Callable[..., Any], *args: Any) -> Any:
+        """Parse a page in a worker and wait for the result, adding the worker's stats to the current scan."""
+        with stage('parse_wait'):
+            result, stages, counters = self.submit(parse, *args).result()
+            # Time spent in the worker counts towards its own stages, not the wait
+            for name, seconds in stages.items():
+                if seconds:
+                    add_time(name, seconds)
+        for name, n in counters.items():
+            if n:
+                count(name, n)
+        return result
+
+    def close(self) -> None:
+        """Stop the worker processes, after the pages already queued."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'ParsePool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+@contextmanager
+def use_pool(pool: Optional[ParsePool]) -> Iterator[Optional[ParsePool]]:
+    """Make a pool (or None, parsing inline) current for parse_page() calls in this context."""
+    token = _current.set(pool)
+    try:
+        yield pool
+    finally:
+        _current.reset(token)
+
+
+def current_pool() -> Optional[ParsePool]:
+    """Get the pool parse_page() uses in this context, if any."""
+    return _current.get()
+
+
+def parse_page(function: Callable[..., Any], response: 'requests.Response', *args: Any) -> Any:
+    """
+    Run function(response, *args) in the current pool's workers, or in this thread without a pool.
+
+    In a worker, the function gets the response's PageBody instead of the
+    response, so it may only use its content and text.
+    """
+    pool = _current.get()
+    if pool is None:
+        return function(response, *args)
+    return pool.run(function, PageBody.from_response(response), *args)
+
+
+@contextmanager
+def sweep_pool(parse_workers: int) -> Iterator[Optional[ParsePool]]:
+    """Start a pool for a sweep if parse_workers > 0, yielding None (parse inline) otherwise."""
+    if parse_workers <= 0:
+        yield None
+        return
+    with ParsePool(parse_workers) as pool:
+        yield pool
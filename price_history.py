@@ -0,0 +1,342 @@
+"""
+Price and Availability History
+
+This module keeps an append-only history of every listing's price and
+availability, fed by both scrapers each time they save a seller's inventory,
+so earlier prices are not lost when the cached inventory is replaced.
+
+The history is a SQLite database of its own next to the scraper cache (the
+cache evicts sellers when it grows, the history must not). It is stored
+compactly:
+
+    - Prices are parsed from the scrapers' price text into integer minor units
+      of the marketplace's currency (pence on co.uk).
+    - ASINs, and each (seller, marketplace, scraper) feed, are dictionary
+      encoded into integer IDs.
+    - Each scan is one row in `scans`. Only listings whose state changed since
+      the feed's previous scan get a row in `changes`: newly listed, a new
+      price, or delisted. A seller's first scan lists everything once, after
+      that a scan of 10k listings costs a few rows.
+    - `changes` is keyed by (asin_id, scan_id), which is the per-ASIN index,
+      and keeps the previous price next to the new one, so price drops are
+      found without replaying the history.
+
+The latest state of each feed (`latest`) is what the next scan is compared
+with; it could be rebuilt from `changes`. A listing seen without a price keeps
+its last known price, as the scrapers sometimes miss the price element. A
+listing missing from a saved inventory counts as delisted, just as the cache
+drops it, but an empty inventory isn't recorded.
+
+Timestamps are epoch seconds.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from scraper_cache import CACHE_DIR
+
+logger = logging.getLogger('price_history')
+
+HISTORY_DB_PATH = os.path.join(CACHE_DIR, 'price_history.sqlite3')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS asins (
+    id   INTEGER PRIMARY KEY,
+    asin TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS feeds (
+    id          INTEGER PRIMARY KEY,
+    seller_id   TEXT NOT NULL,
+    marketplace TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    UNIQUE (seller_id, marketplace, source)
+);
+CREATE TABLE IF NOT EXISTS scans (
+    id         INTEGER PRIMARY KEY,
+    feed_id    INTEGER NOT NULL,
+    scanned_at REAL NOT NULL,
+    listed     INTEGER NOT NULL,
+    changes    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scans_scanned_at ON scans (scanned_at);
+CREATE INDEX IF NOT EXISTS scans_feed ON scans (feed_id, scanned_at);
+CREATE TABLE IF NOT EXISTS changes (
+    asin_id        INTEGER NOT NULL,
+    scan_id        INTEGER NOT NULL,
+    listed         INTEGER NOT NULL,
+    price          INTEGER,
+    previous_price INTEGER,
+    PRIMARY KEY (asin_id, scan_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS changes_scan ON changes (scan_id);
+CREATE TABLE IF NOT EXISTS latest (
+    feed_id INTEGER NOT NULL,
+    asin_id INTEGER NOT NULL,
+    price   INTEGER,
+    PRIMARY KEY (feed_id, asin_id)
+) WITHOUT ROWID;
+"""
+
+# First amount in a price text, with thousands and decimal separators ("£1,299.99", "1 299,99 €")
+_AMOUNT = re.compile(r'\d+(?:[.,]\d+|[\s\u00a0\u202f]\d{3}(?!\d))*')
+_SPACES = re.compile(r'[\s\u00a0\u202f]')
+_DECIMALS = re.compile(r'[.,](\d{1,2})$')
+_SEPARATORS = re.compile(r'[.,]')
+
+
+# Price texts repeat from scan to scan, so parsed ones are remembered
+@lru_cache(maxsize=65536)
+def parse_price(price_text: Optional[str]) -> Optional[int]:
+    """
+    Parse a price text into integer minor units ("£1,299.99" -> 129999).
+
+    The first amount is taken from a range ("£12.99 - £15.99"). A separator
+    followed by one or two digits at the end is the decimal one, so both
+    "1,299.99" and "1.299,99" are read alike. Returns None without an amount.
+    """
+    if not price_text:
+        return None
+    match = _AMOUNT.search(price_text)
+    if not match:
+        return None
+
+    amount = _SPACES.sub('', match.group())
+    decimals = _DECIMALS.search(amount)
+    if decimals:
+        whole, fraction = amount[:decimals.start()], decimals.group(1).ljust(2, '0')
+    else:
+        whole, fraction = amount, '00'
+    whole = _SEPARATORS.sub('', whole) or '0'
+    return int(whole) * 100 + int(fraction)
+
+
+def _product_price(product: Dict[str, Any]) -> Optional[int]:
+    # amazon_scraper products carry 'price_text', enhanced_amazon_scraper ones 'price'
+    return parse_price(product.get('price_text') or product.get('price'))
+
+
+class PriceHistory:
+    """Append-only SQLite store of listing prices and availability, safe to share between threads and processes."""
+
+    def __init__(self, path: Optional[str] = None):
+        """Open (and create if needed) the history database."""
+        self.path = path or HISTORY_DB_PATH
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def record_scan(self, seller_id: str, marketplace: str, source: str, products: Iterable[Dict[str, Any]],
+                    scanned_at: Optional[float] = None) -> int:
+        """
+        Append a scan of a seller's inventory, storing only what changed since its previous scan.
+
+        Args:
+            seller_id: The Amazon seller ID
+            marketplace: Amazon marketplace
+            source: Scraper that read the inventory
+            products: The seller's whole inventory as saved to the cache
+            scanned_at: Timestamp to store (default: now)
+
+        Returns:
+            The number of listings whose price or availability changed
+        """
+        prices: Dict[str, Optional[int]] = {}
+        for product in products:
+            price = _product_price(product)
+            if product['asin'] not in prices or prices[product['asin']] is None:
+                prices[product['asin']] = price
+        scanned_at = time.time() if scanned_at is None else scanned_at
+
+        conn = self._connect()
+        with conn:
+            feed_id = self._feed_id(conn, seller_id, marketplace, source)
+            asin_ids = self._asin_ids(conn, prices)
+            latest = dict(conn.execute("SELECT asin_id, price FROM latest WHERE feed_id = ?", (feed_id,)))
+
+            changes: List[Tuple[int, int, Optional[int], Optional[int]]] = []  # (asin_id, listed, price, previous)
+            for asin, price in prices.items():
+                asin_id = asin_ids[asin]
+                if asin_id not in latest:
+                    changes.append((asin_id, 1, price, None))
+                elif price is not None and price != latest[asin_id]:
+                    changes.append((asin_id, 1, price, latest[asin_id]))
+            listed_ids = set(asin_ids[asin] for asin in prices)
+            changes.extend((asin_id, 0, None, price) for asin_id, price in latest.items() if asin_id not in listed_ids)
+
+            scan_id = conn.execute(
+                "INSERT INTO scans (feed_id, scanned_at, listed, changes) VALUES (?, ?, ?, ?)",
+                (feed_id, scanned_at, len(prices), len(changes))
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO changes (asin_id, scan_id, listed, price, previous_price) VALUES (?, ?, ?, ?, ?)",
+                ((asin_id, scan_id, listed, price, previous) for asin_id, listed, price, previous in changes)
+            )
+            conn.executemany(
+                "INSERT INTO latest (feed_id, asin_id, price) VALUES (?, ?, ?) "
+                "ON CONFLICT (feed_id, asin_id) DO UPDATE SET price = excluded.price",
+                ((feed_id, asin_id, price) for asin_id, listed, price, _ in changes if listed)
+            )
+            conn.executemany(
+                "DELETE FROM latest WHERE feed_id = ? AND asin_id = ?",
+                ((feed_id, asin_id) for asin_id, listed, _, _ in changes if not listed)
+            )
+        return len(changes)
+
+    def _feed_id(self, conn: sqlite3.Connection, seller_id: str, marketplace: str, source: str) -> int:
+        conn.execute("INSERT OR IGNORE INTO feeds (seller_id, marketplace, source) VALUES (?, ?, ?)",
+                     (seller_id, marketplace, source))
+        return conn.execute("SELECT id FROM feeds WHERE seller_id = ? AND marketplace = ? AND source = ?",
+                            (seller_id, marketplace, source)).fetchone()[0]
+
+    def _asin_ids(self, conn: sqlite3.Connection, asins: Iterable[str]) -> Dict[str, int]:
+        """Get the IDs of ASINs, adding the ones not seen before."""
+        asins = list(asins)
+        ids: Dict[str, int] = {}
+        # Stay under SQLite's limit on bound parameters
+        for start in range(0, len(asins), 500):
+            chunk = asins[start:start + 500]
+            ids.update(conn.execute(
+                f"SELECT asin, id FROM asins WHERE asin IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        for asin in asins:
+            if asin not in ids:
+                ids[asin] = conn.execute("INSERT INTO asins (asin) VALUES (?)", (asin,)).lastrowid
+        return ids
+
+    def price_drops(self, since: float, marketplace: str = "co.uk", seller_id: Optional[str] = None,
+                    min_drop: float = 0.0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the price drops recorded since a time, newest first.
+
+        Args:
+            since: Earliest scan time to include (epoch seconds)
+            marketplace: Amazon marketplace
+            seller_id: Only drops of this seller's listings
+            min_drop: Smallest drop to include, as a share of the previous price
+            limit: Maximum number of drops to return
+
+        Returns:
+            Dicts with asin, seller_id, source, dropped_at, and price,
+            previous_price (minor units) and drop (share of the previous price)
+        """
+        query = (
+            "SELECT a.asin, f.seller_id, f.source, s.scanned_at, c.price, c.previous_price "
+            "FROM scans s JOIN feeds f ON f.id = s.feed_id "
+            "JOIN changes c ON c.scan_id = s.id JOIN asins a ON a.id = c.asin_id "
+            "WHERE s.scanned_at >= ? AND f.marketplace = ? AND c.listed = 1 AND c.price < c.previous_price "
+            "AND c.previous_price - c.price >= ? * c.previous_price"
+        )
+        params: List[Any] = [since, marketplace, min_drop]
+        if seller_id is not None:
+            query += " AND f.seller_id = ?"
+            params.append(seller_id)
+        query += " ORDER BY s.scanned_at DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        return [
+            {
+                'asin': asin,
+                'seller_id': row_seller_id,
+                'source': source,
+                'dropped_at': scanned_at,
+                'price': price,
+                'previous_price': previous,
+                'drop': round((previous - price) / previous, 4),
+            }
+            for asin, row_seller_id, source, scanned_at, price, previous in self._connect().execute(query, params)
+        ]
+
+    def asin_history(self, asin: str, marketplace: str = "co.uk",
+                     seller_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the recorded changes of one ASIN, oldest first.
+
+        Returns:
+            Dicts with changed_at, seller_id, source, listed, and price and
+            previous_price in minor units (price is None when delisted)
+        """
+        query = (
+            "SELECT s.scanned_at, f.seller_id, f.source, c.listed, c.price, c.previous_price "
+            "FROM changes c JOIN scans s ON s.id = c.scan_id JOIN feeds f ON f.id = s.feed_id "
+            "WHERE c.asin_id = (SELECT id FROM asins WHERE asin = ?) AND f.marketplace = ?"
+        )
+        params: List[Any] = [asin, marketplace]
+        if seller_id is not None:
+            query += " AND f.seller_id = ?"
+            params.append(seller_id)
+        query += " ORDER BY s.scanned_at"
+
+        return [
+            {
+                'changed_at': scanned_at,
+                'seller_id': row_seller_id,
+                'source': source,
+                'listed': bool(listed),
+                'price': price,
+                'previous_price': previous,
+            }
+            for scanned_at, row_seller_id, source, listed, price, previous in self._connect().execute(query, params)
+        ]
+
+    def size_bytes(self) -> int:
+        """Get the space used by live pages in the database."""
+        conn = self._connect()
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+
+_history: Optional[PriceHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_history() -> PriceHistory:
+    """Get the process-wide history instance, opening it on first use."""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = PriceHistory()
+        return _history
+
+
+def record_inventory(seller_id: str, marketplace: str, source: str, products: List[Dict[str, Any]]) -> None:
+    """Record a seller's saved inventory in the history, logging rather than raising on errors."""
+    # A scan finding nothing was more likely blocked than the seller delisting everything
+    if not products:
+        return
+    try:
+        changes = get_history().record_scan(seller_id, marketplace, source, products)
+        logger.info(f"Recorded {changes} price and availability changes for seller {seller_id}")
+    except Exception as e:
+        logger.error(f"Error recording price history of seller {seller_id}: {e}")
+
+
+def get_price_drops(since: float, marketplace: str = "co.uk", seller_id: Optional[str] = None,
+                    min_drop: float = 0.0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Get the price drops recorded since a time (epoch seconds), newest first. This function can be called from Node.js."""
+    return get_history().price_drops(since, marketplace, seller_id, min_drop, limit)
+
+
+def get_asin_history(asin: str, marketplace: str = "co.uk", seller_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Get the recorded price and availability changes of one ASIN, oldest first. This function can be called from Node.js."""
+    return get_history().asin_history(asin, marketplace, seller_id)
@@ -0,0 +1,252 @@
+"""
+ASIN-keyed Product Store
+
+This module provides an ordered product collection keyed by ASIN, used by both
+scrapers to de-duplicate products found across pages and URL patterns, the
+delta computation used by incremental scans, and ProductBatch, a compact
+columnar form for holding and storing large inventories.
+"""
+
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+class ProductStore:
+    """
+    Ordered collection of product dicts with O(1) lookup by ASIN.
+
+    Products keep the order in which their ASIN was first seen. When the same
+    ASIN is added again, fields missing or empty on the stored product (such as
+    price_text) are filled in from the new one; existing values are kept.
+    """
+
+    def __init__(self, products: Optional[Iterable[Dict[str, Any]]] = None):
+        """Initialize the store, optionally with an initial list of products."""
+        self._products: Dict[str, Dict[str, Any]] = {}
+        if products:
+            self.update(products)
+
+    def add(self, product: Dict[str, Any]) -> bool:
+        """
+        Add a product, merging it into the stored one if the ASIN is known.
+
+        Returns:
+            True if the ASIN was not in the store before
+        """
+        asin = product['asin']
+        existing = self._products.get(asin)
+        if existing is None:
+            self._products[asin] = product
+            return True
+
+        for key, value in product.items():
+            if value not in (None, '') and existing.get(key) in (None, ''):
+                existing[key] = value
+        return False
+
+    def update(self, products: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add several products.
+
+        Returns:
+            The number of products whose ASIN was new to the store
+        """
+        return sum(self.add(product) for product in products)
+
+    def get(self, asin: str) -> Optional[Dict[str, Any]]:
+        """Get the stored product for an ASIN, if any."""
+        return self._products.get(asin)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Get the products as a list in first-seen order."""
+        return list(self._products.values())
+
+    def __contains__(self, asin: str) -> bool:
+        return asin in self._products
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._products.values())
+
+
+# Product fields compared when looking for changed listings
+CHANGE_FIELDS = ('title', 'price', 'price_text')
+
+
+def build_delta(cached_products: List[Dict[str, Any]], seen: ProductStore, complete: bool) -> Dict[str, Any]:
+    """
+    Compare products seen in an incremental scan with the cached inventory.
+
+    Args:
+        cached_products: The seller's inventory from the previous scan
+        seen: Products seen in this scan, newest first
+        complete: Whether the scan read the listing to its end. Only then can
+            cached products that were not seen be reported as missing.
+
+    Returns:
+        Dict with the new, changed and missing products, and the merged
+        inventory (new products first, then the cached ones, updated)
+    """
+    cached = {product['asin']: product for product in cached_products}
+    new = []
+    changed = []
+
+    for product in seen:
+        old = cached.get(product['asin'])
+        if old is None:
+            new.append(product)
+            continue
+
+        changes = {
+            field: {'old': old.get(field), 'new': product[field]}
+            for field in CHANGE_FIELDS
+            if product.get(field) not in (None, '') and old.get(field) != product[field]
+        }
+        if changes:
+            changed.append({'asin': product['asin'], 'changes': changes, 'product': product})
+
+    missing = [product for product in cached_products if product['asin'] not in seen] if complete else []
+
+    merged = ProductStore(new)
+    for product in cached_products:
+        if complete and product['asin'] not in seen:
+            continue
+        updated = dict(product)
+        latest = seen.get(product['asin'])
+        if latest:
+            updated.update({key: value for key, value in latest.items() if value not in (None, '')})
+        merged.add(updated)
+
+    return {
+        'new': new,
+        'changed': changed,
+        'missing': missing,
+        'products': merged.to_list(),
+        'complete': complete
+    }
+
+
+# Per-product fields with few distinct values, interned so equal strings share one object
+INTERNED_FIELDS = ('price', 'price_text', 'marketplace', 'seller_id', 'seller_name', 'source')
+
+# Placeholder for a field a product does not have
+_MISSING = object()
+
+
+def _intern(field: str, value: Any) -> Any:
+    if field in INTERNED_FIELDS and isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+class ProductBatch:
+    """
+    Columnar, memory-compact form of a seller's product list.
+
+    Fields with the same value on every product (seller_id, seller_name,
+    marketplace, source, ...) are stored once, and a link of the form
+    <prefix><asin> is rebuilt from the ASIN instead of being stored. The other
+    fields are kept in one list per field. to_list() gives back the product
+    dicts in their original shape and order.
+    """
+
+    __slots__ = ('fields', 'shared', 'link_prefix', 'columns', '_size')
+
+    def __init__(self, fields: List[str], shared: Dict[str, Any], link_prefix: Optional[str],
+                 columns: Dict[str, List[Any]], size: int):
+        """Initialize a batch from its parts; use from_products or from_rows instead."""
+        self.fields = fields
+        self.shared = shared
+        self.link_prefix = link_prefix
+        self.columns = columns
+        self._size = size
+
+    @classmethod
+    def from_products(cls, products: Iterable[Dict[str, Any]]) -> 'ProductBatch':
+        """Build a batch from product dicts."""
+        products = list(products)
+        fields: Dict[str, None] = {}
+        for product in products:
+            fields.update(dict.fromkeys(product))
+
+        shared = {}
+        if products:
+            first = products[0]
+            for field in fields:
+                if field in first and all(field in p and p[field] == first[field] for p in products):
+                    shared[field] = _intern(field, first[field])
+
+        link_prefix = None
+        if 'link' in fields and 'link' not in shared and 'asin' not in shared:
+            first = products[0]
+            link, asin = first.get('link'), first.get('asin')
+            if isinstance(link, str) and asin and link.endswith(asin):
+                prefix = link[:-len(asin)]
+                if all(p.get('link') == prefix + p.get('asin', '') for p in products):
+                    link_prefix = prefix
+
+        columns = {
+            field: [_intern(field, p.get(field, _MISSING)) for p in products]
+            for field in fields
+            if field not in shared and not (field == 'link' and link_prefix is not None)
+        }
+        return cls(list(fields), shared, link_prefix, columns, len(products))
+
+    @classmethod
+    def from_rows(cls, layout: Optional[Dict[str, Any]], rows: Iterable[Dict[str, Any]]) -> 'ProductBatch':
+        """
+        Rebuild a batch from a layout() and its rows().
+
+        Rows without a layout are taken to be complete product dicts.
+        """
+        if not layout:
+            return cls.from_products(rows)
+
+        rows = list(rows)
+        shared = {field: _intern(field, value) for field, value in layout['shared'].items()}
+        link_prefix = layout.get('link_prefix')
+        columns = {
+            field: [_intern(field, row.get(field, _MISSING)) for row in rows]
+            for field in layout['fields']
+            if field not in shared and not (field == 'link' and link_prefix is not None)
+        }
+        return cls(list(layout['fields']), shared, link_prefix, columns, len(rows))
+
+    def layout(self) -> Dict[str, Any]:
+        """Get the field order, shared values and link prefix, as stored alongside rows()."""
+        return {'fields': self.fields, 'shared': self.shared, 'link_prefix': self.link_prefix}
+
+    def asins(self) -> List[str]:
+        """Get the products' ASINs in order."""
+        if 'asin' in self.shared:
+            return [self.shared['asin']] * self._size
+        return list(self.columns.get('asin', []))
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the per-product fields that are not shared or derived."""
+        names = list(self.columns)
+        for values in zip(*self.columns.values()) if names else ({} for _ in range(self._size)):
+            yield {name: value for name, value in zip(names, values) if value is not _MISSING}
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Get the products as dicts in their original shape and order."""
+        return list(self)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._size):
+            product = {}
+            for field in self.fields:
+                if field in self.shared:
+                    product[field] = self.shared[field]
+                elif field == 'link' and self.link_prefix is not None:
+                    product[field] = self.link_prefix + self.columns['asin'][i]
+                else:
+                    value = self.columns[field][i]
+                    if value is not _MISSING:
+                        product[field] = value
+            yield product
@@ -0,0 +1,231 @@
+"""
+Health-scored Proxy Pool
+
+This module picks proxies for both scrapers based on how they have been doing.
+For every proxy it keeps running averages of latency, success rate and
+anti-bot responses (403/429/503 and captcha pages), and chooses proxies at
+random weighted by a score built from them. A proxy that fails several times
+in a row is taken out of rotation (circuit breaker) for a cooldown that grows
+each time it trips again; after the cooldown it gets one trial request.
+
+Stats are saved between runs next to the scraper cache. Proxies come from
+SCRAPER_PROXIES (comma-separated proxy URLs) and from the scrapers' own lists.
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import atexit
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from rate_limiter import is_blocked
+
+logger = logging.getLogger('proxy_pool')
+
+# Stats for all proxies, stored next to the scraper cache
+STATS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache', 'proxy_stats.json')
+
+# Weight of the latest request in the running averages
+SMOOTHING = 0.2
+# Consecutive failures that open a proxy's circuit
+FAILURE_THRESHOLD = 3
+# Cooldown after the circuit opens (seconds); doubles on every re-trip up to the maximum
+BASE_COOLDOWN = 120
+MAX_COOLDOWN = 3600
+# Time after which an unanswered trial request no longer blocks another trial (seconds)
+TRIAL_TIMEOUT = 60
+# Latency added to every proxy's average so fast proxies don't get all the traffic (seconds)
+LATENCY_FLOOR = 0.5
+# Weight of the worst proxies, so they still get the odd request
+MIN_WEIGHT = 0.01
+# Minimum time between saves of the stats file (seconds)
+SAVE_INTERVAL = 30
+
+
+def parse_proxy_url(url: str) -> Dict[str, str]:
+    """Build a proxy dict in the scrapers' format from a proxy URL."""
+    parsed = urlparse(url if '://' in url else f"http://{url}")
+    return {'ip': parsed.hostname or '', 'port': str(parsed.port or ''), 'country': '', 'url': parsed.geturl()}
+
+
+def _new_stats() -> Dict[str, Any]:
+    # New proxies start out looking healthy so they get tried
+    return {
+        'requests': 0,
+        'success_rate': 1.0,
+        'block_rate': 0.0,
+        'avg_latency': 1.0,
+        'consecutive_failures': 0,
+        'trips': 0,
+        'open_until': 0.0,
+        'trial_started': 0.0,
+    }
+
+
+class ProxyPool:
+    """Thread-safe pool that picks proxies by health score, with per-proxy circuit breakers."""
+
+    def __init__(self, proxies: Optional[Iterable[Dict[str, str]]] = None, stats_path: Optional[str] = None):
+        """Initialize the pool and load saved proxy stats."""
+        self.stats_path = stats_path or STATS_PATH
+        self._lock = threading.Lock()
+        self._proxies: Dict[str, Dict[str, str]] = {}
+        self._stats: Dict[str, Dict[str, Any]] = _load_stats(self.stats_path)
+        self._last_save = time.time()
+        self.add_proxies(proxies or [])
+
+    def add_proxies(self, proxies: Iterable[Dict[str, str]]) -> None:
+        """Add proxies (dicts with at least a 'url') to the rotation."""
+        with self._lock:
+            for proxy in proxies:
+                self._proxies.setdefault(proxy['url'], proxy)
+                self._stats.setdefault(proxy['url'], _new_stats())
+
+    def __len__(self) -> int:
+        return len(self._proxies)
+
+    def _score(self, stats: Dict[str, Any]) -> float:
+        """Expected useful responses per second of waiting."""
+        return stats['success_rate'] * (1 - stats['block_rate']) / (stats['avg_latency'] + LATENCY_FLOOR)
+
+    def choose(self) -> Optional[Dict[str, str]]:
+        """
+        Pick a proxy at random, weighted by score, skipping proxies whose circuit is open.
+
+        Returns:
+            The proxy dict, or None to connect directly (no proxies, or all cooling down)
+        """
+        now = time.time()
+        with self._lock:
+            candidates = []
+            for url, stats in self._stats.items():
+                if url not in self._proxies:
+                    continue
+                if stats['open_until'] > now:
+                    continue
+                if (stats['open_until'] and stats['trial_started'] > stats['open_until']
+                        and now - stats['trial_started'] < TRIAL_TIMEOUT):
+                    # Half-open: one trial request is already under way
+                    continue
+                candidates.append(url)
+
+            if not candidates:
+                if self._proxies:
+                    logger.warning("All proxies are cooling down, using a direct connection")
+                return None
+
+            weights = [max(self._score(self._stats[url]), MIN_WEIGHT) for url in candidates]
+            url = random.choices(candidates, weights=weights)[0]
+            stats = self._stats[url]
+            if stats['open_until']:
+                stats['trial_started'] = now
+            return self._proxies[url]
+
+    def record(self, proxy: Dict[str, str], latency: float, status_code: Optional[int],
+               text: Optional[str] = None) -> None:
+        """
+        Record the outcome of a request made through a proxy.
+
+        Args:
+            proxy: The proxy used
+            latency: Seconds the request took
+            status_code: Response status, or None if the request failed outright
+            text: Response body, checked for captcha pages
+        """
+        blocked = is_blocked(status_code, text)
+        success = status_code == 200 and not blocked
+
+        with self._lock:
+            stats = self._stats.setdefault(proxy['url'], _new_stats())
+            stats['requests'] += 1
+            stats['success_rate'] += SMOOTHING * (success - stats['success_rate'])
+            stats['block_rate'] += SMOOTHING * (blocked - stats['block_rate'])
+            if status_code is not None:
+                stats['avg_latency'] += SMOOTHING * (latency - stats['avg_latency'])
+
+            if success:
+                if stats['open_until']:
+                    logger.info(f"Proxy {proxy['url']} recovered, closing its circuit")
+                stats['consecutive_failures'] = 0
+                stats['trips'] = 0
+                stats['open_until'] = 0.0
+            else:
+                stats['consecutive_failures'] += 1
+                # A failed trial re-opens the circuit straight away; failures of requests
+                # still in flight when it opened don't extend the cooldown
+                now = time.time()
+                tripped = stats['consecutive_failures'] >= FAILURE_THRESHOLD or stats['open_until']
+                if tripped and stats['open_until'] <= now:
+                    cooldown = min(MAX_COOLDOWN, BASE_COOLDOWN * 2 ** stats['trips'])
+                    stats['trips'] += 1
+                    stats['open_until'] = now + cooldown
+                    logger.warning(f"Proxy {proxy['url']} failed {stats['consecutive_failures']} times, "
+                                   f"cooling down for {cooldown:.0f}s")
+
+            due = time.time() - self._last_save >= SAVE_INTERVAL
+
+        if due:
+            self.save()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get a copy of the stats of the proxies in rotation, keyed by proxy URL."""
+        with self._lock:
+            return {url: dict(self._stats[url]) for url in self._proxies}
+
+    def save(self) -> None:
+        """Persist the stats of every proxy seen."""
+        with self._lock:
+            if not self._stats:
+                return
+            data = json.dumps(self._stats)
+            self._last_save = time.time()
+        try:
+            directory = os.path.dirname(self.stats_path)
+            os.makedirs(directory, exist_ok=True)
+
+            # Write to a temp file first so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.stats_path)
+        except Exception as e:
+            logger.warning(f"Error saving proxy stats: {e}")
+
+
+def _load_stats(path: str) -> Dict[str, Any]:
+    """Load the stats file, or an empty dict if it is missing or unreadable."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+        # Fill in fields added since the file was written
+        return {url: dict(_new_stats(), **entry) for url, entry in stats.items()}
+    except Exception as e:
+        logger.warning(f"Error reading proxy stats: {e}")
+        return {}
+
+
+def configured_proxies() -> List[Dict[str, str]]:
+    """Get the proxies listed in SCRAPER_PROXIES."""
+    urls = os.environ.get('SCRAPER_PROXIES', '')
+    return [parse_proxy_url(url.strip()) for url in urls.split(',') if url.strip()]
+
+
+_pool: Optional[ProxyPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_proxy_pool() -> ProxyPool:
+    """Get the process-wide proxy pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProxyPool(configured_proxies())
+            atexit.register(_pool.save)
+        return _pool
@@ -0,0 +1,219 @@
+"""
+Adaptive Per-host Request Rate Limiter
+
+This module keeps scrapes polite by pacing requests to each Amazon host with a
+token bucket, no matter how many threads, crawl tasks or scraper processes are
+fetching at once. The bucket state lives in a small JSON file guarded by a lock
+file, so every process on the machine draws from the same per-host budget.
+
+The rate adapts with AIMD: every 200 response raises it by a small step, and a
+blocked response (403, 429, 503 or a captcha page) halves it. Throughput
+settles just below the rate at which Amazon starts pushing back.
+
+Set SCRAPER_SHARED_RATE_LIMIT=0 to keep the limiter per process.
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; fall back to a per-process limiter
+    fcntl = None
+
+logger = logging.getLogger('rate_limiter')
+
+# Shared bucket state, stored next to the scraper cache
+STATE_PATH = os.environ.get('SCRAPER_RATE_LIMIT_STATE') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache', 'rate_limiter.json'
+)
+
+SHARED = os.environ.get('SCRAPER_SHARED_RATE_LIMIT', '1') not in ('0', 'false', 'no')
+
+# Set to False to neither wait nor adapt, e.g. while replaying recorded pages
+PACE_REQUESTS = True
+
+# Requests per second per host: starting rate and bounds
+DEFAULT_RATE = 0.3
+MIN_RATE = 0.05
+MAX_RATE = 2.0
+# Requests that may be made back to back after an idle period
+DEFAULT_BURST = 2
+# Rate added per successful response (requests per second)
+ADDITIVE_INCREASE = 0.02
+# Factor applied to the rate when Amazon blocks a request
+MULTIPLICATIVE_DECREASE = 0.5
+# Random extra wait, as a share of the current interval, so requests do not tick like a clock
+JITTER = 0.25
+
+# Responses that mean we are going too fast
+BLOCK_STATUS_CODES = (403, 429, 503)
+CAPTCHA_MARKER = '/errors/validateCaptcha'
+
+
+def get_host(url: str) -> str:
+    """Get the host part of a URL, used as the rate limiting key."""
+    return urlparse(url).netloc or url
+
+
+def is_blocked(status_code: Optional[int], text: Optional[str] = None) -> bool:
+    """Check whether a response is Amazon pushing back (error status or captcha page)."""
+    if status_code in BLOCK_STATUS_CODES:
+        return True
+    return status_code == 200 and bool(text) and CAPTCHA_MARKER in text
+
+
+class HostRateLimiter:
+    """Adaptive token bucket per host, shared between threads and processes."""
+
+    def __init__(self, rate: float = DEFAULT_RATE, min_rate: float = MIN_RATE, max_rate: float = MAX_RATE,
+                 burst: float = DEFAULT_BURST, state_path: Optional[str] = None, shared: bool = SHARED):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate: Starting requests per second for hosts without saved state
+            min_rate: Lowest rate a host can be cut back to
+            max_rate: Highest rate a host can be raised to
+            burst: Bucket size
+            state_path: Shared state file (default: STATE_PATH)
+            shared: Whether to share the state with other processes
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.state_path = state_path or STATE_PATH
+        self.shared = shared and fcntl is not None
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def _locked_state(self) -> Iterator[Dict[str, Dict[str, float]]]:
+        """
+        Hold the limiter state exclusively, reading the shared file if enabled.
+
+        The file is only rewritten if a host's bucket was replaced with a changed one.
+        """
+        with self._lock:
+            if not self.shared:
+                yield self._state
+                return
+
+            directory = os.path.dirname(self.state_path)
+            os.makedirs(directory, exist_ok=True)
+            with open(self.state_path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    state = _load_state(self.state_path)
+                    loaded = dict(state)
+                    yield state
+                    if state == loaded:
+                        return
+
+                    # Write to a temp file first so readers never see a partial file
+                    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(state, f)
+                    os.replace(tmp_path, self.state_path)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _bucket(self, state: Dict[str, Dict[str, float]], host: str, now: float) -> Dict[str, float]:
+        """
+        Get a copy of a host's bucket with tokens refilled up to now.
+
+        Refilling alone needn't be saved, as it is worked out again from the
+        saved bucket the same way. Store the copy in the state to change it.
+        """
+        bucket = dict(state.get(host) or {'rate': self.rate, 'tokens': self.burst, 'updated': now, 'decreased': 0.0})
+
+        elapsed = max(0.0, now - bucket['updated'])
+        bucket['tokens'] = min(self.burst, bucket['tokens'] + elapsed * bucket['rate'])
+        bucket['updated'] = now
+        return bucket
+
+    def wait(self, url: str) -> float:
+        """
+        Block until a request to the URL's host is allowed.
+
+        A token is taken under the lock even if the bucket is empty, so
+        concurrent callers queue up behind each other instead of all firing as
+        soon as a token is available.
+
+        Returns:
+            The number of seconds spent waiting
+        """
+        if not PACE_REQUESTS:
+            return 0.0
+
+        host = get_host(url)
+        with self._locked_state() as state:
+            bucket = self._bucket(state, host, time.time())
+            bucket['tokens'] -= 1
+            state[host] = bucket
+            rate = bucket['rate']
+            delay = -bucket['tokens'] / rate if bucket['tokens'] < 0 else 0.0
+
+        delay += random.uniform(0, JITTER / rate)
+        logger.debug(f"Rate limiting {host} at {rate:.2f} req/s: waiting {delay:.2f}s")
+        time.sleep(delay)
+        return delay
+
+    def record(self, url: str, status_code: Optional[int], text: Optional[str] = None) -> None:
+        """
+        Adjust the host's rate after a response.
+
+        Successful responses raise the rate additively. A blocked response
+        halves it and empties the bucket, at most once per current interval so
+        a burst of in-flight requests failing together counts as one signal.
+        """
+        if not PACE_REQUESTS:
+            return
+
+        host = get_host(url)
+        blocked = is_blocked(status_code, text)
+        if not blocked and status_code != 200:
+            return
+
+        with self._locked_state() as state:
+            now = time.time()
+            bucket = self._bucket(state, host, now)
+            if not blocked:
+                # Nothing to save once the host is at the highest rate
+                if bucket['rate'] < self.max_rate:
+                    bucket['rate'] = min(self.max_rate, bucket['rate'] + ADDITIVE_INCREASE)
+                    state[host] = bucket
+            elif now - bucket['decreased'] >= 1 / bucket['rate']:
+                bucket['rate'] = max(self.min_rate, bucket['rate'] * MULTIPLICATIVE_DECREASE)
+                bucket['tokens'] = min(bucket['tokens'], 0.0)
+                bucket['decreased'] = now
+                state[host] = bucket
+                logger.warning(f"Blocked by {host} (status {status_code}), slowing to {bucket['rate']:.2f} req/s")
+
+    def get_rate(self, url: str) -> float:
+        """Get the current rate for the URL's host (requests per second)."""
+        # The shared file is replaced whole, so it can be read without taking the lock
+        with self._lock:
+            state = _load_state(self.state_path) if self.shared else self._state
+            return self._bucket(state, get_host(url), time.time())['rate']
+
+
+def _load_state(path: str) -> Dict[str, Any]:
+    """Load the shared state file, or an empty dict if it is missing or unreadable."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Error reading rate limiter state: {e}")
+        return {}
@@ -0,0 +1,343 @@
+"""
+Seller Scan Profiler
+
+This module profiles seller scans without editing the scrapers. Inside
+profile_scan() a scan runs under cProfile and tracemalloc while a sampler
+thread records the stack of every thread, and three files are written to the
+profile directory when it ends:
+
+    <name>.pstats      cProfile stats, for python -m pstats, snakeviz and the like
+    <name>.alloc.txt   peak traced memory and the top-N source lines by memory
+                       allocated during the scan and still held at its end
+    <name>.collapsed   wall-clock stack samples in the collapsed format read by
+                       flamegraph.pl, speedscope and inferno
+
+To take the network and rate limiting out of a profile, run the scan inside
+use_backend() with a ReplayAdapter serving pages recorded earlier with a
+RecordingAdapter (recorded_pages) or generated on the fly (stand_in_pages).
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import cProfile
+import hashlib
+import logging
+import tempfile
+import linecache
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, Optional, Union
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import rate_limiter
+import single_flight
+import scraper_cache
+import url_pattern_planner
+from session_pool import SESSION_POOL
+
+logger = logging.getLogger('scan_profiler')
+
+# Profiles are written next to the scraper cache unless a directory is given
+PROFILE_DIR = os.environ.get('SCRAPER_PROFILE_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'profiles'
+)
+
+# Source lines listed in the allocation report
+DEFAULT_TOP = 25
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+# Frames kept per allocation traceback
+TRACEBACK_FRAMES = 10
+
+# Index of a recording directory: URL -> page file
+RECORDING_INDEX = 'index.json'
+
+PageSource = Callable[[str], Optional[Union[str, bytes]]]
+
+
+class StackSampler(threading.Thread):
+    """Background thread counting the collapsed stacks of all other threads."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.stacks[_collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def write(self, path: str) -> None:
+        """Write the samples as 'root;caller;callee count' lines."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+
+
+def _collapse(thread_name: str, frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    names.append(f"thread:{thread_name}")
+    # Spaces would break the 'stack count' format
+    return ';'.join(reversed(names)).replace(' ', '_')
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+
+
+@contextmanager
+def profile_scan(name: str, profile_dir: Optional[str] = None, top: int = DEFAULT_TOP) -> Iterator[Dict[str, str]]:
+    """
+    Profile the code run inside the block and write the profile files.
+
+    Args:
+        name: Start of the file names, e.g. 'enhanced_amazon_scraper-<seller_id>'
+        profile_dir: Directory for the files (default PROFILE_DIR)
+        top: Number of source lines in the allocation report
+
+    Yields:
+        The paths the files are written to, keyed by 'pstats', 'allocations' and 'collapsed'
+    """
+    directory = profile_dir or PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{_safe_name(name)}-{time.strftime('%Y%m%d-%H%M%S')}")
+    paths = {'pstats': base + '.pstats', 'allocations': base + '.alloc.txt', 'collapsed': base + '.collapsed'}
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start(TRACEBACK_FRAMES)
+    baseline = tracemalloc.take_snapshot()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+
+    sampler = StackSampler()
+    sampler.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield paths
+    finally:
+        profiler.disable()
+        sampler.stop()
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        if not was_tracing:
+            tracemalloc.stop()
+
+        try:
+            profiler.dump_stats(paths['pstats'])
+            _write_allocations(paths['allocations'], name, baseline, snapshot, start_memory, peak, top)
+            sampler.write(paths['collapsed'])
+            logger.info(f"Wrote profile of {name} to {base}.*")
+        except Exception as e:
+            logger.warning(f"Error writing profile of {name}: {e}")
+
+
+def profiled(name: str, profile: Union[bool, str]):
+    """Get profile_scan(name) if `profile` is set (a string is used as the profile directory), else a no-op context."""
+    if not profile:
+        return nullcontext()
+    return profile_scan(name, profile if isinstance(profile, str) else None)
+
+
+def _write_allocations(path: str, name: str, baseline: tracemalloc.Snapshot, snapshot: tracemalloc.Snapshot,
+                       start_memory: int, peak: int, top: int) -> None:
+    """Write the peak memory and the lines whose allocations grew most during the scan."""
+    ignored = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+    growth = snapshot.filter_traces(ignored).compare_to(baseline.filter_traces(ignored), 'lineno')
+    growth = [stat for stat in growth if stat.size_diff > 0][:top]
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"Allocations of {name}\n")
+        f.write(f"Peak traced memory: {peak / 1048576:.1f} MiB "
+                f"({(peak - start_memory) / 1048576:+.1f} MiB over the start)\n\n")
+        f.write(f"Top {len(growth)} lines by memory allocated during the scan and still held at its end:\n\n")
+        for stat in growth:
+            frame = stat.traceback[0]
+            f.write(f"{stat.size_diff / 1024:10.1f} KiB {stat.count_diff:+9d} blocks  {frame.filename}:{frame.lineno}\n")
+            source = linecache.getline(frame.filename, frame.lineno).strip()
+            if source:
+                f.write(f"{'':33}{source}\n")
+
+
+def _page_key(url: str) -> str:
+    # The qid timestamp differs between runs of the same URL pattern
+    return re.sub(r'[?&]qid=\d+', '', url)
+
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter answering requests from a page source instead of the network (404 for unknown URLs)."""
+
+    def __init__(self, pages: PageSource):
+        super().__init__()
+        self.pages = pages
+
+    def send(self, request, **kwargs) -> requests.Response:
+        body = self.pages(request.url)
+        response = requests.Response()
+        response.status_code = 200 if body is not None else 404
+        response.reason = 'OK' if body is not None else 'Not Found'
+        response._content = body.encode('utf-8') if isinstance(body, str) else (body or b'')
+        response.headers = CaseInsensitiveDict({'Content-Type': 'text/html; charset=utf-8'})
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Transport adapter fetching from the network and saving every 200 page for replay."""
+
+    def __init__(self, directory: str, **kwargs):
+        super().__init__(max_retries=0, **kwargs)
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index = _load_index(directory)
+
+    def send(self, request, **kwargs) -> requests.Response:
+        response = super().send(request, **kwargs)
+        if response.status_code == 200:
+            key = _page_key(request.url)
+            file_name = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16] + '.html'
+            with open(os.path.join(self.directory, file_name), 'wb') as f:
+                f.write(response.content)
+            with self._lock:
+                self._index[key] = file_name
+                with open(os.path.join(self.directory, RECORDING_INDEX), 'w', encoding='utf-8') as f:
+                    json.dump(self._index, f, indent=1)
+        return response
+
+
+def _load_index(directory: str) -> Dict[str, str]:
+    path = os.path.join(directory, RECORDING_INDEX)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def recorded_pages(directory: str) -> PageSource:
+    """Get a page source serving the pages a RecordingAdapter saved in a directory."""
+    index = _load_index(directory)
+    if not index:
+        raise ValueError(f"No recorded pages in {directory}")
+
+    def page(url: str) -> Optional[bytes]:
+        file_name = index.get(_page_key(url))
+        if file_name is None:
+            return None
+        with open(os.path.join(directory, file_name), 'rb') as f:
+            return f.read()
+
+    return page
+
+
+def stand_in_pages(inventory_size: int = 500, pages_per_listing: int = 3, products_per_page: int = 24,
+                   filler_kb: int = 64, seed: int = 0) -> PageSource:
+    """
+    Get a page source generating Amazon-like pages for any URL.
+
+    Every listing URL shows a different window of the same seller inventory
+    over `pages_per_listing` pages, so scans find overlapping products like
+    they do on Amazon. Seller profile URLs get a seller page.
+    """
+    rng = random.Random(seed)
+    inventory = [
+        ('B0' + ''.join(rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ0123456789') for _ in range(8)),
+         f"Stand-in product {i}", f"£{rng.randint(1, 400)}.{rng.randint(0, 99):02d}")
+        for i in range(inventory_size)
+    ]
+    # Inline scripts stand in for the bulk of a real page
+    filler = '<script>var s="s-result-item";</script>\n' * (filler_kb * 1024 // 40)
+
+    def page(url: str) -> str:
+        if '/sp?' in url:
+            return (f'<html><head><title>Stand-in Seller: Amazon Marketplace</title></head><body>{filler}'
+                    f'<h1 id="sellerName">Stand-in Seller</h1></body></html>')
+
+        match = re.search(r'(?:[?&]page=|/page/)(\d+)', url)
+        page_number = int(match.group(1)) if match else 1
+        listing = re.sub(r'(?:[?&]page=|/page/)\d+', '', _page_key(url))
+        if page_number > pages_per_listing:
+            items = []
+        else:
+            offset = random.Random(f"{seed}:{listing}").randrange(inventory_size)
+            start = offset + (page_number - 1) * products_per_page
+            items = [inventory[(start + i) % inventory_size] for i in range(products_per_page)]
+
+        results = ''.join(
+            f'<div data-asin="{asin}" data-component-type="s-search-result" class="s-result-item">'
+            f'<h2><a class="a-link-normal" href="/dp/{asin}">'
+            f'<span class="a-size-medium a-color-base a-text-normal">{title}</span></a></h2>'
+            f'<span class="a-price"><span class="a-offscreen">{price}</span></span></div>'
+            for asin, title, price in items
+        )
+        next_link = ('<li class="a-last"><a href="#">Next</a></li>' if page_number < pages_per_listing
+                     else '<li class="a-disabled a-last">Next</li>')
+        return (f'<html><head><title>Amazon.co.uk</title></head><body>{filler}'
+                f'<div class="s-main-slot s-result-list">{results}</div>'
+                f'<ul class="a-pagination">{next_link}</ul></body></html>')
+
+    return page
+
+
+@contextmanager
+def use_backend(transport: BaseAdapter, pace_requests: bool = False, isolate_state: bool = True) -> Iterator[None]:
+    """
+    Send every scraper request through a transport adapter for the duration of the block.
+
+    Args:
+        transport: Adapter used instead of real connections
+        pace_requests: Keep the rate limiter waiting and adapting (on for recording)
+        isolate_state: Keep the scraper cache, URL pattern stats and scan locks
+            in a throwaway directory, so replayed pages never reach the real cache
+    """
+    previous_pacing = rate_limiter.PACE_REQUESTS
+    previous_cache = scraper_cache._cache
+    previous_stats_path = url_pattern_planner.STATS_PATH
+    previous_lock_dir = single_flight.LOCK_DIR
+    state_dir = tempfile.TemporaryDirectory() if isolate_state else None
+
+    SESSION_POOL.use_transport(transport)
+    rate_limiter.PACE_REQUESTS = pace_requests
+    if state_dir:
+        scraper_cache._cache = scraper_cache.ScraperCache(os.path.join(state_dir.name, 'scraper_cache.sqlite3'))
+        url_pattern_planner.STATS_PATH = os.path.join(state_dir.name, 'url_pattern_stats.json')
+        single_flight.LOCK_DIR = os.path.join(state_dir.name, 'locks')
+    try:
+        yield
+    finally:
+        SESSION_POOL.use_transport(None)
+        rate_limiter.PACE_REQUESTS = previous_pacing
+        if state_dir:
+            scraper_cache._cache = previous_cache
+            url_pattern_planner.STATS_PATH = previous_stats_path
+            single_flight.LOCK_DIR = previous_lock_dir
+            state_dir.cleanup()
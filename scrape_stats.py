@@ -0,0 +1,269 @@
+"""
+Scrape Instrumentation
+
+This module records where the time of a seller scan goes and what the scan did.
+A scan runs inside scan_stats(), which makes a ScrapeStats current for all code
+called from it (including threads started with asyncio.to_thread). The
+scrapers time their stages with stage() and add_time() and bump counters with
+count(); outside a scan these do nothing.
+
+Stages:
+    sleep        rate limiting and retry pauses
+    fetch        network round trips, including the response body
+    decode       turning response bytes into text
+    parse        building HTML trees
+    parse_wait   waiting for a parser process (see parse_pool), including
+                 while the parsers are behind
+    extract      selector probing and building product dicts
+    cache_read   and cache_write, the scraper cache (writes include the price
+                 history, see price_history)
+
+A stage timed inside another is only counted once: the outer stage gets its
+own time without the inner one, so the stages add up to the scan time (the
+rest is reported as 'other').
+
+Finished scans are added to process-wide totals, which prometheus_snapshot()
+renders in the Prometheus text format for a long-running worker to serve.
+"""
+
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+STAGES = ('sleep', 'fetch', 'decode', 'parse', 'parse_wait', 'extract', 'cache_read', 'cache_write')
+COUNTERS = ('retries', 'pages', 'new_asins', 'bytes_downloaded', 'fast_path_pages', 'fast_path_fallbacks',
+            'parse_backpressure')
+
+# Status label used for requests that failed without a response
+NO_RESPONSE = 'error'
+
+_current: ContextVar[Optional['ScrapeStats']] = ContextVar('scrape_stats', default=None)
+# Time spent in stages nested inside the innermost open stage, as a one-item list
+_open_stage: ContextVar[Optional[List[float]]] = ContextVar('scrape_stage', default=None)
+
+
+class ScrapeStats:
+    """Stage timers and counters of one seller scan (thread-safe)."""
+
+    def __init__(self, scraper: str, seller_id: Optional[str] = None):
+        """Initialize empty stats for a scan by a scraper ('amazon_scraper' or 'enhanced_amazon_scraper')."""
+        self.scraper = scraper
+        self.seller_id = seller_id
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.status_codes: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def count_status(self, status_code: Optional[int]) -> None:
+        with self._lock:
+            self.status_codes[str(status_code) if status_code is not None else NO_RESPONSE] += 1
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the stats as a JSON-friendly dict (seconds rounded to the microsecond)."""
+        with self._lock:
+            stages = {name: round(seconds, 6) for name, seconds in self.stages.items()}
+            counters = dict(self.counters)
+            status_codes = dict(self.status_codes)
+        elapsed = self.elapsed
+        stages['other'] = round(max(0.0, elapsed - sum(stages.values())), 6)
+        return {
+            'scraper': self.scraper,
+            'seller_id': self.seller_id,
+            'elapsed': round(elapsed, 6),
+            'stages': stages,
+            'requests': sum(status_codes.values()),
+            'status_codes': status_codes,
+            **counters,
+        }
+
+
+@contextmanager
+def scan_stats(scraper: str, seller_id: Optional[str] = None) -> Iterator[ScrapeStats]:
+    """
+    Make a new ScrapeStats current for the duration of a scan.
+
+    Nested scans (a delta check falling back to a full scan, say) share the
+    outer scan's stats. When the outermost scan ends, its stats are added to
+    the process-wide totals.
+    """
+    stats = _current.get()
+    if stats is not None:
+        yield stats
+        return
+
+    stats = ScrapeStats(scraper, seller_id)
+    token = _current.set(stats)
+    _scans_started(scraper)
+    try:
+        yield stats
+    finally:
+        stats.finished = time.monotonic()
+        try:
+            _current.reset(token)
+        except ValueError:
+            # A scan generator closed from another context
+            _current.set(None)
+        _add_to_totals(stats)
+
+
+def current() -> Optional[ScrapeStats]:
+    """Get the stats of the scan in progress, if any."""
+    return _current.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as one of the STAGES of the current scan."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+
+    nested = [0.0]
+    token = _open_stage.set(nested)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _open_stage.reset(token)
+        stats.add_time(name, elapsed - nested[0])
+        parent = _open_stage.get()
+        if parent is not None:
+            parent[0] += elapsed
+
+
+def add_time(name: str, seconds: float) -> None:
+    """Add time measured elsewhere (e.g. the rate limiter's wait) to a stage of the current scan."""
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.add_time(name, seconds)
+    parent = _open_stage.get()
+    if parent is not None:
+        parent[0] += seconds
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add to one of the COUNTERS of the current scan."""
+    stats = _current.get()
+    if stats is not None:
+        stats.count(name, n)
+
+
+def count_status(status_code: Optional[int]) -> None:
+    """Count a request of the current scan by response status (None for no response)."""
+    stats = _current.get()
+    if stats is not None:
+        stats.count_status(status_code)
+
+
+_totals: Dict[str, Dict[str, Any]] = {}
+_totals_lock = threading.Lock()
+
+
+def _scraper_totals(scraper: str) -> Dict[str, Any]:
+    return _totals.setdefault(scraper, {
+        'scans': 0,
+        'in_progress': 0,
+        'scan_seconds': 0.0,
+        'stages': dict.fromkeys(STAGES, 0.0),
+        'counters': dict.fromkeys(COUNTERS, 0),
+        'status_codes': Counter(),
+    })
+
+
+def _scans_started(scraper: str) -> None:
+    with _totals_lock:
+        _scraper_totals(scraper)['in_progress'] += 1
+
+
+def _add_to_totals(stats: ScrapeStats) -> None:
+    with stats._lock:
+        stages = dict(stats.stages)
+        counters = dict(stats.counters)
+        status_codes = Counter(stats.status_codes)
+
+    with _totals_lock:
+        totals = _scraper_totals(stats.scraper)
+        totals['in_progress'] -= 1
+        totals['scans'] += 1
+        totals['scan_seconds'] += stats.elapsed
+        for name, seconds in stages.items():
+            totals['stages'][name] = totals['stages'].get(name, 0.0) + seconds
+        for name, n in counters.items():
+            totals['counters'][name] = totals['counters'].get(name, 0) + n
+        totals['status_codes'].update(status_codes)
+
+
+def get_totals() -> Dict[str, Dict[str, Any]]:
+    """Get the process-wide totals of all finished scans, keyed by scraper."""
+    with _totals_lock:
+        return {
+            scraper: dict(totals, stages=dict(totals['stages']), counters=dict(totals['counters']),
+                          status_codes=dict(totals['status_codes']))
+            for scraper, totals in _totals.items()
+        }
+
+
+# name -> (type, help) of every exported metric
+_METRICS = {
+    'scraper_scans_total': ('counter', "Seller scans finished."),
+    'scraper_scans_in_progress': ('gauge', "Seller scans running right now."),
+    'scraper_scan_seconds_total': ('counter', "Wall time of finished seller scans."),
+    'scraper_stage_seconds_total': ('counter', "Time of finished seller scans by stage."),
+    'scraper_requests_total': ('counter', "HTTP requests by response status ('error' if none)."),
+    'scraper_retries_total': ('counter', "Requests retried after a failure."),
+    'scraper_pages_total': ('counter', "Result pages that yielded products."),
+    'scraper_new_asins_total': ('counter', "Products found for the first time in a scan."),
+    'scraper_downloaded_bytes_total': ('counter', "Response body bytes downloaded."),
+    'scraper_fast_path_pages_total': ('counter', "Pages whose products were extracted without building a tree."),
+    'scraper_fast_path_fallbacks_total': ('counter', "Pages whose products were extracted with BeautifulSoup."),
+    'scraper_parse_backpressure_total': ('counter', "Pages that waited for room in the parser processes' queue."),
+}
+
+
+def prometheus_snapshot() -> str:
+    """Render the process-wide totals in the Prometheus text exposition format."""
+    samples: Dict[str, List[str]] = {name: [] for name in _METRICS}
+
+    for scraper, totals in sorted(get_totals().items()):
+        label = f'scraper="{scraper}"'
+        samples['scraper_scans_total'].append(f"{{{label}}} {totals['scans']}")
+        samples['scraper_scans_in_progress'].append(f"{{{label}}} {totals['in_progress']}")
+        samples['scraper_scan_seconds_total'].append(f"{{{label}}} {totals['scan_seconds']:.6f}")
+        for name, seconds in totals['stages'].items():
+            samples['scraper_stage_seconds_total'].append(f'{{{label},stage="{name}"}} {seconds:.6f}')
+        for status, n in sorted(totals['status_codes'].items()):
+            samples['scraper_requests_total'].append(f'{{{label},status="{status}"}} {n}')
+        samples['scraper_retries_total'].append(f"{{{label}}} {totals['counters']['retries']}")
+        samples['scraper_pages_total'].append(f"{{{label}}} {totals['counters']['pages']}")
+        samples['scraper_new_asins_total'].append(f"{{{label}}} {totals['counters']['new_asins']}")
+        samples['scraper_downloaded_bytes_total'].append(f"{{{label}}} {totals['counters']['bytes_downloaded']}")
+        samples['scraper_fast_path_pages_total'].append(f"{{{label}}} {totals['counters']['fast_path_pages']}")
+        samples['scraper_fast_path_fallbacks_total'].append(f"{{{label}}} {totals['counters']['fast_path_fallbacks']}")
+        samples['scraper_parse_backpressure_total'].append(f"{{{label}}} {totals['counters']['parse_backpressure']}")
+
+    lines = []
+    for name, (metric_type, help_text) in _METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.extend(name + sample for sample in samples[name])
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,636 @@
+"""
+Unified Scraper Cache
+
+This module stores seller inventories for both scrapers in a single SQLite
+database in WAL mode, replacing the per-seller {seller_id}_{marketplace}.json
+files. Each product is its own row and each seller has a metadata row. A save
+is one transaction that upserts the seller's products and drops the ones no
+longer listed, so readers never see a half-written inventory. Timestamps are
+epoch seconds for every scraper.
+
+Products are stored compactly: fields shared by all of a seller's products
+(seller_id, seller_name, marketplace, source, ...) and links derived from the
+ASIN are kept once in the seller row (see product_store.ProductBatch), and
+inventories in memory are held in the same columnar form.
+
+Inventories are kept per namespace (the scraper that produced them), because
+the two scrapers build differently shaped product dicts. When the database
+grows past SCRAPER_CACHE_MAX_BYTES, the least recently updated sellers are
+evicted.
+
+Recently used inventories are also kept in a bounded in-memory LRU, so a
+long-lived worker answers repeated lookups with one indexed check that the
+seller's row hasn't been saved since, instead of reloading its products.
+With stale-while-revalidate enabled (as the scraper worker does), an expired
+inventory is still served until its hard expiry while a background scan
+refreshes it.
+
+Seller display names are kept in a table of their own with a much longer TTL
+than inventories (SCRAPER_SELLER_NAME_TTL, 30 days by default), shared by
+both scrapers, so a scan doesn't have to fetch the seller profile page again.
+A lookup that found no name is remembered for SCRAPER_SELLER_NAME_MISS_TTL.
+
+The outcome of every incremental check (how many new ASINs it found and how
+many requests it took) is kept too, up to SELLER_CHECK_HISTORY per seller, for
+check_scheduler to learn how often each seller lists new products.
+
+Existing JSON cache files are imported the first time the database is
+created, or on demand with: python scraper_cache.py --migrate [cache_dir]
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from product_store import ProductBatch
+
+logger = logging.getLogger('scraper_cache')
+
+# Same directory the JSON caches used
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache')
+CACHE_DB_PATH = os.path.join(CACHE_DIR, 'scraper_cache.sqlite3')
+
+# Database size above which old sellers are evicted (bytes)
+DEFAULT_MAX_BYTES = int(os.environ.get('SCRAPER_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Share of sellers dropped per eviction round
+EVICTION_FRACTION = 0.1
+
+# Number of seller inventories kept in memory
+MEMORY_CACHE_SIZE = int(os.environ.get('SCRAPER_MEMORY_CACHE_SIZE', 64))
+
+# Serve expired inventories while refreshing them in the background. Off by
+# default, because a short-lived process would exit before the refresh ends.
+STALE_WHILE_REVALIDATE = os.environ.get('SCRAPER_STALE_WHILE_REVALIDATE', '') in ('1', 'true', 'yes')
+
+# Age after which a seller's name is looked up again (seconds)
+SELLER_NAME_TTL = float(os.environ.get('SCRAPER_SELLER_NAME_TTL', 30 * 86400))
+
+# Age after which a lookup that found no name is retried (seconds)
+SELLER_NAME_MISS_TTL = float(os.environ.get('SCRAPER_SELLER_NAME_MISS_TTL', 3600))
+
+# Names the scrapers fall back to, which are never cached as a seller's name
+PLACEHOLDER_SELLER_NAMES = ('Unknown Seller', 'Unknown')
+
+# Incremental checks kept per seller
+SELLER_CHECK_HISTORY = 50
+
+# Seller metadata keys stored in their own columns; anything else goes in `extra`
+_SELLER_COLUMNS = ('seller_name', 'pages_crawled')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sellers (
+    namespace     TEXT NOT NULL,
+    seller_id     TEXT NOT NULL,
+    marketplace   TEXT NOT NULL,
+    seller_name   TEXT,
+    updated_at    REAL NOT NULL,
+    product_count INTEGER NOT NULL DEFAULT 0,
+    pages_crawled INTEGER,
+    generation    INTEGER NOT NULL DEFAULT 0,
+    extra         TEXT,
+    product_layout TEXT,
+    PRIMARY KEY (namespace, seller_id, marketplace)
+);
+CREATE TABLE IF NOT EXISTS products (
+    namespace   TEXT NOT NULL,
+    seller_id   TEXT NOT NULL,
+    marketplace TEXT NOT NULL,
+    asin        TEXT NOT NULL,
+    position    INTEGER NOT NULL,
+    generation  INTEGER NOT NULL,
+    data        TEXT NOT NULL,
+    PRIMARY KEY (namespace, seller_id, marketplace, asin)
+);
+CREATE INDEX IF NOT EXISTS sellers_updated_at ON sellers (updated_at);
+CREATE TABLE IF NOT EXISTS seller_names (
+    seller_id   TEXT NOT NULL,
+    marketplace TEXT NOT NULL,
+    seller_name TEXT,
+    source      TEXT,
+    named_at    REAL,
+    checked_at  REAL NOT NULL,
+    PRIMARY KEY (seller_id, marketplace)
+);
+CREATE TABLE IF NOT EXISTS seller_checks (
+    seller_id   TEXT NOT NULL,
+    marketplace TEXT NOT NULL,
+    checked_at  REAL NOT NULL,
+    new_asins   INTEGER,
+    requests    INTEGER
+);
+CREATE INDEX IF NOT EXISTS seller_checks_seller ON seller_checks (seller_id, marketplace, checked_at);
+"""
+
+# Columns added since the first schema, with their definitions
+_ADDED_SELLER_COLUMNS = {'product_layout': 'TEXT'}
+
+
+InventoryKey = Tuple[str, str, str]
+
+
+class InventoryMemoryCache:
+    """Thread-safe LRU of seller inventories keyed by (namespace, seller_id, marketplace)."""
+
+    def __init__(self, max_entries: int = MEMORY_CACHE_SIZE):
+        """Initialize an empty cache holding at most max_entries inventories."""
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[InventoryKey, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: InventoryKey) -> Optional[Dict[str, Any]]:
+        """Get an inventory and mark it as recently used."""
+        with self._lock:
+            inventory = self._entries.get(key)
+            if inventory is not None:
+                self._entries.move_to_end(key)
+            return inventory
+
+    def put(self, key: InventoryKey, inventory: Dict[str, Any]) -> None:
+        """Store an inventory, evicting the least recently used ones if full."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = inventory
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: InventoryKey) -> None:
+        """Forget an inventory."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class ScraperCache:
+    """SQLite store for seller inventories, safe to share between threads and processes."""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Open (and create if needed) the cache database."""
+        self.path = path or CACHE_DB_PATH
+        self.max_bytes = max_bytes
+        self.memory = InventoryMemoryCache()
+        self._local = threading.local()
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        is_new = not os.path.exists(self.path)
+        conn = self._connect()
+        has_names = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'seller_names'"
+        ).fetchone() is not None
+        conn.executescript(_SCHEMA)
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(sellers)')}
+        for column, definition in _ADDED_SELLER_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE sellers ADD COLUMN {column} {definition}")
+
+        if is_new:
+            migrate_json_cache(os.path.dirname(self.path), self)
+        if not has_names:
+            self._seed_seller_names()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get_inventory(self, namespace: str, seller_id: str, marketplace: str,
+                      max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a seller's cached inventory.
+
+        Args:
+            namespace: Scraper that produced the inventory
+            seller_id: The Amazon seller ID
+            marketplace: Amazon marketplace
+            max_age: Maximum age in seconds, or None to accept any age
+
+        Returns:
+            Dict with seller_id, seller_name, marketplace, products, product_count,
+            pages_crawled and timestamp (epoch seconds), or None if missing or too old
+        """
+        key = (namespace, seller_id, marketplace)
+        inventory = self.memory.get(key)
+        if inventory is not None:
+            # Another process may have saved or deleted it since we loaded it
+            updated_at = self._get_updated_at(key)
+            if updated_at != inventory['timestamp']:
+                self.memory.discard(key)
+                inventory = None
+        if inventory is None:
+            inventory = self._load_inventory(key)
+            if inventory is None:
+                return None
+            self.memory.put(key, inventory)
+
+        if max_age is not None and time.time() - inventory['timestamp'] > max_age:
+            logger.info(f"Cache for {seller_id} is older than {max_age / 3600:.0f} hours")
+            return None
+
+        # Callers get their own dict and product dicts
+        return dict(inventory, products=inventory['products'].to_list())
+
+    def get_inventory_or_revalidate(self, namespace: str, seller_id: str, marketplace: str,
+                                    max_age: float, hard_max_age: float,
+                                    refresh: Callable[[], Any]) -> Optional[Dict[str, Any]]:
+        """
+        Get a seller's inventory, serving it stale while a refresh runs.
+
+        A fresh inventory is returned as is. An expired one that is younger than
+        hard_max_age is returned straight away and `refresh` is started in a
+        background thread (once per seller at a time). Past the hard expiry, or
+        with stale-while-revalidate disabled, None is returned and the caller
+        should scan.
+        """
+        inventory = self.get_inventory(namespace, seller_id, marketplace, max_age)
+        if inventory is not None or not STALE_WHILE_REVALIDATE:
+            return inventory
+
+        inventory = self.get_inventory(namespace, seller_id, marketplace, hard_max_age)
+        if inventory is None:
+            return None
+
+        logger.info(f"Serving stale cache for {seller_id} while refreshing in the background")
+        self._start_refresh((namespace, seller_id, marketplace), refresh)
+        return inventory
+
+    def _start_refresh(self, key: InventoryKey, refresh: Callable[[], Any]) -> None:
+        """Run a refresh in a daemon thread unless one is already running for the key."""
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                refresh()
+            except Exception as e:
+                logger.error(f"Background refresh of {key[1]} failed: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f"refresh-{key[1]}", daemon=True).start()
+
+    def _get_updated_at(self, key: InventoryKey) -> Optional[float]:
+        """Get when a seller's inventory was last saved, without loading it."""
+        row = self._connect().execute(
+            "SELECT updated_at FROM sellers WHERE namespace = ? AND seller_id = ? AND marketplace = ?", key
+        ).fetchone()
+        return row[0] if row else None
+
+    def _load_inventory(self, key: InventoryKey) -> Optional[Dict[str, Any]]:
+        """Read a seller's inventory from the database."""
+        conn = self._connect()
+        # Read the seller row and its products from one snapshot, so a save
+        # committing in between can't pair one inventory's header with another's products
+        conn.execute('BEGIN')
+        try:
+            row = conn.execute(
+                "SELECT seller_name, updated_at, product_count, pages_crawled, extra, product_layout FROM sellers "
+                "WHERE namespace = ? AND seller_id = ? AND marketplace = ?",
+                key
+            ).fetchone()
+            if row is None:
+                return None
+
+            seller_name, updated_at, product_count, pages_crawled, extra, product_layout = row
+            products = ProductBatch.from_rows(json.loads(product_layout) if product_layout else None, (
+                json.loads(data) for (data,) in conn.execute(
+                    "SELECT data FROM products WHERE namespace = ? AND seller_id = ? AND marketplace = ? "
+                    "ORDER BY position",
+                    key
+                )
+            ))
+        finally:
+            conn.commit()
+
+        namespace, seller_id, marketplace = key
+        inventory = json.loads(extra) if extra else {}
+        inventory.update({
+            'seller_id': seller_id,
+            'seller_name': seller_name,
+            'marketplace': marketplace,
+            'products': products,
+            'product_count': product_count,
+            'pages_crawled': pages_crawled,
+            'timestamp': updated_at
+        })
+        return inventory
+
+    def get_latest_inventory(self, seller_id: str, marketplace: str) -> Optional[Dict[str, Any]]:
+        """Get the most recently updated inventory of a seller from any namespace."""
+        row = self._connect().execute(
+            "SELECT namespace FROM sellers WHERE seller_id = ? AND marketplace = ? "
+            "ORDER BY updated_at DESC LIMIT 1",
+            (seller_id, marketplace)
+        ).fetchone()
+        return self.get_inventory(row[0], seller_id, marketplace) if row else None
+
+    def save_inventory(self, namespace: str, seller_id: str, marketplace: str, data: Dict[str, Any],
+                       updated_at: Optional[float] = None) -> None:
+        """
+        Atomically replace a seller's cached inventory.
+
+        Products are upserted under a new generation number and rows from older
+        generations are deleted in the same transaction.
+
+        Args:
+            namespace: Scraper that produced the inventory
+            seller_id: The Amazon seller ID
+            marketplace: Amazon marketplace
+            data: Inventory dict with a 'products' list and seller metadata
+            updated_at: Timestamp to store (default: now)
+        """
+        products = ProductBatch.from_products(data.get('products', []))
+        updated_at = time.time() if updated_at is None else updated_at
+        extra = {key: value for key, value in data.items()
+                 if key not in _SELLER_COLUMNS and key not in ('products', 'product_count', 'timestamp',
+                                                               'seller_id', 'marketplace')}
+
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                "SELECT generation FROM sellers WHERE namespace = ? AND seller_id = ? AND marketplace = ?",
+                (namespace, seller_id, marketplace)
+            ).fetchone()
+            generation = (row[0] + 1) if row else 1
+
+            conn.execute(
+                "INSERT INTO sellers (namespace, seller_id, marketplace, seller_name, updated_at, "
+                "product_count, pages_crawled, generation, extra, product_layout) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (namespace, seller_id, marketplace) DO UPDATE SET "
+                "seller_name = excluded.seller_name, updated_at = excluded.updated_at, "
+                "product_count = excluded.product_count, pages_crawled = excluded.pages_crawled, "
+                "generation = excluded.generation, extra = excluded.extra, product_layout = excluded.product_layout",
+                (namespace, seller_id, marketplace, data.get('seller_name'), updated_at,
+                 len(products), data.get('pages_crawled'), generation, json.dumps(extra) if extra else None,
+                 json.dumps(products.layout(), ensure_ascii=False))
+            )
+            conn.executemany(
+                "INSERT INTO products (namespace, seller_id, marketplace, asin, position, generation, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (namespace, seller_id, marketplace, asin) DO UPDATE SET "
+                "position = excluded.position, generation = excluded.generation, data = excluded.data",
+                ((namespace, seller_id, marketplace, row_asin, position, generation,
+                  json.dumps(row, ensure_ascii=False))
+                 for position, (row_asin, row) in enumerate(zip(products.asins(), products.rows())))
+            )
+            conn.execute(
+                "DELETE FROM products WHERE namespace = ? AND seller_id = ? AND marketplace = ? AND generation < ?",
+                (namespace, seller_id, marketplace, generation)
+            )
+
+        self.memory.discard((namespace, seller_id, marketplace))
+        self.evict()
+
+    def delete_inventory(self, namespace: str, seller_id: str, marketplace: str) -> None:
+        """Remove a seller's cached inventory."""
+        conn = self._connect()
+        with conn:
+            key = (namespace, seller_id, marketplace)
+            conn.execute("DELETE FROM products WHERE namespace = ? AND seller_id = ? AND marketplace = ?", key)
+            conn.execute("DELETE FROM sellers WHERE namespace = ? AND seller_id = ? AND marketplace = ?", key)
+        self.memory.discard(key)
+
+    def get_seller_names(self, seller_ids: Iterable[str], marketplace: str) -> Dict[str, Optional[str]]:
+        """
+        Get the cached display names of sellers.
+
+        Only sellers whose entry is still fresh are included: a name seen
+        within SELLER_NAME_TTL, or (as None, or the last name known) a lookup
+        made within SELLER_NAME_MISS_TTL. Sellers missing from the result
+        should be looked up.
+        """
+        seller_ids = list(dict.fromkeys(seller_ids))
+        now = time.time()
+        names = {}
+        conn = self._connect()
+        # Stay under SQLite's limit on bound parameters
+        for start in range(0, len(seller_ids), 500):
+            chunk = seller_ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT seller_id, seller_name, named_at, checked_at FROM seller_names "
+                f"WHERE marketplace = ? AND seller_id IN ({', '.join('?' * len(chunk))})",
+                [marketplace, *chunk]
+            )
+            for seller_id, seller_name, named_at, checked_at in rows:
+                if seller_name is not None and now - named_at <= SELLER_NAME_TTL:
+                    names[seller_id] = seller_name
+                elif now - checked_at <= SELLER_NAME_MISS_TTL:
+                    names[seller_id] = seller_name
+        return names
+
+    def save_seller_name(self, seller_id: str, marketplace: str, seller_name: Optional[str],
+                         source: Optional[str] = None) -> None:
+        """
+        Record the result of looking up a seller's display name.
+
+        A None (or placeholder) name records a failed lookup; a name found
+        earlier is kept and served until the lookup is retried.
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            if seller_name and seller_name not in PLACEHOLDER_SELLER_NAMES:
+                conn.execute(
+                    "INSERT INTO seller_names (seller_id, marketplace, seller_name, source, named_at, checked_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (seller_id, marketplace) DO UPDATE SET seller_name = excluded.seller_name, "
+                    "source = excluded.source, named_at = excluded.named_at, checked_at = excluded.checked_at",
+                    (seller_id, marketplace, seller_name, source, now, now)
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO seller_names (seller_id, marketplace, checked_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (seller_id, marketplace) DO UPDATE SET checked_at = excluded.checked_at",
+                    (seller_id, marketplace, now)
+                )
+
+    def record_seller_check(self, seller_id: str, marketplace: str, new_asins: Optional[int],
+                            requests: Optional[int], checked_at: Optional[float] = None) -> None:
+        """
+        Record the outcome of checking a seller, dropping its oldest checks past SELLER_CHECK_HISTORY.
+
+        A full scan of a seller without a cached inventory is recorded with
+        new_asins and requests None: it says when the seller was last read,
+        not whether anything changed.
+        """
+        checked_at = time.time() if checked_at is None else checked_at
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO seller_checks (seller_id, marketplace, checked_at, new_asins, requests) VALUES (?, ?, ?, ?, ?)",
+                (seller_id, marketplace, checked_at, new_asins, requests)
+            )
+            conn.execute(
+                "DELETE FROM seller_checks WHERE seller_id = ? AND marketplace = ? AND checked_at < ("
+                "SELECT checked_at FROM seller_checks WHERE seller_id = ? AND marketplace = ? "
+                "ORDER BY checked_at DESC LIMIT 1 OFFSET ?)",
+                (seller_id, marketplace, seller_id, marketplace, SELLER_CHECK_HISTORY - 1)
+            )
+
+    def get_seller_checks(self, seller_ids: Iterable[str],
+                          marketplace: str) -> Dict[str, List[Tuple[float, Optional[int], Optional[int]]]]:
+        """Get the recorded checks of sellers as (checked_at, new_asins, requests), oldest first."""
+        seller_ids = list(dict.fromkeys(seller_ids))
+        checks: Dict[str, List[Tuple[float, Optional[int], Optional[int]]]] = {}
+        conn = self._connect()
+        # Stay under SQLite's limit on bound parameters
+        for start in range(0, len(seller_ids), 500):
+            chunk = seller_ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT seller_id, checked_at, new_asins, requests FROM seller_checks "
+                f"WHERE marketplace = ? AND seller_id IN ({', '.join('?' * len(chunk))}) ORDER BY checked_at",
+                [marketplace, *chunk]
+            )
+            for seller_id, checked_at, new_asins, requests in rows:
+                checks.setdefault(seller_id, []).append((checked_at, new_asins, requests))
+        return checks
+
+    def _seed_seller_names(self) -> None:
+        """Fill a new seller name table from the names stored with cached inventories."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO seller_names (seller_id, marketplace, seller_name, source, named_at, checked_at) "
+                "SELECT seller_id, marketplace, seller_name, namespace, MAX(updated_at), MAX(updated_at) FROM sellers "
+                f"WHERE seller_name IS NOT NULL AND seller_name NOT IN ({', '.join('?' * len(PLACEHOLDER_SELLER_NAMES))}) "
+                "GROUP BY seller_id, marketplace",
+                PLACEHOLDER_SELLER_NAMES
+            )
+
+    def size_bytes(self) -> int:
+        """Get the space used by live pages in the database."""
+        conn = self._connect()
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def evict(self) -> int:
+        """
+        Drop the least recently updated sellers until the database fits max_bytes.
+
+        Returns:
+            The number of seller inventories evicted
+        """
+        evicted = 0
+        conn = self._connect()
+        while self.max_bytes and self.size_bytes() > self.max_bytes:
+            total = conn.execute("SELECT COUNT(*) FROM sellers").fetchone()[0]
+            if total <= 1:
+                break
+
+            batch = max(1, int(total * EVICTION_FRACTION))
+            oldest = conn.execute(
+                "SELECT namespace, seller_id, marketplace FROM sellers ORDER BY updated_at LIMIT ?", (batch,)
+            ).fetchall()
+            for key in oldest:
+                self.delete_inventory(*key)
+            evicted += len(oldest)
+
+        if evicted:
+            logger.info(f"Evicted {evicted} seller inventories from cache")
+        return evicted
+
+
+def _parse_timestamp(value: Any) -> float:
+    """Convert a JSON cache timestamp (epoch float or ISO string) to epoch seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return 0.0
+
+
+def _guess_namespace(data: Dict[str, Any]) -> str:
+    """Work out which scraper wrote a JSON cache file."""
+    products = data.get('products') or [{}]
+    if isinstance(data.get('timestamp'), str) or products[0].get('source') == 'enhanced_amazon':
+        return 'enhanced_amazon_scraper'
+    return 'amazon_scraper'
+
+
+def migrate_json_cache(cache_dir: str = CACHE_DIR, cache: Optional[ScraperCache] = None) -> int:
+    """
+    Import {seller_id}_{marketplace}.json cache files into the SQLite cache.
+
+    Files are left in place. An inventory already in the database is only
+    replaced by a file with a newer timestamp.
+
+    Returns:
+        The number of inventories imported
+    """
+    cache = cache or get_cache()
+    imported = 0
+
+    for name in sorted(os.listdir(cache_dir)) if os.path.isdir(cache_dir) else []:
+        if not name.endswith('.json') or '_' not in name:
+            continue
+
+        seller_id, marketplace = name[:-len('.json')].split('_', 1)
+        try:
+            with open(os.path.join(cache_dir, name), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or not isinstance(data.get('products'), list):
+                continue
+
+            namespace = _guess_namespace(data)
+            updated_at = _parse_timestamp(data.get('timestamp'))
+            existing = cache.get_inventory(namespace, seller_id, marketplace)
+            if existing and existing['timestamp'] >= updated_at:
+                continue
+
+            cache.save_inventory(namespace, seller_id, marketplace, data, updated_at=updated_at)
+            imported += 1
+        except Exception as e:
+            logger.warning(f"Error migrating cache file {name}: {e}")
+
+    if imported:
+        logger.info(f"Migrated {imported} JSON cache files into {cache.path}")
+    return imported
+
+
+_cache: Optional[ScraperCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ScraperCache:
+    """Get the process-wide cache instance, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ScraperCache()
+        return _cache
+
+
+def get_cached_products(seller_id: str, marketplace: str = "co.uk") -> List[Dict[str, Any]]:
+    """Get a seller's most recently cached products from either scraper. This function can be called from Node.js."""
+    inventory = get_cache().get_latest_inventory(seller_id, marketplace)
+    return inventory['products'] if inventory else []
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == '--migrate':
+        count = migrate_json_cache(sys.argv[2] if len(sys.argv) >= 3 else CACHE_DIR)
+        print(f"Migrated {count} cache files")
+    else:
+        print("Usage: python scraper_cache.py --migrate [cache_dir]")
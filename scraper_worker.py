@@ -0,0 +1,266 @@
+"""
+Long-lived Scraper Worker
+
+This module runs the Python scrapers as a persistent worker process so the Node
+bridges do not have to start a new interpreter for every call. Imports,
+AmazonSellerScraper sessions, cookies and open connections stay warm between
+requests.
+
+Protocol: one JSON object per line in each direction.
+
+    Request:  {"id": 1, "module": "amazon_scraper", "method": "get_seller_products",
+               "args": ["A25WS8YVXEJW8B", "co.uk", false], "kwargs": {}}
+    Response: {"id": 1, "result": [...]}  or  {"id": 1, "error": "message"}
+
+Requests are served concurrently, so responses may arrive out of order and must
+be matched to requests by id. Requests are read from stdin by default, or from
+a Unix socket when started with --socket.
+
+Because the worker outlives each request, it serves expired seller inventories
+from its in-memory cache while refreshing them in the background
+(stale-while-revalidate); --no-stale disables this.
+
+The "metrics" method returns the scan stage timings and counters of every scan
+served so far in the Prometheus text format (see scrape_stats); with
+--metrics-port they are also served over HTTP at /metrics.
+
+check_scheduler.due_sellers keeps its schedule and hourly request budget in
+the worker, so they carry over from one call to the next.
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TextIO
+
+import amazon_scraper
+import enhanced_amazon_scraper
+import scraper_cache
+import scrape_stats
+import check_scheduler
+import price_history
+from seller_batch import DEFAULT_MAX_WORKERS
+
+logger = logging.getLogger('scraper_worker')
+
+# Default number of requests served at the same time
+DEFAULT_WORKERS = 4
+
+
+class ScraperWorker:
+    """Dispatches protocol requests to warm scraper instances."""
+
+    def __init__(self):
+        """Initialize the worker with an empty set of scrapers."""
+        self._scrapers: Dict[str, amazon_scraper.AmazonSellerScraper] = {}
+        self._scrapers_lock = threading.Lock()
+        self._methods: Dict[str, Dict[str, Callable[..., Any]]] = {
+            'amazon_scraper': {
+                'get_seller_products': self._amazon_get_seller_products,
+                'get_seller_name': self._amazon_get_seller_name,
+                'get_seller_names': self._amazon_get_seller_names,
+                'get_seller_changes': self._amazon_get_seller_changes,
+                'scan_sellers': lambda *args, **kwargs: list(amazon_scraper.scan_sellers(*args, **kwargs)),
+                'scan_marketplaces': amazon_scraper.scan_marketplaces,
+            },
+            'enhanced_amazon_scraper': {
+                'get_seller_products': enhanced_amazon_scraper.get_seller_products,
+                'get_seller_name': enhanced_amazon_scraper.get_seller_name,
+                'get_seller_names': enhanced_amazon_scraper.get_seller_names,
+                'scan_seller_inventory': enhanced_amazon_scraper.scan_seller_inventory,
+                'scan_seller_changes': enhanced_amazon_scraper.scan_seller_changes,
+                'scan_sellers': lambda *args, **kwargs: list(enhanced_amazon_scraper.scan_sellers(*args, **kwargs)),
+                'scan_marketplaces': enhanced_amazon_scraper.scan_marketplaces,
+            },
+            'scraper_cache': {
+                'get_cached_products': scraper_cache.get_cached_products,
+            },
+            'check_scheduler': {
+                'due_sellers': check_scheduler.due_sellers,
+                'get_schedule': check_scheduler.get_schedule,
+            },
+            'price_history': {
+                'get_price_drops': price_history.get_price_drops,
+                'get_asin_history': price_history.get_asin_history,
+            },
+        }
+
+    def get_scraper(self, marketplace: str = "co.uk") -> amazon_scraper.AmazonSellerScraper:
+        """Get the warm scraper for a marketplace, creating it on first use."""
+        with self._scrapers_lock:
+            scraper = self._scrapers.get(marketplace)
+            if scraper is None:
+                logger.info(f"Creating scraper for marketplace {marketplace}")
+                scraper = amazon_scraper.AmazonSellerScraper(marketplace=marketplace)
+                self._scrapers[marketplace] = scraper
+            return scraper
+
+    def _amazon_get_seller_products(self, seller_id: str, marketplace: str = "co.uk",
+                                    force_refresh: bool = False, concurrency: int = 1, with_stats: bool = False):
+        """Same as amazon_scraper.get_seller_products, but on a warm scraper."""
+        return self.get_scraper(marketplace).get_seller_products(seller_id, force_refresh, concurrency, with_stats)
+
+    def _amazon_get_seller_name(self, seller_id: str, marketplace: str = "co.uk", force_refresh: bool = False):
+        """Same as amazon_scraper.get_seller_name, but on a warm scraper."""
+        return self.get_scraper(marketplace).get_seller_name(seller_id, force_refresh)
+
+    def _amazon_get_seller_names(self, seller_ids: list, marketplace: str = "co.uk", force_refresh: bool = False,
+                                 max_workers: int = DEFAULT_MAX_WORKERS):
+        """Same as amazon_scraper.get_seller_names, but on a warm scraper."""
+        return self.get_scraper(marketplace).get_seller_names(seller_ids, force_refresh, max_workers)
+
+    def _amazon_get_seller_changes(self, seller_id: str, marketplace: str = "co.uk", with_stats: bool = False):
+        """Same as amazon_scraper.get_seller_changes, but on a warm scraper."""
+        return self.get_scraper(marketplace).get_seller_changes(seller_id, with_stats=with_stats)
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a single request and build its response."""
+        request_id = request.get('id')
+        method_name = request.get('method')
+
+        if method_name == 'ping':
+            return {'id': request_id, 'result': 'pong'}
+        if method_name == 'metrics':
+            return {'id': request_id, 'result': scrape_stats.prometheus_snapshot()}
+
+        module_name = request.get('module', 'amazon_scraper')
+        method = self._methods.get(module_name, {}).get(method_name)
+        if method is None:
+            return {'id': request_id, 'error': f"Unknown method: {module_name}.{method_name}"}
+
+        try:
+            result = method(*request.get('args', []), **request.get('kwargs', {}))
+            return {'id': request_id, 'result': result}
+        except Exception as e:
+            logger.error(f"Error handling {module_name}.{method_name} (id {request_id}): {e}")
+            return {'id': request_id, 'error': str(e)}
+
+    def serve_stream(self, reader: TextIO, writer: TextIO, workers: int = DEFAULT_WORKERS) -> None:
+        """
+        Serve requests from a line-based stream until EOF or a shutdown request.
+
+        Requests run on a thread pool and each response is written as soon as it
+        is ready, so a slow scan does not hold up quick name lookups.
+        """
+        write_lock = threading.Lock()
+
+        def respond(response: Dict[str, Any]) -> None:
+            line = json.dumps(response, ensure_ascii=False)
+            with write_lock:
+                writer.write(line + '\n')
+                writer.flush()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for line in reader:
+                line = line.strip()
+                if not line:
+                    continue
+
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    respond({'id': None, 'error': f"Invalid JSON: {e}"})
+                    continue
+
+                if request.get('method') == 'shutdown':
+                    respond({'id': request.get('id'), 'result': 'bye'})
+                    break
+
+                pool.submit(lambda req=request: respond(self.handle(req)))
+
+
+class _SocketHandler(socketserver.StreamRequestHandler):
+    """Serves one Unix socket connection with the line protocol."""
+
+    def handle(self):
+        reader = (line.decode('utf-8') for line in self.rfile)
+        writer = _SocketWriter(self.wfile)
+        self.server.worker.serve_stream(reader, writer, self.server.workers)
+
+
+class _SocketWriter:
+    """Minimal text writer on top of a socket file."""
+
+    def __init__(self, wfile):
+        self._wfile = wfile
+
+    def write(self, text: str) -> None:
+        self._wfile.write(text.encode('utf-8'))
+
+    def flush(self) -> None:
+        self._wfile.flush()
+
+
+def serve_unix_socket(worker: ScraperWorker, socket_path: str, workers: int = DEFAULT_WORKERS) -> None:
+    """Serve requests on a Unix socket, one thread per connection."""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    with socketserver.ThreadingUnixStreamServer(socket_path, _SocketHandler) as server:
+        server.worker = worker
+        server.workers = workers
+        logger.info(f"Scraper worker listening on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the Prometheus snapshot at /metrics."""
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = scrape_stats.prometheus_snapshot().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serve /metrics over HTTP on a background thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def main(argv: Optional[list] = None) -> None:
+    """Run the worker on stdin/stdout or on a Unix socket."""
+    parser = argparse.ArgumentParser(description="Persistent Amazon scraper worker")
+    parser.add_argument('--socket', help="Serve on this Unix socket path instead of stdin/stdout")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Number of requests served at the same time")
+    parser.add_argument('--no-stale', action='store_true',
+                        help="Scan expired inventories instead of serving them while refreshing")
+    parser.add_argument('--metrics-port', type=int,
+                        help="Also serve scan metrics in the Prometheus format on this local port")
+    args = parser.parse_args(argv)
+
+    scraper_cache.STALE_WHILE_REVALIDATE = not args.no_stale
+    if args.metrics_port is not None:
+        serve_metrics(args.metrics_port)
+
+    worker = ScraperWorker()
+    if args.socket:
+        serve_unix_socket(worker, args.socket, args.workers)
+    else:
+        logger.info("Scraper worker ready on stdin")
+        worker.serve_stream(sys.stdin, sys.stdout, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+/**
+ * Client for the long-lived Python scraper worker
+ * Keeps one scraper_worker.py process running and sends it JSON requests,
+ * so each call skips interpreter startup, imports and new TLS connections
+ */
+
+const { spawn } = require('child_process');
+const path = require('path');
+const fs = require('fs');
+const readline = require('readline');
+
+// Path to the Python worker
+const WORKER_PATH = path.join(__dirname, 'scraper_worker.py');
+
+// How long a request may take before its promise is rejected (a full scan of a large seller takes minutes)
+const REQUEST_TIMEOUT_MS = parseInt(process.env.SCRAPER_WORKER_TIMEOUT_MS, 10) || 10 * 60 * 1000;
+
+// Timeouts in a row, without any response in between, after which the worker is taken to be hung and restarted
+const MAX_CONSECUTIVE_TIMEOUTS = 3;
+
+let workerProcess = null;
+let consecutiveTimeouts = 0;
+let nextRequestId = 1;
+const pendingRequests = new Map();
+
+/**
+ * Start the worker process if it is not already running
+ * @returns {ChildProcess} - The running worker process
+ */
+function ensureWorker() {
+    if (workerProcess) {
+        return workerProcess;
+    }
+
+    if (!fs.existsSync(WORKER_PATH)) {
+        throw new Error(`Python scraper worker not found at: ${WORKER_PATH}`);
+    }
+
+    console.log('🐍 Starting Python scraper worker...');
+    const proc = spawn('python3', [WORKER_PATH], { cwd: __dirname });
+    workerProcess = proc;
+
+    // Each stdout line is one JSON response tagged with its request id
+    readline.createInterface({ input: proc.stdout }).on('line', (line) => {
+        let response;
+        try {
+            response = JSON.parse(line);
+        } catch (error) {
+            console.error(`Error parsing worker output: ${error.message}`);
+            console.error(`Raw output: ${line}`);
+            return;
+        }
+
+        // The worker is responding, even if this request already timed out
+        consecutiveTimeouts = 0;
+
+        const pending = pendingRequests.get(response.id);
+        if (!pending) {
+            return;
+        }
+        pendingRequests.delete(response.id);
+        clearTimeout(pending.timer);
+
+        if (response.error) {
+            pending.reject(new Error(`Python error: ${response.error}`));
+        } else {
+            pending.resolve(response.result);
+        }
+    });
+
+    proc.stderr.on('data', (data) => {
+        console.error(`🐍 Python worker: ${data.toString()}`);
+    });
+
+    proc.on('error', (error) => {
+        console.error(`🐍 Python scraper worker error: ${error.message}`);
+    });
+
+    // Fail everything still waiting on this worker and let the next call start a fresh one
+    proc.on('close', (code) => {
+        console.error(`🐍 Python scraper worker exited with code ${code}`);
+        if (workerProcess === proc) {
+            workerProcess = null;
+            consecutiveTimeouts = 0;
+        }
+        for (const [id, pending] of pendingRequests) {
+            if (pending.proc === proc) {
+                pendingRequests.delete(id);
+                clearTimeout(pending.timer);
+                pending.reject(new Error(`Python scraper worker exited with code ${code}`));
+            }
+        }
+    });
+
+    return proc;
+}
+
+/**
+ * Give up on a request that got no response in time, restarting the worker if it seems hung
+ * @param {number} id - Request id
+ * @param {number} timeoutMs - The request's timeout
+ */
+function timeOutRequest(id, timeoutMs) {
+    const pending = pendingRequests.get(id);
+    if (!pending) {
+        return;
+    }
+    pendingRequests.delete(id);
+    pending.reject(new Error(`Python scraper worker did not respond within ${timeoutMs / 1000}s`));
+
+    consecutiveTimeouts++;
+    if (consecutiveTimeouts >= MAX_CONSECUTIVE_TIMEOUTS && workerProcess === pending.proc) {
+        // The close handler fails its remaining requests; the next call starts a fresh worker
+        console.error(`🐍 Python scraper worker timed out ${consecutiveTimeouts} times in a row, restarting it`);
+        workerProcess = null;
+        consecutiveTimeouts = 0;
+        pending.proc.kill();
+    }
+}
+
+/**
+ * Call a scraper function in the worker process
+ * @param {string} moduleName - Python module (amazon_scraper or enhanced_amazon_scraper)
+ * @param {string} method - Name of the function to call
+ * @param {array} args - Positional arguments for the function
+ * @param {object} options - { timeoutMs }: reject if there is no response within this time
+ * @returns {Promise<any>} - Result from Python
+ */
+function callWorker(moduleName, method, args = [], { timeoutMs = REQUEST_TIMEOUT_MS } = {}) {
+    return new Promise((resolve, reject) => {
+        let proc;
+        try {
+            proc = ensureWorker();
+        } catch (error) {
+            reject(error);
+            return;
+        }
+
+        const id = nextRequestId++;
+        const timer = setTimeout(() => timeOutRequest(id, timeoutMs), timeoutMs);
+        pendingRequests.set(id, { resolve, reject, timer, proc });
+        proc.stdin.write(JSON.stringify({ id, module: moduleName, method, args }) + '\n');
+    });
+}
+
+/**
+ * Stop the worker process
+ */
+function stopWorker() {
+    if (workerProcess) {
+        workerProcess.stdin.end(JSON.stringify({ id: 0, method: 'shutdown' }) + '\n');
+    }
+}
+
+module.exports = {
+    callWorker,
+    stopWorker
+};
@@ -0,0 +1,177 @@
+"""
+Batch Seller Scanning
+
+This module schedules scans for many sellers over a bounded thread pool. It is
+used by the scan_sellers entry points of both scraper modules, which pass in a
+scan function bound to their shared session and rate limiter.
+
+run_marketplaces() fans one seller's scan out over several marketplaces at
+once. Each marketplace is a different Amazon host, so the scans are paced by
+separate buckets of the per-host rate limiter and don't hold each other up.
+
+It also resolves seller display names for both scrapers: names come from the
+long-lived name cache in scraper_cache, and only the sellers missing from it
+are looked up, over the same kind of bounded pool.
+"""
+
+import os
+import json
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from scrape_stats import stage
+from scraper_cache import get_cache
+
+logger = logging.getLogger('seller_batch')
+
+# Default number of sellers scanned at the same time
+DEFAULT_MAX_WORKERS = 4
+
+# Tracked sellers, as maintained by the Discord bot (seller ID -> last check in ms)
+TRACKED_SELLERS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'seller_check_timestamps.json')
+
+
+def load_tracked_seller_ids(path: str = TRACKED_SELLERS_PATH) -> List[str]:
+    """Get the IDs of all tracked sellers from the seller check timestamps file."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return list(json.load(f).keys())
+    except Exception as e:
+        logger.error(f"Error reading tracked sellers from {path}: {e}")
+        return []
+
+
+def run_batch(scan: Callable[[str], List[Dict[str, Any]]], seller_ids: Optional[Iterable[str]],
+              marketplace: str, max_workers: int = DEFAULT_MAX_WORKERS) -> Iterator[Dict[str, Any]]:
+    """
+    Scan sellers over a bounded pool and yield each result as it finishes.
+
+    A failing seller is reported in its own result and does not stop the batch.
+
+    Args:
+        scan: Function that scans one seller and returns its products
+        seller_ids: Sellers to scan, or None for all tracked sellers; duplicates are scanned once
+        marketplace: Marketplace the scan function is bound to
+        max_workers: Maximum number of sellers scanned at the same time
+
+    Yields:
+        Dicts with seller_id, marketplace, products, error and elapsed seconds
+    """
+    def timed_scan(seller_id: str):
+        return _timed(scan, seller_id, f"seller {seller_id}")
+
+    if seller_ids is None:
+        seller_ids = load_tracked_seller_ids()
+    unique_ids = list(dict.fromkeys(seller_ids))
+    logger.info(f"Scanning {len(unique_ids)} sellers on {marketplace} with {max_workers} workers")
+
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        futures = {pool.submit(timed_scan, seller_id): seller_id for seller_id in unique_ids}
+        for future in as_completed(futures):
+            products, error, elapsed = future.result()
+            yield {
+                'seller_id': futures[future],
+                'marketplace': marketplace,
+                'products': products,
+                'error': error,
+                'elapsed': elapsed
+            }
+    finally:
+        # Don't start queued scans if the caller stops iterating early
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_marketplaces(scan: Callable[[str], List[Dict[str, Any]]], seller_id: str,
+                     marketplaces: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Scan one seller on several marketplaces at the same time.
+
+    A marketplace that fails is reported in its own entry and does not stop the others.
+
+    Args:
+        scan: Function that scans the seller on one marketplace and returns its products
+        seller_id: Seller being scanned, for logging
+        marketplaces: Marketplaces to scan; duplicates are scanned once
+
+    Returns:
+        Dict of marketplace -> dict with products, error and elapsed seconds,
+        in the order the marketplaces were given
+    """
+    unique = list(dict.fromkeys(marketplaces))
+    logger.info(f"Scanning seller {seller_id} on {len(unique)} marketplaces: {', '.join(unique)}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(unique))) as pool:
+        futures = {pool.submit(_timed, scan, marketplace, f"seller {seller_id} on {marketplace}"): marketplace
+                   for marketplace in unique}
+        for future in as_completed(futures):
+            products, error, elapsed = future.result()
+            results[futures[future]] = {'products': products, 'error': error, 'elapsed': elapsed}
+    return {marketplace: results[marketplace] for marketplace in unique}
+
+
+def _timed(scan: Callable[[str], List[Dict[str, Any]]], key: str, what: str):
+    """Run a scan, returning (products, error, elapsed seconds) instead of raising."""
+    start = time.monotonic()
+    try:
+        return scan(key), None, time.monotonic() - start
+    except Exception as e:
+        logger.error(f"Error scanning {what}: {e}")
+        return [], str(e), time.monotonic() - start
+
+
+def resolve_seller_names(lookup: Callable[[str], Optional[str]], seller_ids: Iterable[str], marketplace: str,
+                         source: str, force_refresh: bool = False,
+                         max_workers: int = DEFAULT_MAX_WORKERS) -> Dict[str, Optional[str]]:
+    """
+    Get sellers' display names, looking up only the ones not in the name cache.
+
+    Lookups run over a bounded pool (in the caller's thread for a single
+    seller) and their results, found or not, are cached.
+
+    Args:
+        lookup: Function that fetches one seller's name, or returns None
+        seller_ids: Sellers to resolve; duplicates are resolved once
+        marketplace: Marketplace the lookup function is bound to
+        source: Name of the scraper doing the lookups, stored with the names
+        force_refresh: Whether to look every seller up, ignoring the cache
+        max_workers: Maximum number of lookups at the same time
+
+    Returns:
+        Dict of seller ID -> name (None where no name could be found)
+    """
+    unique_ids = list(dict.fromkeys(seller_ids))
+    names: Dict[str, Optional[str]] = {}
+    if not force_refresh:
+        try:
+            with stage('cache_read'):
+                names = get_cache().get_seller_names(unique_ids, marketplace)
+        except Exception as e:
+            logger.error(f"Error reading seller names from cache: {e}")
+
+    def resolve(seller_id: str) -> Optional[str]:
+        name = lookup(seller_id)
+        try:
+            with stage('cache_write'):
+                get_cache().save_seller_name(seller_id, marketplace, name, source)
+        except Exception as e:
+            logger.error(f"Error saving seller name for {seller_id}: {e}")
+        return name
+
+    missing = [seller_id for seller_id in unique_ids if seller_id not in names]
+    if len(missing) == 1:
+        names[missing[0]] = resolve(missing[0])
+    elif missing:
+        logger.info(f"Looking up {len(missing)} seller names on {marketplace} with {max_workers} workers")
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            # Each lookup runs in a copy of the caller's context, so a scan's stats see it
+            futures = {pool.submit(contextvars.copy_context().run, resolve, seller_id): seller_id
+                       for seller_id in missing}
+            for future in as_completed(futures):
+                names[futures[future]] = future.result()
+
+    return {seller_id: names.get(seller_id) for seller_id in unique_ids}
@@ -9,6 +9,7 @@ const path = require('path');
 const { getUserData, saveUserData } = require('./userData');
 const { getSellerProductsWithKeepa } = require('./keepa_product_tracker');
 const { formatProductNotification } = require('./messageUtils');
+const { callWorker } = require('./scraper_worker_client');
 
 // Path for storing last check timestamps
 const lastSellerCheckPath = path.join(__dirname, '../data/seller_check_timestamps.json');
@@ -17,11 +18,22 @@ const lastSellerCheckPath = path.join(__dirname, '../data/seller_check_timestamp
 let lastSellerCheck = {};
 
 /**
- * Load cached products for a seller from the combined cache
+ * Load cached products for a seller from the scraper cache or the combined cache
  * @param {string} sellerId - Amazon seller ID
- * @returns {Array} - Array of cached products
+ * @returns {Promise<Array>} - Array of cached products
  */
-function loadCachedProducts(sellerId) {
+async function loadCachedProducts(sellerId) {
+    // The Python scrapers keep their inventories in the SQLite scraper cache
+    try {
+        const products = await callWorker('scraper_cache', 'get_cached_products', [sellerId, 'co.uk']);
+        if (Array.isArray(products) && products.length > 0) {
+            console.log(`📂 Loaded ${products.length} cached products for seller ${sellerId} from scraper cache`);
+            return products;
+        }
+    } catch (error) {
+        console.log(`⚠️ Error reading scraper cache: ${error.message}`);
+    }
+    
     // Try different cache locations
     const cachePaths = [
         path.join(__dirname, '../data/cache', `${sellerId}_co.uk.json`),
@@ -89,7 +101,7 @@ async function processSingleSeller(client, sellerId, sellerToUsers, forceRefresh
         
         // Load cached products from our cache system
         console.log(`🔄 Loading cached products for seller ${sellerId}...`);
-        const products = loadCachedProducts(sellerId);
+        const products = await loadCachedProducts(sellerId);
         
         console.log(`✅ Using ${products.length} cached products (Keepa API reserved for individual product verification)`);
         
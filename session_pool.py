@@ -0,0 +1,144 @@
+"""
+Shared HTTP Session Pool
+
+This module keeps one persistent requests.Session per Amazon marketplace for
+both scrapers, so page requests reuse open keep-alive connections (skipping
+the TCP and TLS handshakes) and keep the cookies Amazon hands out between
+requests. Sessions are rotated after a bounded lifetime or number of requests,
+starting again with fresh connections and cookies.
+
+requests is imported when the first session is created, so processes served
+from the cache never load the HTTP stack.
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from marketplaces import get_marketplace
+
+if TYPE_CHECKING:
+    import requests
+    from requests.adapters import BaseAdapter
+
+logger = logging.getLogger('session_pool')
+
+# Connections kept open per host
+DEFAULT_POOL_SIZE = 10
+# Session lifetime before rotation (seconds) and requests before rotation
+SESSION_MAX_AGE = float(os.environ.get('SCRAPER_SESSION_MAX_AGE', 600))
+SESSION_MAX_REQUESTS = int(os.environ.get('SCRAPER_SESSION_MAX_REQUESTS', 200))
+# Rotated sessions are closed once requests still using them have had time to finish (seconds)
+RETIRE_GRACE = 60
+
+
+def marketplace_from_url(url: str) -> str:
+    """Get the marketplace (e.g. 'co.uk') from an Amazon URL, or the host for other URLs."""
+    host = urlparse(url).netloc or url
+    return host.split('amazon.', 1)[1] if 'amazon.' in host else host
+
+
+class SessionPool:
+    """Thread-safe pool of one rotating requests.Session per marketplace."""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, max_age: float = SESSION_MAX_AGE,
+                 max_requests: int = SESSION_MAX_REQUESTS):
+        """Initialize an empty pool."""
+        self.pool_size = pool_size
+        self.max_age = max_age
+        self.max_requests = max_requests
+        self._lock = threading.Lock()
+        # marketplace -> [session, created_at, requests served]
+        self._sessions: Dict[str, list] = {}
+        self._retired: List[Tuple['requests.Session', float]] = []
+        # Stand-in transport mounted instead of real connections (see use_transport)
+        self.transport: Optional['BaseAdapter'] = None
+
+    def _new_session(self, marketplace: str) -> 'requests.Session':
+        """Create a session with a sized connection pool and the cookies of a browser on the marketplace."""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        # Retries are handled by the scrapers, which also pace them
+        adapter = self.transport or HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size,
+                                                max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        # Cookies to make requests more like a regular browser
+        session.cookies.set('session-id', f'{random.randint(1000000, 9999999)}')
+        session.cookies.set('session-id-time', f'{int(time.time())}')
+        for name, value in get_marketplace(marketplace).cookies().items():
+            session.cookies.set(name, value)
+        return session
+
+    def get(self, marketplace: str, count_request: bool = True) -> 'requests.Session':
+        """
+        Get the marketplace's session, rotating it if it is too old or has served too many requests.
+
+        Args:
+            marketplace: Amazon marketplace, e.g. 'co.uk'
+            count_request: Whether the caller is about to make a request with it
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(marketplace)
+            if entry and (now - entry[1] > self.max_age or entry[2] >= self.max_requests):
+                logger.info(f"Rotating HTTP session for amazon.{marketplace} after {entry[2]} requests")
+                self._retired.append((entry[0], now))
+                entry = None
+            if entry is None:
+                entry = self._sessions[marketplace] = [self._new_session(marketplace), now, 0]
+            if count_request:
+                entry[2] += 1
+
+            session = entry[0]
+            expired = [s for s, retired_at in self._retired if now - retired_at > RETIRE_GRACE]
+            self._retired = [(s, t) for s, t in self._retired if now - t <= RETIRE_GRACE]
+
+        for old in expired:
+            old.close()
+        return session
+
+    def get_for_url(self, url: str) -> 'requests.Session':
+        """Get the session for the marketplace a URL belongs to, counting one request."""
+        return self.get(marketplace_from_url(url))
+
+    def reserve(self, connections: int) -> None:
+        """Make sure sessions keep at least this many connections per host open, e.g. for a batch of workers."""
+        with self._lock:
+            if connections <= self.pool_size:
+                return
+            self.pool_size = connections
+            # Sessions with smaller pools are replaced on their next use
+            for entry in self._sessions.values():
+                entry[2] = self.max_requests
+
+    def use_transport(self, transport: Optional['BaseAdapter']) -> None:
+        """
+        Send every request through a transport adapter instead of the network
+        (e.g. one replaying recorded pages), or back to the network with None.
+        Sessions already handed out are replaced on their next use.
+        """
+        with self._lock:
+            self.transport = transport
+            for entry in self._sessions.values():
+                entry[2] = self.max_requests
+
+    def close(self) -> None:
+        """Close every session."""
+        with self._lock:
+            sessions = [entry[0] for entry in self._sessions.values()] + [s for s, _ in self._retired]
+            self._sessions.clear()
+            self._retired.clear()
+        for session in sessions:
+            session.close()
+
+
+# Shared by both scrapers
+SESSION_POOL = SessionPool()
@@ -0,0 +1,135 @@
+"""
+Cross-process Single-flight Scans
+
+This module makes sure only one process (or thread) scans a given seller at a
+time. The first caller takes an exclusive lock on a per-seller lock file in the
+cache directory and leaves an in-progress marker with its pid; callers arriving
+while the scan runs block on the lock, and once it is released they read the
+result the first caller cached instead of crawling the same pages again.
+
+Locks are flock()s, so the kernel releases them if a scanning process dies and
+a stale marker never blocks anyone.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; scans are not coalesced there
+    fcntl = None
+
+logger = logging.getLogger('single_flight')
+
+# Lock files and in-progress markers, next to the scraper cache
+LOCK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache', 'locks')
+
+# Longest a caller waits for another process's scan before scanning itself (seconds)
+MAX_WAIT = float(os.environ.get('SCRAPER_SINGLE_FLIGHT_MAX_WAIT', 3600))
+POLL_INTERVAL = 0.5
+
+
+def _safe_key(key: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', key)
+
+
+class Flight:
+    """
+    One caller's turn at a keyed scan.
+
+    Use as a context manager; entering blocks while another caller holds the
+    key and evaluates to True if it had to wait (so the other caller's result
+    should be reused if it is there).
+    """
+
+    def __init__(self, key: str, lock_dir: Optional[str] = None, max_wait: float = MAX_WAIT):
+        """Initialize a flight for a key, e.g. '<namespace>_<seller_id>_<marketplace>'."""
+        self.key = key
+        self.lock_dir = lock_dir or LOCK_DIR
+        self.max_wait = max_wait
+        self.lock_path = os.path.join(self.lock_dir, _safe_key(key) + '.lock')
+        self.marker_path = os.path.join(self.lock_dir, _safe_key(key) + '.inprogress')
+        self._lock_file = None
+
+    def enter(self) -> bool:
+        """
+        Take the key's lock, waiting for another holder to finish.
+
+        Returns:
+            True if another caller held the lock when we arrived
+        """
+        if fcntl is None:
+            return False
+
+        os.makedirs(self.lock_dir, exist_ok=True)
+        lock_file = open(self.lock_path, 'a')
+        waited = False
+        deadline = time.monotonic() + self.max_wait
+
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if not waited:
+                    holder = read_marker(self.key, self.lock_dir) or {}
+                    logger.info(f"Scan of {self.key} already in progress (pid {holder.get('pid', '?')}), waiting for it")
+                    waited = True
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Gave up waiting for the scan of {self.key} after {self.max_wait:.0f}s")
+                    lock_file.close()
+                    return False
+                time.sleep(POLL_INTERVAL)
+
+        self._lock_file = lock_file
+        with open(self.marker_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': self.key, 'pid': os.getpid(), 'started_at': time.time()}, f)
+        return waited
+
+    def exit(self) -> None:
+        """Remove the in-progress marker and release the lock."""
+        if self._lock_file is None:
+            return
+        try:
+            os.remove(self.marker_path)
+        except OSError:
+            pass
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock_file.close()
+        self._lock_file = None
+
+    def __enter__(self) -> bool:
+        return self.enter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.exit()
+
+
+def read_marker(key: str, lock_dir: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Get the in-progress marker of a key (pid and start time of the scanning process), if any."""
+    path = os.path.join(lock_dir or LOCK_DIR, _safe_key(key) + '.inprogress')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_in_progress(key: str, lock_dir: Optional[str] = None) -> bool:
+    """Check whether some process is scanning a key right now."""
+    if fcntl is None:
+        return False
+    path = os.path.join(lock_dir or LOCK_DIR, _safe_key(key) + '.lock')
+    if not os.path.exists(path):
+        return False
+    with open(path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return False
@@ -0,0 +1,170 @@
+"""
+Adaptive URL Pattern Planner
+
+This module learns, per seller, which storefront URL patterns are worth trying.
+For every pattern it keeps running averages of new ASINs found, requests spent
+and requests wasted (no product page), and persists them between scans. Later
+scans try the best patterns first and skip patterns that keep finding nothing
+new, re-trying a skipped pattern now and then in case the seller's catalogue
+has changed.
+
+Set SCRAPER_ADAPTIVE_PATTERNS=0 to always try every pattern.
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; saves are then only serialized within the process
+    fcntl = None
+
+logger = logging.getLogger('url_pattern_planner')
+
+# Stats for all sellers, stored next to the scraper cache
+STATS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache', 'url_pattern_stats.json')
+
+ENABLED = os.environ.get('SCRAPER_ADAPTIVE_PATTERNS', '1') not in ('0', 'false', 'no')
+
+# Scans a pattern must have before it can be skipped
+MIN_RUNS = 2
+# Chance of trying a skipped pattern anyway
+EXPLORE_RATE = 0.15
+# Weight of the latest scan in the running averages
+SMOOTHING = 0.4
+# Patterns averaging fewer new ASINs per scan than this are low value
+MIN_NEW_ASINS = 1.0
+# Patterns wasting more than this share of their requests are low value
+MAX_FAILURE_RATE = 0.9
+
+# Serializes saves between threads where fcntl isn't available
+_save_lock = threading.Lock()
+
+
+class UrlPatternPlanner:
+    """Orders and prunes a seller's URL patterns based on past scans."""
+
+    def __init__(self, seller_id: str, marketplace: str, path: Optional[str] = None,
+                 explore_rate: float = EXPLORE_RATE):
+        """Initialize the planner and load the seller's pattern stats."""
+        self.seller_id = seller_id
+        self.marketplace = marketplace
+        self.path = path or STATS_PATH
+        self.explore_rate = explore_rate
+        self.key = f"{seller_id}_{marketplace}"
+        self.stats: Dict[str, Dict[str, Any]] = _load_stats(self.path).get(self.key, {})
+
+    def _score(self, stats: Optional[Dict[str, Any]]) -> float:
+        """Expected new ASINs per request; unknown patterns rank first."""
+        if not stats or stats['runs'] < MIN_RUNS:
+            return float('inf')
+        return stats['avg_new_asins'] / max(stats['avg_requests'], 1.0)
+
+    def _is_low_value(self, stats: Optional[Dict[str, Any]]) -> bool:
+        if not stats or stats['runs'] < MIN_RUNS:
+            return False
+        return stats['avg_new_asins'] < MIN_NEW_ASINS or stats['avg_failure_rate'] > MAX_FAILURE_RATE
+
+    def plan(self, patterns: List[str], key: Optional[Callable[[str], str]] = None) -> List[str]:
+        """
+        Get the patterns to try for this scan, best first.
+
+        Args:
+            patterns: All candidate patterns, in their default order
+            key: Maps a pattern to the stable name its stats are stored under
+
+        Returns:
+            The patterns to try. At least the best pattern is always kept.
+        """
+        if not ENABLED or not patterns:
+            return list(patterns)
+
+        key = key or (lambda pattern: pattern)
+        ranked = sorted(patterns, key=lambda p: self._score(self.stats.get(key(p))), reverse=True)
+
+        planned = [
+            pattern for i, pattern in enumerate(ranked)
+            if i == 0 or not self._is_low_value(self.stats.get(key(pattern)))
+            or random.random() < self.explore_rate
+        ]
+
+        skipped = len(patterns) - len(planned)
+        if skipped:
+            logger.info(f"Skipping {skipped}/{len(patterns)} low-value URL patterns for seller {self.seller_id}")
+        return planned
+
+    def record(self, pattern_key: str, requests_made: int, new_asins: int, failed_requests: int) -> None:
+        """Record the outcome of one pattern in the current scan."""
+        stats = self.stats.get(pattern_key)
+        failure_rate = failed_requests / requests_made if requests_made else 1.0
+
+        if stats is None:
+            self.stats[pattern_key] = {
+                'runs': 1,
+                'avg_new_asins': float(new_asins),
+                'avg_requests': float(requests_made),
+                'avg_failure_rate': failure_rate,
+                'last_run': time.time()
+            }
+            return
+
+        stats['runs'] += 1
+        stats['avg_new_asins'] += SMOOTHING * (new_asins - stats['avg_new_asins'])
+        stats['avg_requests'] += SMOOTHING * (requests_made - stats['avg_requests'])
+        stats['avg_failure_rate'] += SMOOTHING * (failure_rate - stats['avg_failure_rate'])
+        stats['last_run'] = time.time()
+
+    def save(self) -> None:
+        """Persist this seller's stats, keeping other sellers' entries as they are on disk."""
+        if not ENABLED:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+
+            # Other threads and processes save their sellers' stats to the same file
+            with _locked(self.path):
+                all_stats = _load_stats(self.path)
+                all_stats[self.key] = self.stats
+
+                # Write to a temp file first so readers never see a partial file
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(all_stats, f)
+                os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Error saving URL pattern stats: {e}")
+
+
+@contextmanager
+def _locked(path: str) -> Iterator[None]:
+    """Hold the stats file's lock file exclusively."""
+    with _save_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _load_stats(path: str) -> Dict[str, Any]:
+    """Load the stats file, or an empty dict if it is missing or unreadable."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Error reading URL pattern stats: {e}")
+        return {}